@@ -0,0 +1,152 @@
+"""
+Mesure du coût de l'authentification.
+
+    1. Démarrage à froid : durée d'import de routers.auth dans un nouveau
+       processus (ce que paie chaque worker au lancement)
+    2. Connexion : latence p50/p99 de /auth/login sous connexions
+       simultanées, et retard maximal de la boucle d'événements pendant ce
+       temps (bcrypt hors boucle : le retard doit rester faible)
+    3. Vérification JWT par requête (get_current_user), sur le même token :
+        - python-jose sans cache (comportement d'origine)
+        - PyJWT sans cache
+        - avec le cache des tokens vérifiés (TOKEN_CACHE)
+
+Usage:
+    python bench_auth.py [--iterations 20000] [--logins 50] [--concurrency 10]
+"""
+
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Valeurs par défaut pour lancer la mesure sans .env complet
+os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("ADMIN_USER", "admin:admin")
+os.environ.setdefault("NORMAL_USER", "user:user")
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from routers import auth
+
+
+def argument(name, default):
+    if name in sys.argv:
+        return int(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(int(len(sorted_values) * fraction) - 1, 0)]
+
+
+def measure_cold_start(runs=5):
+    """Durée d'import de routers.auth dans un processus neuf (millisecondes)"""
+    code = ("import time; start = time.perf_counter(); from routers import auth; "
+            "print((time.perf_counter() - start) * 1000)")
+    durations = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        durations.append(float(output.stdout.strip().splitlines()[-1]))
+    print(f"   import routers.auth          médiane {statistics.median(durations):8.1f} ms "
+          f"(min {min(durations):.1f} ms, {runs} processus)")
+
+
+async def measure_logins(logins, concurrency):
+    """Latence des connexions simultanées et retard de la boucle d'événements"""
+    username, password = auth.NORMAL_USER
+    if password.startswith("$"):
+        print("   ⚠️ NORMAL_USER est configuré avec un hash : mesure des échecs de connexion")
+
+    lag = {"max": 0.0}
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag["max"] = max(lag["max"], time.perf_counter() - start - 0.001)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async def one_login():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await auth.login(auth.LoginRequest(username=username, password=password))
+            except auth.HTTPException:
+                pass
+            durations.append((time.perf_counter() - start) * 1000)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.gather(*(one_login() for _ in range(logins)))
+    done.set()
+    await ticker_task
+
+    durations.sort()
+    print(f"   /auth/login ({concurrency} simultanées) p50 {statistics.median(durations):8.1f} ms   "
+          f"p99 {percentile(durations, 0.99):8.1f} ms")
+    print(f"   retard max boucle d'événements    {lag['max'] * 1000:8.1f} ms")
+
+
+def measure(label, iterations, credentials):
+    """Durées par appel de get_current_user (microsecondes)"""
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        auth.get_current_user(credentials)
+        durations.append((time.perf_counter() - start) * 1_000_000)
+    durations.sort()
+    p50 = statistics.median(durations)
+    p99 = percentile(durations, 0.99)
+    print(f"   {label:<28} p50 {p50:8.1f} µs   p99 {p99:8.1f} µs   "
+          f"({1_000_000 / statistics.mean(durations):,.0f} req/s)")
+    return p50
+
+
+def main():
+    iterations = argument("--iterations", 20000)
+    logins = argument("--logins", 50)
+    concurrency = argument("--concurrency", 10)
+
+    print("🚀 DÉMARRAGE À FROID")
+    print("=" * 60)
+    measure_cold_start()
+
+    print(f"\n🔑 CONNEXIONS ({logins} connexions, {auth.AUTH_HASH_WORKERS} threads bcrypt)")
+    print("=" * 60)
+    asyncio.run(measure_logins(logins, concurrency))
+
+    username = auth.ADMIN_USER[0]
+    print(f"\n⏱️ AUTHENTIFICATION JWT ({iterations:,} appels, {auth.ALGORITHM})")
+    print("=" * 60)
+
+    results = {}
+    for backend in ("jose", "pyjwt"):
+        auth.encode_token, auth.decode_token = auth.JWT_BACKENDS[backend]
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=auth.create_access_token({"sub": username})
+        )
+        auth.TOKEN_CACHE.maxsize = 0
+        results[backend] = measure(f"{backend} sans cache", iterations, credentials)
+
+    auth.TOKEN_CACHE.maxsize = auth.JWT_CACHE_SIZE or 1024
+    auth.TOKEN_CACHE.clear()
+    results["cache"] = measure("cache des tokens vérifiés", iterations, credentials)
+
+    print(f"\n✅ Gain : x{results['jose'] / results['pyjwt']:.1f} avec PyJWT, "
+          f"x{results['jose'] / results['cache']:.1f} avec le cache (p50 vs jose)")
+
+
+if __name__ == "__main__":
+    main()
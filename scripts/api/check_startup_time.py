@@ -0,0 +1,89 @@
+"""
+Contrôle du temps de démarrage de l'API.
+
+Importe main dans un processus neuf avec `python -X importtime` et échoue
+(code 1) si l'import dépasse STARTUP_BUDGET_MS : à lancer en CI pour
+qu'un import lourd ajouté au niveau module (client de base, bibliothèque
+chargée d'office) ne ralentisse pas le lancement de chaque worker.
+
+L'import ne doit ouvrir aucune connexion ni écrire de fichier : les clients
+MongoDB / PostgreSQL, passlib, jose et le fichier de log sont initialisés au
+premier usage ou dans le lifespan de l'application.
+
+Usage:
+    python check_startup_time.py [--budget 1000] [--top 15]
+"""
+
+import os
+import re
+import subprocess
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Valeurs par défaut pour importer main sans .env complet
+DEFAULT_ENV = {
+    "SECRET_KEY": "startup-check",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ADMIN_USER": "admin:admin",
+    "NORMAL_USER": "user:user",
+}
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", 1000))
+
+# Ligne de -X importtime : "import time:   self [us] | cumulative | module"
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def argument(name, default):
+    if name in sys.argv:
+        return type(default)(sys.argv[sys.argv.index(name) + 1])
+    return default
+
+
+def import_times():
+    """Imports de main : [(module, self µs, cumulé µs, profondeur)]"""
+    env = {**DEFAULT_ENV, **os.environ}
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if output.returncode != 0:
+        print(output.stderr[-2000:])
+        raise SystemExit("❌ Import de main impossible")
+
+    imports = []
+    for line in output.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return imports
+
+
+def main():
+    budget = argument("--budget", STARTUP_BUDGET_MS)
+    top = argument("--top", 15)
+
+    imports = import_times()
+    total_ms = next(cumulative for module, _, cumulative, _ in imports if module == "main") / 1000
+
+    print("⏱️ IMPORTS LES PLUS COÛTEUX (durée cumulée, importés par main)")
+    print("=" * 60)
+    direct = [item for item in imports if item[3] == 1]
+    for module, _, cumulative, _ in sorted(direct, key=lambda item: -item[2])[:top]:
+        print(f"   {module:<40} {cumulative / 1000:8.1f} ms")
+
+    print(f"\n   import main : {total_ms:.1f} ms (budget {budget:.0f} ms)")
+    if total_ms > budget:
+        print("❌ Budget de démarrage dépassé")
+        sys.exit(1)
+    print("✅ Démarrage dans le budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Mesure des requêtes PostgreSQL et MongoDB.
+
+Les connexions ouvertes par connect_pg() et mongo_client() sont
+instrumentées sans changer le code d'accès aux données :
+
+    - PostgreSQL : curseurs dont execute() est chronométré (le résultat est
+      transféré pendant execute, la durée inclut donc le rapatriement)
+    - MongoDB : CommandListener sur find / aggregate / getMore / count
+      (mongo_instrumentation.py, pymongo n'étant importé qu'au premier client)
+
+Pour chaque requête sont relevés la durée, le nombre de lignes/documents et
+une empreinte normalisée (valeurs remplacées par ?), qui alimentent :
+
+    - db_query_duration_seconds / db_query_rows_total dans /metrics
+    - le temps pg / mongo de la requête HTTP en cours (record_db_time)
+    - le journal des requêtes lentes (SLOW_QUERY, au-delà de SLOW_QUERY_MS),
+      avec le plan d'exécution (EXPLAIN / explain) et l'identifiant de la
+      requête HTTP (X-Request-ID)
+
+Functions:
+    connect_pg: psycopg2.connect avec curseurs instrumentés
+    mongo_client: MongoClient instrumenté
+    sql_fingerprint: Empreinte normalisée d'une requête SQL
+    mongo_fingerprint: Empreinte normalisée d'une commande MongoDB
+"""
+
+import os
+import re
+import time
+from functools import lru_cache
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+
+from logger import logger, JsonPayload
+from metrics import Counter, Histogram, record_db_time, current_request_id
+
+# Seuil du journal des requêtes lentes (millisecondes)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+
+QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Durée des requêtes base de données par empreinte",
+    ("backend", "fingerprint")
+)
+QUERY_ROWS = Counter(
+    "db_query_rows_total", "Lignes / documents renvoyés par empreinte", ("backend", "fingerprint")
+)
+
+_SQL_LITERALS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                 # chaînes
+    (re.compile(r"%\(\w+\)s|%s"), "?"),                   # paramètres
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),              # nombres
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),   # listes IN (?, ?, ?)
+    (re.compile(r"\s+"), " "),
+]
+
+
+@lru_cache(maxsize=1024)
+def sql_fingerprint(query):
+    """Requête SQL normalisée : valeurs remplacées par ?, espaces réduits"""
+    for pattern, replacement in _SQL_LITERALS:
+        query = pattern.sub(replacement, query)
+    return query.strip()[:300]
+
+
+def _shape(value):
+    """Forme d'un filtre MongoDB : clés et opérateurs conservés, valeurs en ?"""
+    if isinstance(value, dict):
+        return {key: _shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_shape(item) for item in value[:1]]
+    return "?"
+
+
+def mongo_fingerprint(command_name, command):
+    """Empreinte d'une commande MongoDB : 'find EPIS_POLLUTION {"aasqa": "?"}'"""
+    collection = command.get(command_name)
+    body = command.get("filter", command.get("pipeline", command.get("query", {})))
+    return f"{command_name} {collection} {JsonPayload(_shape(body))}"[:300]
+
+
+def record_query(backend, fingerprint, seconds, rows):
+    """Enregistre une requête mesurée (métriques et temps de la requête HTTP)"""
+    QUERY_DURATION.observe(seconds, backend=backend, fingerprint=fingerprint)
+    QUERY_ROWS.inc(max(rows, 0), backend=backend, fingerprint=fingerprint)
+    record_db_time(backend, seconds)
+
+
+def log_slow_query(backend, fingerprint, seconds, rows, request_id, plan):
+    logger.warning("SLOW_QUERY: %s", JsonPayload({
+        "backend": backend,
+        "request_id": request_id,
+        "fingerprint": fingerprint,
+        "duree_ms": round(seconds * 1000, 1),
+        "lignes": rows,
+        "plan": plan,
+    }))
+
+
+# ========== POSTGRESQL ==========
+
+class InstrumentedCursorMixin:
+    """execute() chronométré ; EXPLAIN des SELECT lents sur la même connexion"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            seconds = time.perf_counter() - start
+            template = query if isinstance(query, str) else query.as_string(self)
+            fingerprint = sql_fingerprint(template)
+            record_query("pg", fingerprint, seconds, self.rowcount)
+            if seconds * 1000 >= SLOW_QUERY_MS:
+                log_slow_query("pg", fingerprint, seconds, self.rowcount,
+                               current_request_id(), self._explain())
+
+    def _explain(self):
+        """Plan de la dernière requête (texte déjà lié à ses paramètres)"""
+        statement = (self.query or b"").decode(errors="replace")
+        if not re.match(r"\s*(SELECT|WITH)\b", statement, re.IGNORECASE):
+            return None
+        if self.connection.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            return None
+        try:
+            with psycopg2.extensions.cursor(self.connection) as cursor:
+                cursor.execute("EXPLAIN " + statement)
+                return "\n".join(row[0] for row in cursor.fetchall())
+        except psycopg2.Error as e:
+            return f"EXPLAIN impossible: {e}"
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+
+class InstrumentedRealDictCursor(InstrumentedCursorMixin, RealDictCursor):
+    pass
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connexion dont les curseurs (simples ou RealDictCursor) sont instrumentés"""
+
+    _CURSORS = {None: InstrumentedCursor, RealDictCursor: InstrumentedRealDictCursor}
+
+    def cursor(self, *args, cursor_factory=None, **kwargs):
+        factory = self._CURSORS.get(cursor_factory, cursor_factory)
+        return super().cursor(*args, cursor_factory=factory, **kwargs)
+
+
+def connect_pg(**config):
+    """psycopg2.connect avec curseurs instrumentés (mêmes paramètres)"""
+    return psycopg2.connect(connection_factory=InstrumentedConnection, **config)
+
+
+# ========== MONGODB ==========
+
+def mongo_client(uri, **kwargs):
+    """MongoClient instrumenté (pool et requêtes) ; mêmes paramètres que MongoClient"""
+    from mongo_instrumentation import instrumented_client
+    return instrumented_client(uri, **kwargs)
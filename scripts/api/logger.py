@@ -9,30 +9,182 @@ Functions:
     log_login: Enregistre les tentatives de connexion
 
 Configuration:
-    - Logs sauvegardés dans logs/api.log
-    - Format JSON pour faciliter l'analyse
+    - Logs sauvegardés dans logs/api.log, avec rotation par taille
+      (LOG_MAX_BYTES, LOG_BACKUP_COUNT) ou par période (LOG_ROTATE_WHEN)
+    - Format JSON pour faciliter l'analyse (orjson si disponible)
     - Niveaux: INFO (succès), ERROR (échecs API), WARNING (connexions échouées)
+
+Performance:
+    L'écriture est faite par un thread dédié (QueueHandler/QueueListener) :
+    le thread de la requête formate le message, sérialisation JSON comprise
+    (comme QueueHandler, pour figer les arguments), puis le dépose dans une
+    file bornée (LOG_QUEUE_SIZE). Seules les E/S (fichier, console, rotation)
+    quittent le thread de la requête. Si la file est
+    pleine, l'enregistrement est abandonné et compté plutôt que de bloquer.
+    Les appels réussis peuvent être échantillonnés (LOG_SUCCESS_SAMPLE_RATE,
+    1.0 = tout garder) ; les erreurs sont toujours écrites.
+
+    L'import du module n'a pas d'effet de bord : le dossier logs/, le
+    fichier, le thread d'écriture et la configuration du logger racine
+    (journaux des bibliothèques) sont faits par start_logging (appelé au
+    démarrage de l'API, ou au premier enregistrement du logger "API").
 """
 
+import atexit
 import logging
-import json
-from datetime import datetime
+import logging.handlers
 import os
+import queue
+import random
+import threading
+from datetime import datetime
+
+try:
+    import orjson
+
+    def dumps(data):
+        return orjson.dumps(data, default=str).decode()
+except ImportError:
+    import json
+
+    def dumps(data):
+        return json.dumps(data, default=str)
+
+
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.path.join(LOG_DIR, "api.log")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", 5))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN")  # ex: "midnight" (rotation par période)
+SUCCESS_SAMPLE_RATE = float(os.getenv("LOG_SUCCESS_SAMPLE_RATE", 1.0))
+
+
+class JsonPayload:
+    """Données de log sérialisées en JSON au formatage seulement (rien pour un niveau filtré)"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __str__(self):
+        return dumps(self.data)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler non bloquant : un enregistrement qui ne tient pas dans la
+    file est abandonné et compté.
+
+    prepare() reste celui de QueueHandler : le message est formaté dans le
+    thread appelant, l'enregistrement déposé ne référence plus les arguments
+    (objets modifiables ensuite, exceptions).
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        # Message seul : date et niveau sont ajoutés par les handlers d'écriture
+        self.setFormatter(logging.Formatter("%(message)s"))
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, record):
+        if _listener is None:
+            start_logging()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+def _file_handler():
+    """Fichier de log avec rotation par période si LOG_ROTATE_WHEN, sinon par taille"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+_queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_logging():
+    """Crée le fichier de log et démarre le thread d'écriture (une seule fois)"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        handlers = [_file_handler(), logging.StreamHandler()]  # Fichier, console
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        listener = logging.handlers.QueueListener(
+            _queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)
+        _listener = listener
+        # Journaux des autres bibliothèques : même file (sans effet si le
+        # logger racine est déjà configuré par l'application)
+        logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
 
 
-os.makedirs("logs", exist_ok=True)
+def stop_logging():
+    """Vide la file, arrête le thread d'écriture et ferme les fichiers"""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        atexit.unregister(_listener.stop)
+        _listener = None
+        logging.getLogger().removeHandler(_queue_handler)
 
-# Configuration simple du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/api.log'),  # Fichier
-        logging.StreamHandler()               # Console
-    ]
-)
 
+# Logger de l'API : relié à la file sans toucher au logger racine (pas de
+# double écriture une fois le logger racine configuré par start_logging)
 logger = logging.getLogger("API")
+logger.setLevel(logging.INFO)
+logger.addHandler(_queue_handler)
+logger.propagate = False
+
+_sampled_out = 0
+_sampled_lock = threading.Lock()
+
+
+def keep_success():
+    """Échantillonnage des logs de succès (True : à écrire)"""
+    global _sampled_out
+    if SUCCESS_SAMPLE_RATE >= 1 or random.random() < SUCCESS_SAMPLE_RATE:
+        return True
+    with _sampled_lock:
+        _sampled_out += 1
+    return False
+
+
+def log_stats():
+    """
+    Compteurs du logging asynchrone.
+
+    Returns:
+        dict: {"en_attente", "abandonnes", "echantillonnes", "taux_echantillonnage"}
+    """
+    return {
+        "en_attente": _queue_handler.queue.qsize(),
+        "abandonnes": _queue_handler.dropped,
+        "echantillonnes": _sampled_out,
+        "taux_echantillonnage": SUCCESS_SAMPLE_RATE,
+    }
 
 def log_api_call(endpoint: str, user: str = "anonymous", params: dict = None, success: bool = True):
     """
@@ -48,8 +200,8 @@ def log_api_call(endpoint: str, user: str = "anonymous", params: dict = None, su
         success (bool): True si succès, False si erreur
         
     Logs:
-        - INFO level: Appels réussis
-        - ERROR level: Appels échoués
+        - INFO level: Appels réussis (échantillonnés selon LOG_SUCCESS_SAMPLE_RATE)
+        - ERROR level: Appels échoués (toujours écrits)
         - Format JSON avec timestamp ISO
         
     Privacy:
@@ -65,9 +217,10 @@ def log_api_call(endpoint: str, user: str = "anonymous", params: dict = None, su
     }
     
     if success:
-        logger.info(f"API_CALL: {json.dumps(log_data)}")
+        if keep_success():
+            logger.info("API_CALL: %s", JsonPayload(log_data))
     else:
-        logger.error(f"API_ERROR: {json.dumps(log_data)}")
+        logger.error("API_ERROR: %s", JsonPayload(log_data))
 
 def log_login(username: str, success: bool, ip: str = "unknown"):
     """
@@ -99,6 +252,6 @@ def log_login(username: str, success: bool, ip: str = "unknown"):
     }
     
     if success:
-        logger.info(f"LOGIN_SUCCESS: {json.dumps(log_data)}")
+        logger.info("LOGIN_SUCCESS: %s", JsonPayload(log_data))
     else:
-        logger.warning(f"LOGIN_FAILED: {json.dumps(log_data)}")
\ No newline at end of file
+        logger.warning("LOGIN_FAILED: %s", JsonPayload(log_data))
\ No newline at end of file
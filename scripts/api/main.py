@@ -1,8 +1,64 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import air_quality, auth
+import os
+import sys
+import threading
 from security.rate_limiting import setup_rate_limiting
-from routers import air_quality, auth, profils, hybride
+from routers import air_quality, auth, profils, hybride, stations, admin, health
+from logger import logger, start_logging, stop_logging
+from metrics import metrics_middleware, router as metrics_router
+from profiler import ProfileMiddleware
+
+# Plan d'index MongoDB partagé avec les scripts d'import (importé au démarrage)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'nosql'))
+
+
+def verifier_index_mongo():
+    """
+    Vérifie au démarrage que les requêtes MongoDB connues utilisent un index.
+
+    La vérification (explain) tourne en arrière-plan pour ne pas retarder le
+    démarrage si MongoDB est lent ou indisponible. Désactivable avec
+    MONGO_INDEX_CHECK=0.
+    """
+    if os.getenv("MONGO_INDEX_CHECK", "1") != "1":
+        return
+
+    def _verifier():
+        try:
+            from mongo_indexes import check_query_plans
+            failures = check_query_plans(air_quality.get_mongo_db(), verbose=False)
+        except Exception as e:
+            logger.error(f"Vérification des index MongoDB impossible: {e}")
+            return
+        for failure in failures:
+            if "erreur" in failure:
+                logger.warning(f"Plan MongoDB en erreur: {failure['nom']} sur {failure['collection']} "
+                               f"({failure['erreur']})")
+            else:
+                logger.warning(f"COLLSCAN MongoDB: {failure['nom']} sur {failure['collection']}")
+        if not failures:
+            logger.info("Index MongoDB vérifiés : aucune requête connue en COLLSCAN")
+
+    threading.Thread(target=_verifier, daemon=True).start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage et arrêt du worker.
+
+    L'import des modules ne fait aucune connexion ni écriture : les clients
+    de bases de données sont créés à la première requête (ou par la sonde
+    /health/ready), le fichier de log au démarrage.
+    """
+    start_logging()
+    verifier_index_mongo()
+    yield
+    air_quality.close_mongo_client()
+    stop_logging()
+
 
 app = FastAPI(
     title="API Poll'Air - Multi-Sources",
@@ -33,6 +89,7 @@ app = FastAPI(
     
     """,
     version="2.0.0",
+    lifespan=lifespan,
 )
 
 # Configuration Rate Limiting
@@ -47,11 +104,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Mesure des requêtes (latence, statuts, temps pg/mongo/python)
+app.middleware("http")(metrics_middleware)
+
+# Profilage à la demande (en-tête X-Profile, administrateurs)
+app.add_middleware(ProfileMiddleware)
+
 # Routes
 app.include_router(auth.router, prefix="/auth", tags=["Authentification"])
 app.include_router(air_quality.router, prefix="/api", tags=["Qualité de l'Air"])
 app.include_router(profils.router, prefix="/api", tags=["Profils et Recommandations"])
 app.include_router(hybride.router, prefix="/api", tags=["Hybride"])
+app.include_router(stations.router, prefix="/api", tags=["Stations"])
+app.include_router(admin.router, prefix="/api", tags=["Administration"])
+app.include_router(metrics_router, tags=["Monitoring"])
+app.include_router(health.router, tags=["Monitoring"])
 
 
 if __name__ == "__main__":
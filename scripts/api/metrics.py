@@ -0,0 +1,310 @@
+"""
+Métriques de performance de l'API au format texte Prometheus.
+
+Ce module mesure chaque requête HTTP (middleware) et expose les mesures sur
+GET /metrics, lisible par Prometheus ou directement avec curl.
+
+Métriques:
+    - api_request_duration_seconds : histogramme de latence par route
+      (p50/p99 via histogram_quantile)
+    - api_request_part_seconds : répartition du temps d'une requête entre
+      PostgreSQL (pg), MongoDB (mongo) et Python (python : calcul et
+      sérialisation, soit le reste)
+    - api_requests_total : compteur par route, méthode et code HTTP
+    - api_requests_in_flight : requêtes en cours
+    - métriques des collecteurs enregistrés (pool MongoDB, file de logs,
+      caches) lues à chaque export
+
+Functions:
+    record_db_time: Ajoute du temps base de données à la requête en cours
+    current_request_id: Identifiant (X-Request-ID) de la requête en cours
+    metrics_middleware: Middleware HTTP de mesure des requêtes
+    register_collector: Enregistre une source de métriques lue à l'export
+"""
+
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+
+from logger import log_stats
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Temps base de données de la requête en cours : {"pg": s, "mongo": s}
+# (les endpoints synchrones tournent dans un thread qui hérite du contexte)
+_request_timings = ContextVar("request_timings", default=None)
+
+# Identifiant de la requête en cours : en-tête X-Request-ID reçu, ou généré
+_request_id = ContextVar("request_id", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    """Étiquettes Prometheus : {route="/api/x",status="200"}"""
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    """Métrique avec étiquettes, protégée par un verrou (threads de requêtes)"""
+
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """Lignes d'exposition : [(suffixe, [(étiquette, valeur)], valeur)]"""
+        with self._lock:
+            return [("", list(zip(self.labelnames, key)), value)
+                    for key, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total, count)
+                     for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, counts, total, count in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(("_bucket", labels + [("le", bound)], bucket_count))
+            lines.append(("_bucket", labels + [("le", "+Inf")], count))
+            lines.append(("_sum", labels, total))
+            lines.append(("_count", labels, count))
+        return lines
+
+
+class CollectorRegistry:
+    """
+    Ensemble des métriques exportées.
+
+    Un collecteur est une fonction sans argument renvoyant des échantillons
+    [(nom, type, description, {étiquettes}, valeur), ...] : il est appelé à
+    chaque export (statistiques de pool, de file, de cache).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Export au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_labels(labels)} {value}")
+
+        declared = set()
+        for collector in list(self._collectors):
+            try:
+                samples = collector()
+            except Exception:
+                continue  # Une source indisponible ne bloque pas l'export
+            for name, kind, documentation, labels, value in samples:
+                if name not in declared:
+                    lines.append(f"# HELP {name} {documentation}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    declared.add(name)
+                lines.append(f"{name}{_labels(list(labels.items()))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = CollectorRegistry()
+register_collector = REGISTRY.register_collector
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds", "Durée des requêtes HTTP par route", ("route", "method")
+)
+REQUEST_PART = Histogram(
+    "api_request_part_seconds", "Temps d'une requête par composante (pg, mongo, python)",
+    ("route", "part")
+)
+REQUESTS_TOTAL = Counter(
+    "api_requests_total", "Requêtes HTTP par route et code de statut", ("route", "method", "status")
+)
+IN_FLIGHT = Gauge("api_requests_in_flight", "Requêtes HTTP en cours de traitement")
+
+
+def record_db_time(backend, seconds):
+    """
+    Ajoute du temps base de données ("pg" ou "mongo") à la requête en cours.
+    Sans effet en dehors d'une requête HTTP (scripts, threads de fond).
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[backend] = timings.get(backend, 0.0) + seconds
+
+
+def current_request_id():
+    """Identifiant de la requête HTTP en cours (None hors requête)"""
+    return _request_id.get()
+
+
+def route_label(request):
+    """Modèle de route (/api/profils/{profil_id}) pour borner le nombre de séries"""
+    route = request.scope.get("route")
+    if route is None:
+        return "non_route"
+    # Versions récentes de FastAPI : la route d'un routeur inclus garde son
+    # chemin sans préfixe, le chemin complet est dans le contexte effectif
+    context = request.scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(context, "path", None) or route.path
+
+
+async def metrics_middleware(request: Request, call_next):
+    """
+    Mesure la durée, le statut et la répartition pg/mongo/python de chaque
+    requête, et lui attribue un identifiant (renvoyé en X-Request-ID).
+    """
+    timings = {}
+    request_id = request.headers.get("x-request-id", "")[:64] or uuid.uuid4().hex
+    token = _request_timings.set(timings)
+    id_token = _request_id.set(request_id)
+    IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        IN_FLIGHT.dec()
+        _request_timings.reset(token)
+        _request_id.reset(id_token)
+
+        route, method = route_label(request), request.method
+        REQUEST_DURATION.observe(elapsed, route=route, method=method)
+        REQUESTS_TOTAL.inc(route=route, method=method, status=status)
+        db_time = 0.0
+        for part in ("pg", "mongo"):
+            seconds = timings.get(part, 0.0)
+            db_time += seconds
+            REQUEST_PART.observe(seconds, route=route, part=part)
+        REQUEST_PART.observe(max(elapsed - db_time, 0.0), route=route, part="python")
+
+
+class MongoPoolStats:
+    """
+    Connexions du pool MongoDB, alimentées par le listener de pool installé
+    par mongo_instrumentation (pymongo n'est pas importé ici).
+    """
+
+    def __init__(self):
+        self.ouvertes = 0
+        self.empruntees = 0
+        self.attentes_echouees = 0
+
+    def connection_created(self, event):
+        self.ouvertes += 1
+
+    def connection_closed(self, event):
+        self.ouvertes -= 1
+
+    def connection_checked_out(self, event):
+        self.empruntees += 1
+
+    def connection_checked_in(self, event):
+        self.empruntees -= 1
+
+    def connection_check_out_failed(self, event):
+        self.attentes_echouees += 1
+
+    def collect(self):
+        return [
+            ("mongo_pool_connections", "gauge", "Connexions ouvertes du pool MongoDB", {}, self.ouvertes),
+            ("mongo_pool_connections_in_use", "gauge", "Connexions MongoDB empruntées", {}, self.empruntees),
+            ("mongo_pool_checkout_failures_total", "counter",
+             "Échecs d'obtention d'une connexion MongoDB", {}, self.attentes_echouees),
+        ]
+
+
+MONGO_POOL_STATS = MongoPoolStats()
+register_collector(MONGO_POOL_STATS.collect)
+
+
+def _log_collector():
+    stats = log_stats()
+    return [
+        ("api_log_queue_size", "gauge", "Enregistrements de log en attente d'écriture", {}, stats["en_attente"]),
+        ("api_log_dropped_total", "counter", "Enregistrements de log abandonnés (file pleine)", {}, stats["abandonnes"]),
+        ("api_log_sampled_out_total", "counter", "Logs de succès écartés par échantillonnage", {}, stats["echantillonnes"]),
+    ]
+
+
+register_collector(_log_collector)
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Export des métriques au format texte Prometheus"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
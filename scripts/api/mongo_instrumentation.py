@@ -0,0 +1,128 @@
+"""
+Mesure des commandes MongoDB (voir db_instrumentation.py).
+
+Module séparé pour que pymongo ne soit importé qu'à la création du premier
+client MongoDB (db_instrumentation.mongo_client), pas au démarrage de l'API.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pymongo import MongoClient, monitoring
+
+from db_instrumentation import SLOW_QUERY_MS, mongo_fingerprint, record_query, log_slow_query
+from metrics import MONGO_POOL_STATS, current_request_id
+
+# Commandes MongoDB mesurées (les autres : ping, hello, index...)
+MONGO_COMMANDS = {"find", "aggregate", "getMore", "count", "countDocuments", "distinct"}
+MONGO_EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+
+# explain() des requêtes lentes, hors du thread applicatif : un listener ne
+# doit pas émettre de commande lui-même
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mongo-explain")
+
+
+class MongoQueryListener(monitoring.CommandListener):
+    """Mesure les commandes de lecture d'un MongoClient"""
+
+    def __init__(self):
+        self.client = None
+        self._started = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name not in MONGO_COMMANDS:
+            return
+        cursor_id = None
+        if event.command_name == "getMore":
+            # Lot suivant d'un curseur : rattaché à la requête d'origine
+            cursor_id = event.command.get("getMore")
+            with self._lock:
+                fingerprint = self._cursors.get(cursor_id)
+            fingerprint = fingerprint or f"getMore {event.command.get('collection')}"
+            command = None
+        else:
+            fingerprint = mongo_fingerprint(event.command_name, event.command)
+            command = event.command
+        self._started[event.request_id] = (
+            fingerprint, cursor_id, event.database_name, command, current_request_id()
+        )
+
+    def succeeded(self, event):
+        started = self._started.pop(event.request_id, None)
+        if started is None:
+            return
+        fingerprint, cursor_id, database, command, request_id = started
+        seconds = event.duration_micros / 1_000_000
+        cursor = event.reply.get("cursor", {})
+        documents = cursor.get("firstBatch", cursor.get("nextBatch"))
+        rows = len(documents) if documents is not None else event.reply.get("n", 0)
+
+        with self._lock:
+            if cursor.get("id"):
+                if len(self._cursors) > 10000:
+                    self._cursors.clear()  # Curseurs abandonnés sans getMore final
+                self._cursors[cursor["id"]] = fingerprint
+            elif cursor_id is not None:
+                self._cursors.pop(cursor_id, None)  # Curseur épuisé
+
+        record_query("mongo", fingerprint, seconds, rows)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            _explain_executor.submit(
+                self._log_slow, database, command, fingerprint, seconds, rows, request_id
+            )
+
+    def failed(self, event):
+        self._started.pop(event.request_id, None)
+
+    def _log_slow(self, database, command, fingerprint, seconds, rows, request_id):
+        plan = None
+        name = next(iter(command), None) if command else None
+        if self.client is not None and name in MONGO_EXPLAINABLE:
+            explained = {key: value for key, value in command.items()
+                         if not key.startswith("$") and key != "lsid"}
+            try:
+                result = self.client[database].command(
+                    "explain", explained, verbosity="queryPlanner"
+                )
+                plan = result.get("queryPlanner", {}).get("winningPlan", result)
+            except Exception as e:
+                plan = f"explain impossible: {e}"
+        log_slow_query("mongo", fingerprint, seconds, rows, request_id, plan)
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Transmet les événements du pool de connexions à MONGO_POOL_STATS (/metrics)"""
+
+    def connection_created(self, event):
+        MONGO_POOL_STATS.connection_created(event)
+
+    def connection_closed(self, event):
+        MONGO_POOL_STATS.connection_closed(event)
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_STATS.connection_checked_out(event)
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_STATS.connection_checked_in(event)
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_STATS.connection_check_out_failed(event)
+
+    # Événements sans intérêt pour les métriques
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+
+def instrumented_client(uri, **kwargs):
+    """MongoClient avec mesure du pool et des requêtes"""
+    listener = MongoQueryListener()
+    listeners = [PoolListener(), listener] + list(kwargs.pop("event_listeners", []))
+    client = MongoClient(uri, event_listeners=listeners, **kwargs)
+    listener.client = client
+    return client
@@ -0,0 +1,202 @@
+"""
+Profilage par échantillonnage du worker API, à la demande.
+
+Un thread d'échantillonnage relève périodiquement la pile de chaque thread
+(sys._current_frames) pendant une durée bornée. Le résultat est au format
+"collapsed stacks" (une pile par ligne, frames séparées par ';', suivie du
+nombre d'échantillons), directement lisible par flamegraph.pl, speedscope
+ou inferno.
+
+Deux déclencheurs, réservés aux administrateurs :
+    - GET /api/admin/profile : profil de tout le worker pendant N secondes
+    - en-tête X-Profile: 1 sur une requête : profil pendant cette requête,
+      identifiant renvoyé en X-Profile-ID
+
+Sans profil en cours, aucun thread ni hook n'est actif. Le middleware est
+un middleware ASGI pur (pas de BaseHTTPMiddleware) : une requête sans
+en-tête X-Profile est transmise telle quelle à l'application, sans objet
+Request ni tâche supplémentaire.
+
+Les derniers profils sont conservés en mémoire (PROFILE_HISTORY).
+
+Functions:
+    capture_profile: Profil du worker pendant une durée donnée
+    recent_profiles: Profils conservés (plus récent en premier)
+    ProfileMiddleware: Middleware ASGI du profilage par requête
+"""
+
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+
+from starlette.datastructures import Headers
+
+from logger import logger
+from routers.auth import user_from_token
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))
+PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", 10))
+
+# Profils récents : le plus ancien est écarté au-delà de PROFILE_HISTORY
+_profiles = deque(maxlen=PROFILE_HISTORY)
+_profiles_lock = threading.Lock()
+
+# Un seul profil global à la fois (l'échantillonnage a un coût)
+_capture_lock = threading.Lock()
+
+
+def frame_label(frame):
+    """Frame au format fichier:fonction"""
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+def collapse_stack(frame, thread_name):
+    """Pile d'un thread, de la racine vers la frame courante, séparée par ';'"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+class Sampler(threading.Thread):
+    """Thread d'échantillonnage des piles, arrêté par stop() ou après max_seconds"""
+
+    def __init__(self, interval_ms=PROFILE_INTERVAL_MS, max_seconds=PROFILE_MAX_SECONDS):
+        super().__init__(name="profiler", daemon=True)
+        self.interval = interval_ms / 1000
+        self.max_seconds = max_seconds
+        self.stacks = Counter()
+        self.samples = 0
+        self.started_at = None
+        self.seconds = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self.started_at = datetime.now()
+        start = time.perf_counter()
+        own_id = threading.get_ident()
+        while not self._stop_event.is_set() and time.perf_counter() - start < self.max_seconds:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[collapse_stack(frame, names.get(thread_id, str(thread_id)))] += 1
+            self.samples += 1
+            self._stop_event.wait(self.interval)
+        self.seconds = time.perf_counter() - start
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self):
+        """Résultat au format collapsed stacks"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def new_profile_id():
+    return uuid.uuid4().hex[:12]
+
+
+def _store(sampler, cible, profile_id=None):
+    profile = {
+        "id": profile_id or new_profile_id(),
+        "cible": cible,
+        "debut": sampler.started_at.isoformat() if sampler.started_at else None,
+        "duree_s": round(sampler.seconds, 3),
+        "echantillons": sampler.samples,
+        "collapsed": sampler.collapsed(),
+    }
+    with _profiles_lock:
+        _profiles.appendleft(profile)
+    return profile
+
+
+def capture_profile(seconds, interval_ms=PROFILE_INTERVAL_MS):
+    """
+    Profil de tout le worker pendant `seconds` secondes (bornées).
+
+    Returns:
+        dict|None: Profil conservé, None si un profil est déjà en cours
+    """
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    try:
+        sampler = Sampler(interval_ms, min(seconds, PROFILE_MAX_SECONDS))
+        sampler.start()
+        sampler.join()
+        return _store(sampler, "worker")
+    finally:
+        _capture_lock.release()
+
+
+def recent_profiles():
+    """Profils conservés, sans leur contenu (plus récent en premier)"""
+    with _profiles_lock:
+        return [{key: value for key, value in profile.items() if key != "collapsed"}
+                for profile in _profiles]
+
+
+def get_profile(profile_id):
+    """Profil conservé par identifiant (None si écarté ou inconnu)"""
+    with _profiles_lock:
+        return next((profile for profile in _profiles if profile["id"] == profile_id), None)
+
+
+def _is_admin(headers):
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    user = user_from_token(token)
+    return bool(user) and user.get("role") == "admin"
+
+
+class ProfileMiddleware:
+    """Profile la requête si elle porte X-Profile et vient d'un administrateur"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not any(name == b"x-profile" for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if not headers.get("x-profile") or not _is_admin(headers):
+            await self.app(scope, receive, send)
+            return
+
+        if not _capture_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)  # Un profil est déjà en cours
+            return
+
+        # Identifiant connu d'avance : l'en-tête part avant la fin du profil
+        profile_id = new_profile_id()
+        cible = f"{scope['method']} {scope['path']}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []),
+                                      (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        try:
+            sampler = Sampler()
+            sampler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                sampler.stop()
+                profile = _store(sampler, cible, profile_id)
+        finally:
+            _capture_lock.release()
+
+        logger.info(f"Profil {profile['id']} : {cible} ({profile['echantillons']} échantillons)")
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from routers.air_quality import require_admin_role
+from logger import log_api_call
+from profiler import capture_profile, recent_profiles, get_profile, PROFILE_MAX_SECONDS
+
+router = APIRouter(prefix="/admin")
+
+
+@router.get("/profile",
+    summary="🔥 Profil du worker",
+    description="🔐 Admin : profil par échantillonnage du worker pendant `duree` secondes, au format collapsed stacks (flamegraph)",
+    response_class=PlainTextResponse)
+def profile_worker(
+    duree: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS, description="Durée de capture (secondes)"),
+    intervalle_ms: float = Query(5, ge=1, le=100, description="Intervalle d'échantillonnage (ms)"),
+    current_user: dict = Depends(require_admin_role)
+):
+    profile = capture_profile(duree, intervalle_ms)
+    if profile is None:
+        raise HTTPException(status_code=409, detail="Un profil est déjà en cours")
+    log_api_call("/api/admin/profile", current_user["username"], {"duree": duree})
+    return PlainTextResponse(profile["collapsed"], headers={"X-Profile-ID": profile["id"]})
+
+
+@router.get("/profiles",
+    summary="🗂️ Profils récents",
+    description="🔐 Admin : profils conservés en mémoire (worker et requêtes X-Profile)")
+def list_profiles(current_user: dict = Depends(require_admin_role)):
+    return {"profiles": recent_profiles()}
+
+
+@router.get("/profiles/{profile_id}",
+    summary="🔥 Profil conservé",
+    description="🔐 Admin : profil conservé, au format collapsed stacks",
+    response_class=PlainTextResponse)
+def read_profile(profile_id: str, current_user: dict = Depends(require_admin_role)):
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable ou expiré")
+    return PlainTextResponse(profile["collapsed"])
@@ -1,16 +1,16 @@
-from fastapi import Depends, APIRouter, Request, HTTPException
+from fastapi import Depends, APIRouter, Request, HTTPException, Query
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import threading
 from dotenv import load_dotenv
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from pymongo import MongoClient
 from routers.auth import get_current_user
 from security.rate_limiting import public_rate_limit, private_rate_limit
 from security.input_validation import QualiteAirQuery, EpisodesQuery
 from logger import log_api_call
+from db_instrumentation import connect_pg, mongo_client
 from fastapi.responses import StreamingResponse
 import io
 import csv
@@ -46,9 +46,26 @@ DATABASE_CONFIG = {
     "port": os.getenv("PG_PORT")
 }
 
-# Configuration MongoDB
-MONGO_CLIENT = MongoClient(os.getenv("MONGO_CONNECTION_STRING"))
-MONGO_DB = MONGO_CLIENT[os.getenv("MONGO_DATABASE")]
+# Configuration MongoDB : client créé à la première utilisation, pas à l'import
+_mongo_client = None
+_mongo_lock = threading.Lock()
+
+def get_mongo_db():
+    """Base MongoDB de l'API (client et pool de connexions créés au premier appel)"""
+    global _mongo_client
+    if _mongo_client is None:
+        with _mongo_lock:
+            if _mongo_client is None:
+                _mongo_client = mongo_client(os.getenv("MONGO_CONNECTION_STRING"))
+    return _mongo_client[os.getenv("MONGO_DATABASE")]
+
+def close_mongo_client():
+    """Ferme le client MongoDB s'il a été créé (arrêt de l'API)"""
+    global _mongo_client
+    with _mongo_lock:
+        if _mongo_client is not None:
+            _mongo_client.close()
+            _mongo_client = None
 
 router = APIRouter(prefix="/qualite-air")
 
@@ -114,7 +131,7 @@ def get_qualite_air_public(
         log_api_call("/api/qualite-air/qualite-air", "anonymous", query.dict()) 
         
         # Connexion à la base de données PostgreSQL
-        conn = psycopg2.connect(**DATABASE_CONFIG)
+        conn = connect_pg(**DATABASE_CONFIG)
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         # Construction sécurisée de la requête SQL avec filtres optionnels
@@ -164,7 +181,7 @@ def get_episodes_pollution_public(
     try:
         log_api_call("/api/qualite-air/episodes-pollution", "anonymous", query.dict())
 
-        collection = MONGO_DB["EPIS_POLLUTION"]
+        collection = get_mongo_db()["EPIS_POLLUTION"]
         
         # Construction sécurisée de la requête MongoDB
         mongo_filter = {}
@@ -172,14 +189,14 @@ def get_episodes_pollution_public(
         if query.aasqa:
             mongo_filter["aasqa"] = query.aasqa
             
+        # date_ech est une date BSON : bornes converties en datetime, la date
+        # de fin est incluse jusqu'à minuit
         if query.date_debut:
-            mongo_filter["date_ech"] = {"$gte": query.date_debut}
+            mongo_filter["date_ech"] = {"$gte": datetime.fromisoformat(query.date_debut)}
             
         if query.date_fin:
-            if "date_ech" in mongo_filter:
-                mongo_filter["date_ech"]["$lte"] = query.date_fin
-            else:
-                mongo_filter["date_ech"] = {"$lte": query.date_fin}
+            date_fin = datetime.fromisoformat(query.date_fin) + timedelta(days=1)
+            mongo_filter.setdefault("date_ech", {})["$lt"] = date_fin
         
         documents = list(collection.find(mongo_filter).limit(query.limit))
         
@@ -202,7 +219,62 @@ def get_episodes_pollution_public(
     except Exception as e:
         log_api_call("/api/qualite-air/episodes-pollution", "anonymous", query.dict(), success=False)
         raise HTTPException(status_code=500, detail=f"Erreur MongoDB EPIS_POLLUTION: {str(e)}")
-    
+
+
+@router.get("/episodes-pollution/near",
+    summary="📍 Épisodes autour de moi",
+    description="🆓 Épisodes de pollution dans un rayon autour d'une position, du plus proche au plus lointain")
+@public_rate_limit()
+def get_episodes_pollution_near(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude (WGS84)"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude (WGS84)"),
+    radius_km: float = Query(10, gt=0, le=100, description="Rayon de recherche en kilomètres"),
+    polluant: Optional[str] = Query(None, description="Code polluant (optionnel)"),
+    limit: int = Query(20, ge=1, le=50, description="Nombre maximum de résultats")
+):
+    """
+    Épisodes de pollution proches d'une position (MongoDB $geoNear).
+
+    La recherche utilise l'index 2dsphere du champ `geo` : seuls les
+    épisodes situés dans le rayon sont lus, triés par distance.
+    """
+    params = {"lat": lat, "lon": lon, "radius_km": radius_km, "polluant": polluant, "limit": limit}
+    try:
+        log_api_call("/api/qualite-air/episodes-pollution/near", "anonymous", params)
+
+        geo_filter = {}
+        if polluant:
+            geo_filter["polluant"] = polluant.upper().replace(".", "")
+
+        pipeline = [
+            {"$geoNear": {
+                "near": {"type": "Point", "coordinates": [lon, lat]},
+                "key": "geo",
+                "distanceField": "distance_m",
+                "maxDistance": radius_km * 1000,
+                "spherical": True,
+                "query": geo_filter
+            }},
+            {"$limit": limit}
+        ]
+        documents = list(get_mongo_db()["EPIS_POLLUTION"].aggregate(pipeline))
+
+        for doc in documents:
+            doc["_id"] = str(doc["_id"])
+            doc["distance_km"] = round(doc.pop("distance_m") / 1000, 3)
+
+        return {
+            "message": "Données publiques - Épisodes de pollution à proximité",
+            "source": "MongoDB EPIS_POLLUTION",
+            "position": {"lat": lat, "lon": lon, "radius_km": radius_km},
+            "count": len(documents),
+            "data": documents
+        }
+    except Exception as e:
+        log_api_call("/api/qualite-air/episodes-pollution/near", "anonymous", params, success=False)
+        raise HTTPException(status_code=500, detail=f"Erreur MongoDB EPIS_POLLUTION: {str(e)}")
+
 
 @router.get("/moyennes-journalieres",
     summary="📊 Historique scraping", 
@@ -219,9 +291,9 @@ def get_moyennes_scraping(
     try:
         # DEBUG - Vérifier connexion MongoDB
         print(f"🔍 DEBUG: Tentative connexion MongoDB...")
-        print(f"🔍 DEBUG: MONGO_DB type: {type(MONGO_DB)}")
+        print(f"🔍 DEBUG: MONGO_DB type: {type(get_mongo_db())}")
         
-        collection = MONGO_DB["MOY_JOURNALIERE"]
+        collection = get_mongo_db()["MOY_JOURNALIERE"]
         print(f"🔍 DEBUG: Collection récupérée: {collection}")
         
         # Test simple count
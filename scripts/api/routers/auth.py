@@ -1,9 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from jose.exceptions import JWTError
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import asyncio
+import hashlib
+import importlib.util
+import threading
+import time
 import os
 from dotenv import load_dotenv
 
@@ -14,16 +21,38 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-# Utilisateurs depuis .env
-ADMIN_USER = os.getenv("ADMIN_USER").split(":")
-NORMAL_USER = os.getenv("NORMAL_USER").split(":")
+# Bibliothèque JWT : "jose" (python-jose, par défaut) ou "pyjwt" (plus rapide)
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+
+# Nombre de tokens décodés gardés en cache (0 : pas de cache)
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", 1024))
+
+# Utilisateurs depuis .env : "nom:hash_bcrypt" (recommandé) ou "nom:mot_de_passe"
+ADMIN_USER = os.getenv("ADMIN_USER").split(":", 1)
+NORMAL_USER = os.getenv("NORMAL_USER").split(":", 1)
+
+# Threads dédiés à bcrypt : vérifications hors de la boucle d'événements,
+# en nombre borné pour ne pas saturer le CPU sous une rafale de connexions
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", 2))
+
+# Préfixes des hash bcrypt acceptés dans la configuration
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
 
 # Configuration du hachage
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+password_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+# Hash comparé pour un utilisateur inconnu (même durée de réponse)
+DUMMY_HASH = "$2b$12$OU9zHcp657nI8Puz60EO2ORi/2Th1uTMuMQy1w9JyqjNBOKMvV0Ha"
 
 router = APIRouter(prefix="/auth", tags=["Authentification"])
 
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Contexte de hachage bcrypt, créé à la première connexion (import de passlib différé)"""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
 # Modèles Pydantic
 class LoginRequest(BaseModel):
     username: str
@@ -33,20 +62,146 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+# Mots de passe configurés en clair, hachés à la première connexion
+# (et non à l'import : bcrypt coûte plusieurs centaines de ms par hash)
+_plain_passwords = {}
+_hash_lock = threading.Lock()
+
+def configured_user(credentials: list, role: str):
+    """Utilisateur à partir de sa configuration [nom, hash bcrypt ou mot de passe]"""
+    username, secret = credentials
+    if not secret.startswith(BCRYPT_PREFIXES):
+        _plain_passwords[username] = secret
+        secret = None
+    return {"username": username, "hashed_password": secret, "role": role}
+
 # Base de données utilisateurs simple
 fake_users_db = {
-    ADMIN_USER[0]: {
-        "username": ADMIN_USER[0],
-        "hashed_password": pwd_context.hash(ADMIN_USER[1]),
-        "role": "admin"
-    },
-    NORMAL_USER[0]: {
-        "username": NORMAL_USER[0], 
-        "hashed_password": pwd_context.hash(NORMAL_USER[1]),
-        "role": "user"
-    }
+    ADMIN_USER[0]: configured_user(ADMIN_USER, "admin"),
+    NORMAL_USER[0]: configured_user(NORMAL_USER, "user")
+}
+
+def hashed_password(user: dict):
+    """Hash bcrypt d'un utilisateur, calculé une seule fois s'il est configuré en clair"""
+    if user["hashed_password"] is None:
+        with _hash_lock:
+            if user["hashed_password"] is None:
+                user["hashed_password"] = get_pwd_context().hash(_plain_passwords.pop(user["username"]))
+    return user["hashed_password"]
+
+# Bibliothèques JWT : (encode, decode), erreurs ramenées à JWTError
+# (bibliothèques importées au premier token, pas au démarrage)
+def _jose_encode(claims):
+    from jose import jwt
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def _jose_decode(token):
+    from jose import jwt
+    return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+def _pyjwt_encode(claims):
+    import jwt as pyjwt
+    return pyjwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+def _pyjwt_decode(token):
+    import jwt as pyjwt
+    try:
+        return pyjwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except pyjwt.PyJWTError as e:
+        raise JWTError(str(e))
+
+JWT_BACKENDS = {
+    "jose": (_jose_encode, _jose_decode),
+    "pyjwt": (_pyjwt_encode, _pyjwt_decode),
 }
 
+# Module importé par chaque bibliothèque (présence vérifiée sans l'importer)
+JWT_MODULES = {"jose": "jose", "pyjwt": "jwt"}
+
+def jwt_backend(name: str):
+    """
+    (encode, decode) de la bibliothèque JWT choisie, vérifiée au démarrage
+    plutôt qu'à la première connexion.
+
+    Raises:
+        RuntimeError: JWT_BACKEND inconnu ou bibliothèque non installée
+    """
+    if name not in JWT_BACKENDS:
+        raise RuntimeError(f"JWT_BACKEND={name} non pris en charge ({', '.join(JWT_BACKENDS)})")
+    if importlib.util.find_spec(JWT_MODULES[name]) is None:
+        raise RuntimeError(f"JWT_BACKEND={name} : bibliothèque absente "
+                           f"(pip install {'PyJWT' if name == 'pyjwt' else 'python-jose'})")
+    return JWT_BACKENDS[name]
+
+encode_token, decode_token = jwt_backend(JWT_BACKEND)
+
+class TokenCache:
+    """
+    Cache LRU des tokens déjà vérifiés : claims décodés, conservés jusqu'à
+    l'expiration du token (exp).
+
+    La clé est l'empreinte SHA-256 du token (le token lui-même n'est pas
+    gardé en mémoire). Un token présent dans le cache a déjà passé la
+    vérification de signature : seule l'expiration est recontrôlée.
+    """
+
+    def __init__(self, maxsize=JWT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """Claims d'un token en cache et non expiré, None sinon"""
+        if not self.maxsize:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return claims
+
+    def put(self, token, claims):
+        """Garde les claims d'un token vérifié (uniquement s'il expire)"""
+        expires_at = claims.get("exp")
+        if not self.maxsize or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+TOKEN_CACHE = TokenCache()
+
+def decode_access_token(token: str):
+    """
+    Claims d'un token JWT, vérifiés (signature et expiration) ou lus dans le
+    cache des tokens déjà vérifiés.
+
+    Raises:
+        JWTError: Token malformé, signature invalide ou expiré
+    """
+    claims = TOKEN_CACHE.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        TOKEN_CACHE.put(token, claims)
+    return claims
+
 # Fonctions utilitaires sécurisées
 def verify_password(plain_password, hashed_password):
     """
@@ -62,7 +217,7 @@ def verify_password(plain_password, hashed_password):
     Returns:
         bool: True si le mot de passe correspond, False sinon
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def authenticate_user(username: str, password: str):
     """
@@ -84,10 +239,22 @@ def authenticate_user(username: str, password: str):
         - Temps de réponse constant (protection timing attacks)
     """
     user = fake_users_db.get(username)
-    if not user or not verify_password(password, user["hashed_password"]):
+    if not user:
+        verify_password(password, DUMMY_HASH)
+        return False
+    if not verify_password(password, hashed_password(user)):
         return False
     return user
 
+async def authenticate_user_async(username: str, password: str):
+    """
+    authenticate_user exécuté dans password_executor : le calcul bcrypt ne
+    bloque pas la boucle d'événements et le nombre de vérifications
+    simultanées est borné par AUTH_HASH_WORKERS.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, authenticate_user, username, password)
+
 def create_access_token(data: dict):
     """
     Génère un token JWT signé pour authentification.
@@ -109,7 +276,7 @@ def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encode_token(to_encode)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
@@ -130,12 +297,13 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     Security:
         - Vérification signature JWT
         - Validation expiration du token
+        - Tokens déjà vérifiés servis par TOKEN_CACHE jusqu'à leur expiration
         - Contrôle existence utilisateur
         - Protection contre token replay (via expiration)
     """
     try:
-        # Décodage et validation du token JWT
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        # Décodage et validation du token JWT (cache des tokens déjà vérifiés)
+        payload = decode_access_token(credentials.credentials)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Token invalide")
@@ -149,12 +317,29 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
     return user
 
+def user_from_token(token: str):
+    """
+    Utilisateur d'un token JWT valide, hors des dépendances FastAPI
+    (middlewares).
+
+    Args:
+        token (str): Token JWT (sans le préfixe Bearer)
+
+    Returns:
+        dict|None: Données utilisateur, None si token invalide ou expiré
+    """
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        return None
+    return fake_users_db.get(payload.get("sub"))
+
 # Endpoints
 @router.post("/login", summary="🔑 Connexion",
     description="Obtenir un token JWT (user/motdepasse ou admin/motdepasse)",
     response_model=Token)
-def login(login_data: LoginRequest):
-    user = authenticate_user(login_data.username, login_data.password)
+async def login(login_data: LoginRequest):
+    user = await authenticate_user_async(login_data.username, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,51 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import os
+from routers.air_quality import DATABASE_CONFIG, get_mongo_db
+from db_instrumentation import connect_pg
+
+router = APIRouter(prefix="/health")
+
+# Délai maximal de chaque vérification de disponibilité (secondes)
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", 2))
+
+
+def check_postgres():
+    conn = connect_pg(**DATABASE_CONFIG, connect_timeout=max(int(READINESS_TIMEOUT), 1))
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def check_mongo():
+    import pymongo
+    with pymongo.timeout(READINESS_TIMEOUT):
+        get_mongo_db().command("ping")
+
+
+@router.get("/live",
+    summary="💓 Vivacité",
+    description="Le processus répond (sans appel aux bases de données)")
+def liveness():
+    return {"status": "alive"}
+
+
+@router.get("/ready",
+    summary="✅ Disponibilité",
+    description="PostgreSQL et MongoDB joignables : le worker peut recevoir du trafic (503 sinon)")
+def readiness():
+    checks = {}
+    for name, check in (("postgresql", check_postgres), ("mongodb", check_mongo)):
+        try:
+            check()
+            checks[name] = "ok"
+        except Exception as e:
+            checks[name] = f"indisponible: {type(e).__name__}"
+    ready = all(status == "ok" for status in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
+    )
@@ -2,8 +2,8 @@ from fastapi import APIRouter, Query
 from fastapi.responses import JSONResponse
 import psycopg2
 import psycopg2.extras
-from pymongo import MongoClient
 import os
+from db_instrumentation import connect_pg, mongo_client
 
 router = APIRouter()
 
@@ -14,7 +14,7 @@ def donnees_croisees(
     polluant: str = Query(None, description="Code polluant (optionnel)")
 ):
     # Connexion PostgreSQL
-    pg_conn = psycopg2.connect(
+    pg_conn = connect_pg(
         host=os.getenv("PG_HOST", "localhost"),
         port=os.getenv("PG_PORT", 5432),
         database=os.getenv("PG_DATABASE", "postgres"),
@@ -22,35 +22,49 @@ def donnees_croisees(
         password=os.getenv("PG_PASSWORD", "")
     )
     pg_cursor = pg_conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    # Construction dynamique de la requête SQL
-    sql = "SELECT * FROM indices_qualite_air_consolides"
     filters = []
     params = []
-    if zone:
-        filters.append("code_zone = %s")
-        params.append(zone)
     if polluant:
-        filters.append("(code_no2 = %s OR code_o3 = %s OR code_pm10 = %s OR code_pm25 = %s OR code_so2 = %s)")
-        params += [polluant]*5
+        # Table longue (zone, date, polluant, code) : le filtre polluant est une
+        # recherche sur l'index (polluant, code_zone, date_prise_mesure DESC)
+        sql = """
+            SELECT l.id, l.code_zone, l.date_prise_mesure, l.polluant, l.code
+            FROM indices_qualite_air_polluants l
+        """
+        filters.append("l.polluant = %s")
+        params.append(polluant.upper().replace(".", ""))
+        if zone:
+            filters.append("l.code_zone = %s")
+            params.append(zone)
+        order = " ORDER BY l.date_prise_mesure DESC"
+    else:
+        # Sans polluant : lignes consolidées (un indice par colonne), comme avant
+        # l'ajout de la table longue
+        sql = "SELECT * FROM indices_qualite_air_consolides"
+        if zone:
+            filters.append("code_zone = %s")
+            params.append(zone)
+        order = ""
     if filters:
         sql += " WHERE " + " AND ".join(filters)
-    sql += f" LIMIT {limit}"
+    sql += order + " LIMIT %s"
+    params.append(limit)
     pg_cursor.execute(sql, params)
     pg_data = pg_cursor.fetchall()
     pg_cursor.close()
     pg_conn.close()
 
     # Connexion MongoDB
-    mongo_client = MongoClient(os.getenv("MONGO_CONNECTION_STRING", "mongodb://localhost:27017/"))
-    mongo_db = mongo_client[os.getenv("MONGO_DATABASE", "pollution")]
+    client = mongo_client(os.getenv("MONGO_CONNECTION_STRING", "mongodb://localhost:27017/"))
+    mongo_db = client[os.getenv("MONGO_DATABASE", "pollution")]
     mongo_coll = mongo_db["EPIS_POLLUTION"]
     mongo_query = {}
     if zone:
-        mongo_query["properties.code_insee"] = zone
+        mongo_query["code_zone"] = zone
     if polluant:
-        mongo_query["properties.polluant"] = polluant
+        mongo_query["polluant"] = polluant.upper().replace(".", "")
     mongo_data = list(mongo_coll.find(mongo_query, {"_id": 0}).limit(limit))
-    mongo_client.close()
+    client.close()
 
     return {
         "pgsql": pg_data,
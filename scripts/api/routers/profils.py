@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 from routers.auth import get_current_user
 from security.rate_limiting import public_rate_limit, private_rate_limit
 from logger import log_api_call
+from db_instrumentation import connect_pg
 
 load_dotenv()
 router = APIRouter()
@@ -107,7 +108,7 @@ def create_profil(profil: ProfilCreate, request: Request):
     try:
         log_api_call("/api/profils/create", "anonymous", {"type_profil": profil.type_profil})
         
-        conn = psycopg2.connect(**DATABASE_CONFIG)
+        conn = connect_pg(**DATABASE_CONFIG)
         cursor = conn.cursor()
         
         # Vérifier que la commune existe
@@ -194,7 +195,7 @@ def get_recommandations(
     try:
         log_api_call("/api/recommandations", current_user["username"], {"profil_id": profil_id})
         
-        conn = psycopg2.connect(**DATABASE_CONFIG)
+        conn = connect_pg(**DATABASE_CONFIG)
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         # Récupérer le profil
@@ -377,7 +378,7 @@ def get_profil(profil_id: int, request: Request, current_user: dict = Depends(ge
     try:
         log_api_call("/api/profils", current_user["username"], {"profil_id": profil_id})
         
-        conn = psycopg2.connect(**DATABASE_CONFIG)
+        conn = connect_pg(**DATABASE_CONFIG)
         cursor = conn.cursor(cursor_factory=RealDictCursor)
         
         cursor.execute("""
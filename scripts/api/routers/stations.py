@@ -0,0 +1,222 @@
+from fastapi import APIRouter, Request, Query, HTTPException
+from collections import Counter, defaultdict
+import os
+import threading
+import time
+import unicodedata
+from dotenv import load_dotenv
+from security.rate_limiting import public_rate_limit
+from logger import log_api_call
+from metrics import register_collector
+from db_instrumentation import connect_pg
+
+load_dotenv()
+
+# Configuration PG
+DATABASE_CONFIG = {
+    "host": os.getenv("PG_HOST"),
+    "database": os.getenv("PG_DATABASE"),
+    "user": os.getenv("PG_USER"),
+    "password": os.getenv("PG_PASSWORD"),
+    "port": os.getenv("PG_PORT")
+}
+
+# Durée de validité de l'index en mémoire (secondes) avant rechargement
+STATION_INDEX_TTL = int(os.getenv("STATION_INDEX_TTL", 300))
+
+# Part minimale des trigrammes de la saisie présents dans le nom pour une
+# correspondance approchée (équivalent du word_similarity de pg_trgm)
+SIMILARITY_THRESHOLD = 0.5
+
+router = APIRouter(prefix="/stations")
+
+
+# ========== FUNCTIONS HELPERS ==========
+def normaliser(texte: str) -> str:
+    """Minuscules, sans accents ni espaces multiples : 'Caen Chemin-Vert' -> 'caen chemin-vert'"""
+    sans_accents = unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode("ascii")
+    return " ".join(sans_accents.lower().split())
+
+
+def trigrammes(texte: str) -> set:
+    """Trigrammes d'un texte normalisé, calculés mot par mot comme pg_trgm"""
+    result = set()
+    for mot in texte.replace("-", " ").split():
+        padded = f"  {mot} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def score_sous_chaine(saisie: str, nom: str) -> float:
+    """
+    Score d'une saisie contenue dans le nom : part du mot (ou des mots)
+    couverte par la saisie ('ca' dans 'lucas' -> 0.4, 'caen' dans 'caen ...' -> 1.0)
+    """
+    debut = nom.find(saisie)
+    if debut < 0:
+        return 0.0
+    debut_mot = nom.rfind(" ", 0, debut) + 1
+    fin_mot = nom.find(" ", debut + len(saisie))
+    if fin_mot < 0:
+        fin_mot = len(nom)
+    return len(saisie) / (fin_mot - debut_mot)
+
+
+class StationIndex:
+    """
+    Index en mémoire des noms de stations pour l'autocomplétion.
+
+    Les stations (et leur commune) sont lues une fois dans qualite_air puis
+    indexées par trigrammes : une recherche ne parcourt que les stations
+    partageant au moins un trigramme avec la saisie (toutes les stations pour
+    une saisie de moins de 3 caractères), sans aller-retour vers
+    PostgreSQL. L'index est rechargé après STATION_INDEX_TTL secondes.
+
+    Classement des résultats :
+        1. Nom commençant par la saisie
+        2. Un mot du nom commençant par la saisie
+        3. Saisie contenue dans le nom
+        4. Trigrammes de la saisie présents à SIMILARITY_THRESHOLD (fautes de frappe)
+
+    Le score d'une station est la part des trigrammes de la saisie présents
+    dans son nom, ou la part du mot couverte par la saisie si elle y est
+    contenue (le plus élevé des deux).
+    """
+
+    def __init__(self, ttl: int = STATION_INDEX_TTL):
+        self.ttl = ttl
+        self._stations = []
+        self._noms = []
+        self._postings = defaultdict(set)
+        self._charge_le = None  # Jamais chargé
+        self._lock = threading.Lock()
+
+    def _charger(self):
+        conn = connect_pg(**DATABASE_CONFIG)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT DISTINCT qa.station_nom, qa.code_insee, c.nom_commune
+                FROM qualite_air qa
+                LEFT JOIN communes c ON c.code_insee = qa.code_insee
+                WHERE qa.station_nom IS NOT NULL
+            """)
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        stations, noms, postings = [], [], defaultdict(set)
+        for station_nom, code_insee, commune in rows:
+            nom = normaliser(f"{station_nom} {commune or ''}")
+            for gram in trigrammes(nom):
+                postings[gram].add(len(stations))
+            stations.append({"station_nom": station_nom, "code_insee": code_insee, "commune": commune})
+            noms.append(nom)
+
+        # Remplacement en bloc : les recherches en cours gardent l'ancienne version
+        self._stations, self._noms, self._postings = stations, noms, postings
+        self._charge_le = time.monotonic()
+
+    def _perime(self):
+        return self._charge_le is None or time.monotonic() - self._charge_le >= self.ttl
+
+    def _a_jour(self):
+        if not self._perime():
+            return
+        with self._lock:
+            if self._perime():
+                self._charger()
+
+    def rechercher(self, q: str, limit: int = 10) -> list:
+        """
+        Stations correspondant à une saisie, classées par pertinence.
+
+        Args:
+            q (str): Saisie utilisateur (nom partiel de station ou de commune)
+            limit (int): Nombre maximum de résultats
+
+        Returns:
+            list: Stations avec leur score de similarité
+        """
+        saisie = normaliser(q)
+        if not saisie:
+            return []  # Saisie faite uniquement d'espaces
+        self._a_jour()
+        saisie_grams = trigrammes(saisie)
+        noms = self._noms
+
+        communs = Counter()
+        for gram in saisie_grams:
+            communs.update(self._postings.get(gram, ()))
+
+        # Moins de 3 caractères : aucun trigramme intérieur à un mot ("ca" dans
+        # "lucas"), parcours linéaire pour trouver les sous-chaînes comme ILIKE
+        if len(saisie) < 3:
+            indices = [i for i, nom in enumerate(noms) if saisie in nom]
+        else:
+            indices = communs
+
+        candidats = []
+        for i in indices:
+            similarite = communs.get(i, 0) / max(len(saisie_grams), 1)
+            nom = noms[i]
+            if nom.startswith(saisie):
+                rang = 0
+            elif f" {saisie}" in nom:
+                rang = 1
+            elif saisie in nom:
+                rang = 2
+            elif similarite >= SIMILARITY_THRESHOLD:
+                rang = 3
+            else:
+                continue
+            if rang < 3:
+                similarite = max(similarite, score_sous_chaine(saisie, nom))
+            candidats.append((rang, -similarite, nom, i))
+
+        candidats.sort()
+        return [
+            {**self._stations[i], "score": round(-moins_similarite, 3)}
+            for _, moins_similarite, _, i in candidats[:limit]
+        ]
+
+
+    def collect(self):
+        """Statistiques du cache pour /metrics"""
+        age = time.monotonic() - self._charge_le if self._charge_le is not None else 0
+        return [
+            ("station_index_entries", "gauge", "Stations dans l'index en mémoire", {}, len(self._stations)),
+            ("station_index_age_seconds", "gauge", "Âge de l'index des stations", {}, round(age, 1)),
+        ]
+
+
+STATION_INDEX = StationIndex()
+register_collector(STATION_INDEX.collect)
+
+
+@router.get("/search",
+    summary="🔎 Recherche de stations",
+    description="🆓 Autocomplétion des noms de stations de mesure (nom ou commune), résultats classés par pertinence")
+@public_rate_limit()
+def search_stations(
+    request: Request,
+    q: str = Query(..., min_length=2, max_length=100, description="Nom partiel de station ou de commune"),
+    limit: int = Query(10, ge=1, le=50, description="Nombre maximum de résultats")
+):
+    """Recherche classée dans l'index en mémoire des stations"""
+    try:
+        log_api_call("/api/stations/search", "anonymous", {"q": q, "limit": limit})
+
+        start = time.perf_counter()
+        stations = STATION_INDEX.rechercher(q, limit)
+        duree_ms = (time.perf_counter() - start) * 1000
+
+        return {
+            "query": q,
+            "count": len(stations),
+            "duree_ms": round(duree_ms, 3),
+            "data": stations
+        }
+    except Exception as e:
+        log_api_call("/api/stations/search", "anonymous", {"q": q, "limit": limit}, success=False)
+        raise HTTPException(status_code=500, detail=f"Erreur recherche stations: {str(e)}")
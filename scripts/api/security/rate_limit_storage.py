@@ -0,0 +1,211 @@
+"""
+Stockages du limiteur de débit (algorithme GCRA).
+
+GCRA (Generic Cell Rate Algorithm) : pour une limite de N requêtes par
+période P, chaque client a une seule valeur stockée, l'heure d'arrivée
+théorique (TAT) de sa prochaine requête. Chaque requête avance la TAT de
+P/N ; elle est refusée si la TAT dépasse maintenant + P. Un client inactif
+peut envoyer N requêtes d'affilée, puis une toutes les P/N : sur toute durée
+D, au plus N + D·N/P requêtes sont acceptées, sans remise à zéro en début de
+fenêtre fixe. Chaque vérification coûte O(1) : une lecture, une écriture.
+
+Stockages (RATE_LIMIT_STORAGE) :
+    - memory://              : dictionnaire du processus (un seul worker)
+    - sqlite:///chemin.db    : fichier SQLite partagé par les workers d'une
+                               même machine (sqlite:////dev/shm/rate_limit.db
+                               pour un fichier en mémoire partagée)
+    - redis://hôte:6379/0    : Redis (ou compatible), partagé entre machines ;
+                               GCRA exécuté côté serveur par un script Lua
+
+Functions:
+    gcra: Décision GCRA à partir de la TAT stockée
+    storage_from_uri: Stockage correspondant à une URI RATE_LIMIT_STORAGE
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+# Nombre de vérifications entre deux purges des clés expirées (memory, sqlite)
+PURGE_EVERY = 1000
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float  # secondes avant la prochaine requête acceptée
+
+
+def now_us():
+    return time.time_ns() // 1000
+
+
+def gcra(tat, now, limit, period):
+    """
+    Décision GCRA pour une requête à l'instant `now`.
+
+    Les instants sont des entiers en microsecondes : pas d'erreur d'arrondi
+    cumulée sur la TAT, et mêmes calculs que le script Redis.
+
+    Args:
+        tat (int|None): Heure d'arrivée théorique stockée (None : client inconnu)
+        now (int): Instant de la requête (µs)
+        limit (int): Requêtes autorisées par période
+        period (int): Durée de la période (µs)
+
+    Returns:
+        tuple: (nouvelle TAT à stocker ou None si refusée, RateLimitResult)
+    """
+    interval = period // limit
+    new_tat = max(tat or now, now) + interval
+    allow_at = new_tat - period
+    if now < allow_at:
+        return None, RateLimitResult(False, 0, (allow_at - now) / 1_000_000)
+    return new_tat, RateLimitResult(True, (now - allow_at) // interval, 0.0)
+
+
+class MemoryStorage:
+    """TAT par clé dans un dictionnaire : limite propre à chaque worker"""
+
+    blocking = False
+
+    def __init__(self):
+        self._tats = {}
+        self._lock = threading.Lock()
+        self._checks = 0
+
+    def acquire(self, key, limit, period):
+        now = now_us()
+        with self._lock:
+            new_tat, result = gcra(self._tats.get(key), now, limit, int(period * 1_000_000))
+            if new_tat is not None:
+                self._tats[key] = new_tat
+            self._checks += 1
+            if self._checks % PURGE_EVERY == 0:
+                # Une TAT passée équivaut à une clé absente
+                self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+        return result
+
+
+class SQLiteStorage:
+    """
+    TAT par clé dans une table SQLite, partagée par les workers de la machine.
+
+    Chaque vérification est une transaction BEGIN IMMEDIATE (verrou
+    d'écriture) : lecture et mise à jour de la TAT sont atomiques entre
+    processus. Une connexion par thread ; journal WAL et synchronous=OFF
+    (l'état du limiteur peut être perdu sans conséquence en cas de crash).
+    """
+
+    blocking = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    key TEXT PRIMARY KEY,
+                    tat INTEGER NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self._local.conn = conn
+            self._local.checks = 0
+        return conn
+
+    def acquire(self, key, limit, period):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = now_us()
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            new_tat, result = gcra(row[0] if row else None, now, limit, int(period * 1_000_000))
+            if new_tat is not None:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_tat)
+                )
+            self._local.checks += 1
+            if self._local.checks % PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+# GCRA côté serveur, en microsecondes (horloge du serveur Redis, commune à
+# tous les workers). ARGV : limite, période (µs). Retour : {autorisé,
+# restant, attente µs}. La clé expire quand la TAT est atteinte.
+GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+local period = tonumber(ARGV[2])
+local interval = math.floor(period / tonumber(ARGV[1]))
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, 0, math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat),
+           'PX', math.max(math.ceil((new_tat - now) / 1000), 1))
+return {1, math.floor((now - allow_at) / interval + 1e-6), 0}
+"""
+
+
+class RedisStorage:
+    """TAT par clé dans Redis, mise à jour atomiquement par GCRA_SCRIPT"""
+
+    blocking = True
+
+    def __init__(self, uri, prefix="rate_limit:"):
+        import redis  # Dépendance optionnelle, requise pour ce stockage seulement
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(uri, socket_timeout=1, socket_connect_timeout=1)
+        self._script = self.client.register_script(GCRA_SCRIPT)
+
+    def acquire(self, key, limit, period):
+        allowed, remaining, retry_after_us = self._script(
+            keys=[self.prefix + key], args=[limit, int(period * 1_000_000)]
+        )
+        return RateLimitResult(bool(allowed), int(remaining), int(retry_after_us) / 1_000_000)
+
+
+def storage_from_uri(uri):
+    """
+    Stockage correspondant à une URI RATE_LIMIT_STORAGE.
+
+    Raises:
+        ValueError: Schéma non pris en charge
+    """
+    scheme = urlparse(uri).scheme
+    if scheme == "memory":
+        return MemoryStorage()
+    if scheme == "sqlite":
+        # Convention SQLAlchemy : sqlite:///relatif.db, sqlite:////absolu.db
+        path = uri.split("://", 1)[1][1:]
+        if not path:
+            raise ValueError("RATE_LIMIT_STORAGE sqlite : chemin du fichier manquant")
+        return SQLiteStorage(path)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisStorage(uri)
+    raise ValueError(f"RATE_LIMIT_STORAGE non pris en charge : {uri} (memory://, sqlite:///, redis://)")
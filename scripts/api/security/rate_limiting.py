@@ -4,6 +4,12 @@ Module de limitation de taux (rate limiting) pour l'API.
 Ce module implémente une protection contre l'abus d'endpoints en limitant
 le nombre de requêtes par minute selon le type d'endpoint et l'utilisateur.
 
+Les compteurs sont gardés dans le stockage désigné par RATE_LIMIT_STORAGE
+(voir rate_limit_storage.py) : memory:// par défaut (un compteur par
+worker), sqlite:/// pour partager la limite entre les workers d'une machine,
+redis:// entre plusieurs machines. Avec N workers et le stockage memory://,
+la limite réelle est N fois la limite affichée.
+
 Classes/Functions:
     setup_rate_limiting: Configuration du rate limiting sur l'app FastAPI
     public_rate_limit: Décorateur pour endpoints publics (100 req/min)
@@ -14,16 +20,123 @@ Strategy:
     - Endpoints publics: limite généreuse pour l'acquisition
     - Endpoints premium: limite plus stricte pour éviter l'abus
     - Endpoints admin: limite élevée pour les opérations de maintenance
-    - Limitation par adresse IP source
+    - Limitation par adresse IP source et par endpoint
+    - Algorithme GCRA : rafale de N requêtes puis N par période, O(1) par requête
 """
 
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import FastAPI
+import functools
+import inspect
+import math
+import os
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from logger import logger
+from metrics import Counter
+from security.rate_limit_storage import storage_from_uri
+
+# Stockage des compteurs : memory://, sqlite:///chemin.db ou redis://hôte:port/db
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "memory://")
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+RATE_LIMITED = Counter(
+    "api_rate_limited_total", "Requêtes refusées par la limitation de débit", ("limit",)
+)
+
+
+def parse_limit(limit_string):
+    """'100/minute' -> (100, 60)"""
+    count, _, period = limit_string.partition("/")
+    return int(count), PERIODS[period.strip().rstrip("s")]
+
+
+def get_remote_address(request: Request):
+    """Adresse IP du client (127.0.0.1 si inconnue)"""
+    return request.client.host if request.client else "127.0.0.1"
+
+
+class RateLimitExceeded(HTTPException):
+    def __init__(self, limit_string, retry_after):
+        super().__init__(
+            status_code=429,
+            detail=f"Rate limit exceeded: {limit_string}",
+            headers={"Retry-After": str(max(math.ceil(retry_after), 1))}
+        )
+
+
+async def _rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Réponse 429 (même corps que la version slowapi précédente)"""
+    return JSONResponse({"error": exc.detail}, status_code=429, headers=exc.headers)
+
+
+class RateLimiter:
+    """Limiteur GCRA : décorateur limit() par endpoint, compteurs dans `storage`"""
+
+    def __init__(self, storage, key_func=get_remote_address):
+        self.storage = storage
+        self.key_func = key_func
+
+    def hit(self, key, limit_string):
+        """
+        Compte une requête pour `key`.
+
+        Returns:
+            RateLimitResult|None: Décision, None si le stockage est
+            indisponible (la requête est alors acceptée)
+        """
+        count, period = parse_limit(limit_string)
+        try:
+            return self.storage.acquire(key, count, period)
+        except Exception as e:
+            logger.error(f"Rate limiting indisponible ({type(self.storage).__name__}): {e}")
+            return None
+
+    def _check(self, result, limit_string):
+        if result is not None and not result.allowed:
+            RATE_LIMITED.inc(limit=limit_string)
+            raise RateLimitExceeded(limit_string, result.retry_after)
+
+    def limit(self, limit_string):
+        """
+        Décorateur limitant un endpoint à `limit_string` ('100/minute') par
+        client. L'endpoint doit déclarer un paramètre `request: Request`.
+        """
+        parse_limit(limit_string)  # Erreur dès l'import si la limite est mal écrite
+
+        def decorator(func):
+            if "request" not in inspect.signature(func).parameters:
+                raise TypeError(f"{func.__name__} : paramètre 'request: Request' requis pour le rate limiting")
+            scope = f"{func.__module__}.{func.__name__}"
+
+            def key(kwargs):
+                return f"{scope}:{self.key_func(kwargs['request'])}"
+
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if self.storage.blocking:
+                        result = await run_in_threadpool(self.hit, key(kwargs), limit_string)
+                    else:
+                        result = self.hit(key(kwargs), limit_string)
+                    self._check(result, limit_string)
+                    return await func(*args, **kwargs)
+                return async_wrapper
+
+            # Endpoint synchrone : déjà exécuté dans un thread par FastAPI
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                self._check(self.hit(key(kwargs), limit_string), limit_string)
+                return func(*args, **kwargs)
+            return wrapper
+
+        return decorator
+
 
 # Configuration du limiteur
-limiter = Limiter(key_func=get_remote_address)
+limiter = RateLimiter(storage_from_uri(RATE_LIMIT_STORAGE))
 
 def setup_rate_limiting(app: FastAPI):
     """
@@ -36,7 +149,7 @@ def setup_rate_limiting(app: FastAPI):
         app (FastAPI): Instance de l'application FastAPI
         
     Returns:
-        Limiter: Instance du limiteur configuré
+        RateLimiter: Instance du limiteur configuré
         
     Note:
         Doit être appelé lors de l'initialisation de l'app dans main.py
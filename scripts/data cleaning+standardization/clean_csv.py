@@ -1,9 +1,22 @@
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet optionnel : le CSV nettoyé reste produit
+    pa = None
+    pq = None
+
 dossier_source = "../data/file-indices_qualite_air-01-06-2024_01-06-2025"
 dossier_sortie = "../data/file-indices_nettoyes"
-os.makedirs(dossier_sortie, exist_ok=True)
+
+# Nombre de lignes lues à la fois (mémoire bornée quelle que soit la taille du fichier)
+TAILLE_CHUNK = int(os.getenv("CLEAN_CSV_CHUNKSIZE", 200_000))
+# Nombre de fichiers traités en parallèle
+NB_WORKERS = int(os.getenv("CLEAN_CSV_WORKERS", os.cpu_count() or 1))
 
 colonnes_a_supprimer = [
     "date_maj", "coul_qual", "date_ech",
@@ -15,42 +28,187 @@ nouveaux_noms = [
     "date_prise_mesure", "qualite_air", "libelle_zone", "source", "type_zone"
 ]
 
-for fichier in os.listdir(dossier_source):
-    if fichier.endswith(".csv"):
-        chemin = os.path.join(dossier_source, fichier)
-        print(f"Nettoyage de {chemin} ...")
-        df = pd.read_csv(chemin)
-        
-        # Supprimer les colonnes indésirables
-        colonnes_presentes = [col for col in colonnes_a_supprimer if col in df.columns]
-        df = df.drop(columns=colonnes_presentes)
-        print(f"Colonnes supprimées : {colonnes_presentes}")
-        
-        # Supprimer la 6e colonne (index 5) si elle existe encore
-        if len(df.columns) > 6:
-            colonne_supprimee = df.columns[6]
-            df = df.drop(df.columns[6], axis=1)
-            print(f"7e colonne '{colonne_supprimee}' supprimée pour : {fichier}")
-        
-        # Renommer les colonnes (si le nombre correspond)
-        if len(df.columns) == len(nouveaux_noms):
-            df.columns = nouveaux_noms
-            print(f"✅ Colonnes renommées pour : {fichier}")
+# Types explicites des colonnes nettoyées (plus d'inférence par pandas).
+# Les noms sont décalés par rapport au contenu réel des CSV sources, et
+# initialisation_complete.py réaligne ce décalage en SQL : les types suivent
+# donc ce que contient chaque colonne, pas son nom.
+#   date_prise_mesure : code de zone (5 chiffres, zéros initiaux conservés)
+#   qualite_air       : date de l'indice, 'AAAA/MM/JJ'
+#   libelle_zone      : libellé de qualité (Bon, Moyen, ...)
+#   source            : libellé de la zone
+#   type_zone         : source (nom de l'AASQA)
+types_colonnes = {
+    "aasqa": "category",
+    "no2": "Int8",
+    "o3": "Int8",
+    "pm10": "Int8",
+    "pm25": "Int8",
+    "code_zone": "string",
+    "date_prise_mesure": "string",
+    "libelle_zone": "category",
+    "source": "string",
+    "type_zone": "category",
+}
+# Colonnes contenant une date (lues en texte puis converties avec FORMAT_DATE)
+colonnes_dates = ["qualite_air"]
+# Format des dates des CSV sources, conservé dans le CSV nettoyé (attendu par
+# initialisation_complete.py)
+FORMAT_DATE = "%Y/%m/%d"
+# Nombre maximum d'exemples de dates illisibles cités par fichier
+MAX_EXEMPLES_DATES = 5
+
+ordre_sortie = ["source"] + [nom for nom in nouveaux_noms if nom != "source"] + ["fichier_source"]
+
+
+def colonnes_utiles(chemin):
+    """
+    Détermine les colonnes à lire à partir de l'en-tête seul.
+
+    Applique les règles historiques (suppression par nom puis de la 7e colonne
+    restante) sur l'en-tête pour obtenir la correspondance nom source -> nom
+    nettoyé, sans charger les données.
+
+    Returns:
+        dict|None: {colonne_source: nouveau_nom}, None si l'en-tête est inattendu
+    """
+    entete = list(pd.read_csv(chemin, nrows=0).columns)
+    restantes = [col for col in entete if col not in colonnes_a_supprimer]
+    if len(restantes) > 6:
+        del restantes[6]
+    if len(restantes) != len(nouveaux_noms):
+        return None
+    return dict(zip(restantes, nouveaux_noms))
+
+
+def schema_parquet():
+    """Schéma Arrow fixe pour que tous les chunks d'un fichier soient compatibles"""
+    dictionnaire = pa.dictionary(pa.int32(), pa.string())
+    champs = []
+    for nom in ordre_sortie:
+        if nom in colonnes_dates:
+            champs.append(pa.field(nom, pa.date32()))
+        elif types_colonnes.get(nom) == "category" or nom == "fichier_source":
+            champs.append(pa.field(nom, dictionnaire))
+        elif types_colonnes.get(nom) == "Int8":
+            champs.append(pa.field(nom, pa.int8()))
         else:
-            print(f"⚠️ Nombre de colonnes inattendu dans {fichier} : {len(df.columns)}")
-            continue
-        
-        # Ajoute la colonne fichier_source
-        df["fichier_source"] = fichier
-        
-        # Mettre 'source' en première colonne
-        colonnes = list(df.columns)
-        colonnes.remove("source")
-        colonnes = ["source"] + colonnes
-        df = df[colonnes]
-        
-        chemin_sortie = os.path.join(dossier_sortie, fichier)
-        df.to_csv(chemin_sortie, index=False)
-        print(f"Fichier sauvegardé : {chemin_sortie}\n")
-
-print("Tous les fichiers nettoyés sont dans le dossier file-indices_nettoyes.")
\ No newline at end of file
+            champs.append(pa.field(nom, pa.string()))
+    return pa.schema(champs)
+
+
+def convertir_dates(df):
+    """
+    Convertit les colonnes de dates avec FORMAT_DATE.
+
+    Une date renseignée mais illisible devient NaT (vide dans le CSV nettoyé) :
+    ces valeurs sont comptées et renvoyées pour être signalées.
+
+    Returns:
+        tuple: (nombre de dates illisibles, valeurs d'origine illisibles)
+    """
+    illisibles = 0
+    exemples = []
+    for col in colonnes_dates:
+        originale = df[col]
+        df[col] = pd.to_datetime(originale, format=FORMAT_DATE, errors="coerce")
+        perdues = originale[originale.notna() & df[col].isna()]
+        illisibles += len(perdues)
+        exemples.extend(perdues.unique()[:MAX_EXEMPLES_DATES])
+    return illisibles, exemples
+
+
+def nettoyer_fichier(fichier):
+    """
+    Nettoie un fichier CSV AASQA par chunks typés.
+
+    Écrit le CSV nettoyé et, si pyarrow est disponible, un fichier Parquet
+    du même nom dans le dossier de sortie.
+
+    Returns:
+        tuple: (fichier, nombre de lignes ou None si ignoré, message)
+    """
+    chemin = os.path.join(dossier_source, fichier)
+    correspondance = colonnes_utiles(chemin)
+    if correspondance is None:
+        return fichier, None, f"⚠️ Nombre de colonnes inattendu dans {fichier}"
+
+    inverse = {nouveau: source for source, nouveau in correspondance.items()}
+    dtypes = {inverse[nom]: type_col for nom, type_col in types_colonnes.items()}
+    dtypes.update({inverse[nom]: "string" for nom in colonnes_dates})
+
+    chemin_sortie = os.path.join(dossier_sortie, fichier)
+    chemin_parquet = os.path.splitext(chemin_sortie)[0] + ".parquet"
+    schema = schema_parquet() if pa is not None else None
+    writer = None
+    lignes = 0
+    dates_illisibles = 0
+    exemples_dates = []
+
+    try:
+        chunks = pd.read_csv(
+            chemin,
+            usecols=list(correspondance),
+            dtype=dtypes,
+            chunksize=TAILLE_CHUNK,
+        )
+        for numero, df in enumerate(chunks):
+            df = df.rename(columns=correspondance)
+            illisibles, exemples = convertir_dates(df)
+            dates_illisibles += illisibles
+            exemples_dates.extend(exemples[:MAX_EXEMPLES_DATES - len(exemples_dates)])
+            df["fichier_source"] = fichier
+            df = df[ordre_sortie]
+
+            df.to_csv(
+                chemin_sortie,
+                mode="w" if numero == 0 else "a",
+                header=numero == 0,
+                index=False,
+                date_format=FORMAT_DATE,
+            )
+
+            if schema is not None:
+                df_parquet = df.copy()
+                for col in colonnes_dates:
+                    df_parquet[col] = df_parquet[col].dt.date
+                table = pa.Table.from_pandas(df_parquet, schema=schema, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(chemin_parquet, schema, compression="snappy")
+                writer.write_table(table)
+
+            lignes += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    sorties = chemin_sortie + (f" + {os.path.basename(chemin_parquet)}" if writer is not None else "")
+    message = f"Fichier sauvegardé : {sorties} ({lignes:,} lignes)"
+    if dates_illisibles:
+        message += (f"\n⚠️ {fichier} : {dates_illisibles:,} dates illisibles laissées vides "
+                    f"(format attendu {FORMAT_DATE}, ex. {', '.join(map(repr, exemples_dates))})")
+    return fichier, lignes, message
+
+
+def main():
+    os.makedirs(dossier_sortie, exist_ok=True)
+    if pa is None:
+        print("⚠️ pyarrow non installé : pas d'export Parquet")
+
+    fichiers = sorted(f for f in os.listdir(dossier_source) if f.endswith(".csv"))
+    print(f"Nettoyage de {len(fichiers)} fichiers ({NB_WORKERS} workers) ...")
+
+    with ProcessPoolExecutor(max_workers=NB_WORKERS) as executor:
+        futures = {executor.submit(nettoyer_fichier, fichier): fichier for fichier in fichiers}
+        for future in as_completed(futures):
+            try:
+                fichier, lignes, message = future.result()
+            except Exception as e:
+                print(f"❌ Erreur sur {futures[future]} : {e}")
+                continue
+            print(message)
+
+    print("Tous les fichiers nettoyés sont dans le dossier file-indices_nettoyes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,142 @@
+import codecs
 import json
 import re
 import os
 from pathlib import Path
 
+# Début d'une feature GeoJSON, quel que soit l'espacement autour des clés
+FEATURE_START = re.compile(r'\{\s*"type"\s*:\s*"Feature"\s*[,}]')
+
+# Taille des blocs lus sur le disque (le fichier n'est jamais chargé en entier)
+CHUNK_SIZE = 1024 * 1024
+
+# Caractères de structure tolérés entre deux features (séparateurs, fin de tableau...)
+SEPARATEURS = ' \t\r\n,[]{}'
+
+# Nombre maximum de zones ignorées détaillées dans la console
+MAX_SPANS_AFFICHES = 20
+
+
+class FeatureScanner:
+    """
+    Moteur de récupération des features d'un fichier JSON corrompu.
+
+    Le fichier est lu par blocs et décodé de façon incrémentale. Chaque
+    occurrence de '{"type":"Feature"' est décodée avec json.JSONDecoder.raw_decode :
+    une feature valide est renvoyée immédiatement, une zone illisible est
+    ignorée jusqu'à la prochaine occurrence. Chaque caractère n'est parcouru
+    qu'un nombre constant de fois : le coût est linéaire en la taille du fichier.
+
+    Attributes:
+        skipped_spans (list): Zones ignorées, en tuples (octet_debut, octet_fin)
+        bytes_read (int): Nombre d'octets lus
+    """
+
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.skipped_spans = []
+        self.bytes_read = 0
+
+        self.buf = ""
+        self.eof = False
+        # Curseur (index caractère, offset octet) pour convertir les positions
+        # du buffer en offsets dans le fichier sans ré-encoder le buffer entier
+        self._cursor_char = 0
+        self._cursor_byte = 0
+
+    def _read_more(self, size):
+        """Ajoute un bloc au buffer, retourne False en fin de fichier"""
+        chunk = self.fileobj.read(size)
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self.buf += self.text_decoder.decode(b'', final=True)
+            self.eof = True
+            return False
+        self.buf += self.text_decoder.decode(chunk)
+        return True
+
+    def _byte_offset(self, index):
+        """Offset en octets d'un index du buffer (appels à index croissants)"""
+        self._cursor_byte += len(self.buf[self._cursor_char:index].encode('utf-8'))
+        self._cursor_char = index
+        return self._cursor_byte
+
+    def _skip(self, start, end):
+        """Enregistre une zone ignorée [start, end[ du buffer"""
+        if end > start:
+            self.skipped_spans.append((self._byte_offset(start), self._byte_offset(end)))
+
+    def _compact(self, pos):
+        """Libère la partie déjà traitée du buffer"""
+        self._byte_offset(pos)
+        self.buf = self.buf[pos:]
+        self._cursor_char = 0
+
+    def __iter__(self):
+        pos = 0           # Tout ce qui précède pos est traité
+        scan_from = 0     # Recherche de la prochaine feature à partir d'ici
+        started = False   # L'en-tête avant la première feature n'est pas une erreur
+        read_size = self.chunk_size
+
+        while True:
+            match = FEATURE_START.search(self.buf, scan_from)
+
+            if match is None:
+                if self.eof:
+                    break
+                # Garder la fin du buffer : un début de feature peut être coupé
+                scan_from = max(pos, len(self.buf) - 64)
+                if pos >= self.chunk_size:
+                    scan_from -= pos
+                    self._compact(pos)
+                    pos = 0
+                self._read_more(self.chunk_size)
+                continue
+
+            start = match.start()
+            if started and self.buf[pos:start].strip(SEPARATEURS):
+                self._skip(pos, start)
+            started = True
+            pos = start
+
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, start)
+            except json.JSONDecodeError:
+                following = FEATURE_START.search(self.buf, start + 1)
+                if following is None and not self.eof:
+                    # La feature est peut-être simplement coupée par le bloc courant
+                    scan_from = start
+                    self._read_more(read_size)
+                    read_size *= 2
+                    continue
+                end = following.start() if following else len(self.buf)
+                self._skip(start, end)
+                pos = scan_from = end
+                read_size = self.chunk_size
+                continue
+
+            read_size = self.chunk_size
+            if isinstance(obj, dict) and 'geometry' in obj and 'properties' in obj:
+                yield obj
+            else:
+                self._skip(start, end)
+            pos = scan_from = end
+
+        # Contenu résiduel après la dernière feature (fichier tronqué)
+        if started and self.buf[pos:].strip(SEPARATEURS):
+            self._skip(pos, len(self.buf))
+
+
 def fix_corrupted_json_to_geojson(input_filepath, output_filepath=None):
     """
     Répare un fichier JSON corrompu et le convertit en GeoJSON valide
+
+    Les features récupérées sont écrites au fil de l'eau dans le fichier de
+    sortie ; les zones illisibles sont ignorées et leurs offsets (en octets)
+    sont affichés.
     """
     
     if output_filepath is None:
@@ -14,56 +145,10 @@ def fix_corrupted_json_to_geojson(input_filepath, output_filepath=None):
     print(f"🔧 Réparation du fichier: {os.path.basename(input_filepath)}")
     
     try:
-        # Lire le fichier corrompu
-        with open(input_filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        print(f"📄 Taille du fichier: {len(content)} caractères")
-        print(f"🔍 Début du contenu: {content[:200]}...")
+        print(f"📄 Taille du fichier: {os.path.getsize(input_filepath)} octets")
         
-        features = []
-        
-        # Si le contenu commence déjà par un tableau JSON
-        if content.strip().startswith('['):
-            try:
-                # Essayer de parser directement comme un tableau de features
-                data = json.loads(content)
-                if isinstance(data, list):
-                    features = data
-                    print(f"✅ Tableau JSON détecté avec {len(features)} éléments")
-            except json.JSONDecodeError as e:
-                print(f"⚠️ Erreur de parsing du tableau: {e}")
-        
-        # Si c'est déjà un GeoJSON complet
-        elif content.strip().startswith('{"type":"FeatureCollection"'):
-            try:
-                data = json.loads(content)
-                if data.get('type') == 'FeatureCollection':
-                    features = data.get('features', [])
-                    print(f"✅ GeoJSON détecté avec {len(features)} features")
-            except json.JSONDecodeError as e:
-                print(f"⚠️ Erreur de parsing du GeoJSON: {e}")
-        
-        # Sinon, essayer de réparer le format corrompu
-        else:
-            # Pattern pour extraire les features complètes
-            feature_pattern = r'(\{"type":"Feature".*?"geometry":\{"type":"Point","coordinates":\[[^\]]+\]\}\})'
-            matches = re.findall(feature_pattern, content, re.DOTALL)
-            
-            print(f"🔍 Trouvé {len(matches)} features potentielles")
-            
-            for match in matches:
-                try:
-                    feature = json.loads(match.strip())
-                    if (feature.get('type') == 'Feature' and 
-                        'geometry' in feature and 
-                        'properties' in feature):
-                        features.append(feature)
-                except json.JSONDecodeError:
-                    continue
-        
-        # Créer la structure GeoJSON complète
-        geojson = {
+        # En-tête GeoJSON, les features sont ajoutées une par une
+        header = {
             "type": "FeatureCollection",
             "name": f"repaired_data_{os.path.basename(input_filepath).replace('.json', '')}",
             "crs": {
@@ -71,18 +156,36 @@ def fix_corrupted_json_to_geojson(input_filepath, output_filepath=None):
                 "properties": {
                     "name": "urn:ogc:def:crs:EPSG::3857"
                 }
-            },
-            "features": features
+            }
         }
+        header_json = json.dumps(header, ensure_ascii=False)
+        
+        features_count = 0
+        with open(input_filepath, 'rb') as source, \
+                open(output_filepath, 'w', encoding='utf-8') as f:
+            scanner = FeatureScanner(source)
+            
+            f.write(header_json[:-1] + ', "features": [')
+            for feature in scanner:
+                f.write(',\n' if features_count else '\n')
+                f.write(json.dumps(feature, ensure_ascii=False))
+                features_count += 1
+            f.write('\n]}\n')
         
-        # Sauvegarder le fichier réparé
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            json.dump(geojson, f, indent=2, ensure_ascii=False)
+        # Rapport des zones ignorées (offsets en octets dans le fichier source)
+        spans = scanner.skipped_spans
+        if spans:
+            skipped_bytes = sum(end - start for start, end in spans)
+            print(f"⚠️ {len(spans)} zones illisibles ignorées ({skipped_bytes} octets)")
+            for start, end in spans[:MAX_SPANS_AFFICHES]:
+                print(f"   - octets {start} à {end}")
+            if len(spans) > MAX_SPANS_AFFICHES:
+                print(f"   ... et {len(spans) - MAX_SPANS_AFFICHES} autres")
         
-        print(f"✅ Fichier réparé avec {len(features)} features")
+        print(f"✅ Fichier réparé avec {features_count} features")
         print(f"📁 Sauvegardé: {output_filepath}")
         
-        return len(features)
+        return features_count
         
     except Exception as e:
         print(f"❌ Erreur lors de la réparation: {e}")
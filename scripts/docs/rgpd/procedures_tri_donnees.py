@@ -15,6 +15,41 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Plan d'index MongoDB (TTL) et partitions PostgreSQL
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'nosql'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'sql'))
+from mongo_indexes import RETENTION_DAYS, ensure_indexes
+from partitions import drop_expired_partitions
+from consolidated_schema import CONSOLIDATED_TABLE, LONG_TABLE
+from episode_schema import ANONYMIZED_FLAG, COORDINATES_PRECISION
+
+# Tables partitionnées par mois soumises à la rétention
+RETENTION_TABLES = (LONG_TABLE, CONSOLIDATED_TABLE)
+
+def round_if_number(expression):
+    """Arrondi côté serveur d'une valeur numérique, inchangée sinon"""
+    return {"$cond": [
+        {"$isNumber": expression},
+        {"$round": [expression, COORDINATES_PRECISION]},
+        expression
+    ]}
+
+def anonymization_pipeline():
+    """Pipeline de mise à jour : arrondi de latitude, longitude et geo.coordinates"""
+    return [{"$set": {
+        "latitude": round_if_number("$latitude"),
+        "longitude": round_if_number("$longitude"),
+        "geo": {"$cond": [
+            {"$isArray": "$geo.coordinates"},
+            {"$mergeObjects": ["$geo", {"coordinates": {"$map": {
+                "input": "$geo.coordinates",
+                "in": round_if_number("$$this")
+            }}}]},
+            "$geo"
+        ]},
+        ANONYMIZED_FLAG: COORDINATES_PRECISION
+    }}]
+
 def anonymize_coordinates():
     """Anonymiser les coordonnées GPS (arrondir à 100m)"""
     print("🔒 ANONYMISATION DES COORDONNÉES GPS")
@@ -32,77 +67,114 @@ def anonymize_coordinates():
             print("⚠️ Collection vide ou inexistante - aucune donnée à anonymiser")
             return
         
-        # Anonymiser les coordonnées individuellement (pour gérer les différents formats)
-        modified_count = 0
-        for doc in collection.find({}):
-            updates = {}
-            
-            # Anonymiser latitude si elle existe et est numérique
-            if 'latitude' in doc and isinstance(doc['latitude'], (int, float)):
-                updates['latitude'] = round(doc['latitude'], 3)
-            
-            # Anonymiser longitude si elle existe et est numérique
-            if 'longitude' in doc and isinstance(doc['longitude'], (int, float)):
-                updates['longitude'] = round(doc['longitude'], 3)
-            
-            # Anonymiser les coordonnées dans geo si elles existent
-            if 'geo' in doc and isinstance(doc['geo'], dict):
-                if 'coordinates' in doc['geo'] and isinstance(doc['geo']['coordinates'], list):
-                    coords = doc['geo']['coordinates']
-                    if len(coords) >= 2:
-                        updates['geo.coordinates'] = [
-                            round(coords[0], 3), 
-                            round(coords[1], 3)
-                        ]
-            
-            # Appliquer les mises à jour si nécessaire
-            if updates:
-                collection.update_one({'_id': doc['_id']}, {'$set': updates})
-                modified_count += 1
+        # Arrondi fait par le serveur en une seule requête, uniquement sur les
+        # documents pas encore anonymisés (nouveaux imports) : les champs
+        # absents ou non numériques sont laissés tels quels
+        result = collection.update_many(
+            {ANONYMIZED_FLAG: {"$ne": COORDINATES_PRECISION}},
+            anonymization_pipeline()
+        )
         
-        print(f"✅ {modified_count} documents avec coordonnées anonymisées")
+        print(f"✅ {result.modified_count} documents avec coordonnées anonymisées")
         
     except pymongo.errors.ServerSelectionTimeoutError:
         print("⚠️ Impossible de se connecter à MongoDB - service non disponible")
     except Exception as e:
         print(f"⚠️ Erreur lors de l'anonymisation: {str(e)}")
 
+def format_size(size):
+    """Taille en octets lisible (Ko, Mo, Go)"""
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if abs(size) < 1024 or unit == "Go":
+            return f"{size:,.1f} {unit}"
+        size /= 1024
+
+def purge_mongo(cutoff_date):
+    """
+    Rétention MongoDB : index TTL sur date_ech (le serveur supprime les
+    épisodes expirés en continu, sans scan ni delete_many).
+
+    Returns:
+        int: Espace de stockage réutilisable de la collection (octets)
+    """
+    connection_string = os.getenv('MONGO_CONNECTION_STRING')
+    database_name = os.getenv('MONGO_DATABASE')
+    client = pymongo.MongoClient(connection_string)
+    db = client[database_name]
+    try:
+        # Vérifier si la collection existe
+        if "EPIS_POLLUTION" not in db.list_collection_names():
+            print("⚠️ Collection EPIS_POLLUTION inexistante - aucune donnée à purger")
+            return 0
+
+        collection = db["EPIS_POLLUTION"]
+        # Index TTL créé, index date_ech hérités (sans expiration) supprimés
+        ensure_indexes(db)
+        print(f"✅ Index TTL actif : expiration {RETENTION_DAYS} jours après date_ech")
+
+        # Documents expirés pas encore retirés par le moniteur TTL (passe ~60s)
+        pending = collection.count_documents({"date_ech": {"$lt": cutoff_date}})
+        if pending:
+            print(f"⏳ {pending} documents expirés en attente de suppression TTL")
+
+        stats = db.command("collStats", "EPIS_POLLUTION")
+        reclaimable = stats.get("freeStorageSize", 0)
+        print(f"📦 Stockage EPIS_POLLUTION : {format_size(stats.get('storageSize', 0))}, "
+              f"dont {format_size(reclaimable)} libérés et réutilisables")
+        return reclaimable
+    finally:
+        client.close()
+
+def purge_postgres(cutoff_date):
+    """
+    Rétention PostgreSQL : détache et supprime les partitions mensuelles
+    entièrement expirées des tables de mesures.
+
+    Returns:
+        int: Espace disque rendu (octets)
+    """
+    conn = psycopg2.connect(
+        host=os.getenv("PG_HOST", "localhost"),
+        database=os.getenv("PG_DATABASE"),
+        user=os.getenv("PG_USER"),
+        password=os.getenv("PG_PASSWORD"),
+        port=os.getenv("PG_PORT", 5432)
+    )
+    reclaimed = 0
+    try:
+        with conn, conn.cursor() as cursor:
+            for table in RETENTION_TABLES:
+                dropped = drop_expired_partitions(cursor, table, cutoff_date)
+                for name, month, size in dropped:
+                    print(f"   🗑️ {name} ({month:%Y-%m}) : {format_size(size)}")
+                    reclaimed += size
+                if not dropped:
+                    print(f"   ✅ {table} : aucune partition expirée")
+    finally:
+        conn.close()
+    return reclaimed
+
 def purge_old_data():
     """Supprimer les données de plus de 24 mois"""
     print("🗑️ PURGE DES DONNÉES ANCIENNES")
     
-    cutoff_date = datetime.now() - timedelta(days=730)  # 24 mois
+    cutoff_date = datetime.now() - timedelta(days=RETENTION_DAYS)  # 24 mois
     
     try:
-        # MongoDB
-        connection_string = os.getenv('MONGO_CONNECTION_STRING')
-        database_name = os.getenv('MONGO_DATABASE')
-        client = pymongo.MongoClient(connection_string)
-        db = client[database_name]
-        
-        # Vérifier si la collection existe
-        if "EPIS_POLLUTION" not in db.list_collection_names():
-            print("⚠️ Collection EPIS_POLLUTION inexistante - aucune donnée à purger")
-            return
-        
-        # Essayer de supprimer par import_date
-        result = db["EPIS_POLLUTION"].delete_many({
-            "import_date": {"$lt": cutoff_date}
-        })
-        
-        print(f"✅ {result.deleted_count} documents supprimés par import_date")
-        
-        # Essayer aussi par date_mesure si elle existe
-        result2 = db["EPIS_POLLUTION"].delete_many({
-            "date_mesure": {"$lt": cutoff_date.strftime('%Y-%m-%d')}
-        })
-        
-        print(f"✅ {result2.deleted_count} documents supprimés par date_mesure")
-        
+        purge_mongo(cutoff_date)
     except pymongo.errors.ServerSelectionTimeoutError:
         print("⚠️ Impossible de se connecter à MongoDB - service non disponible")
     except Exception as e:
-        print(f"⚠️ Erreur lors de la purge: {str(e)}")
+        print(f"⚠️ Erreur lors de la purge MongoDB: {str(e)}")
+
+    try:
+        # Seuls les mois entièrement antérieurs à la limite sont retirés
+        reclaimed = purge_postgres(cutoff_date.date())
+        print(f"✅ PostgreSQL : {format_size(reclaimed)} libérés")
+    except psycopg2.OperationalError:
+        print("⚠️ Impossible de se connecter à PostgreSQL - service non disponible")
+    except Exception as e:
+        print(f"⚠️ Erreur lors de la purge PostgreSQL: {str(e)}")
 
 def generate_compliance_report():
     """Générer rapport de conformité RGPD"""
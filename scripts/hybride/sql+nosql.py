@@ -17,12 +17,12 @@ Usage:
 
 import psycopg2
 import psycopg2.extras
-from pymongo import MongoClient
 import pandas as pd
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import argparse
 import os
+import re
 import sys
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
@@ -30,6 +30,7 @@ from dataclasses import dataclass
 # Import du système de logging existant
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'api'))
 from logger import log_api_call, logger
+from db_instrumentation import connect_pg, mongo_client
 
 @dataclass
 class DataRetrievalConfig:
@@ -77,7 +78,7 @@ class HybridDataRetriever:
         """Établit les connexions aux bases de données"""
         try:
             # Connexion PostgreSQL
-            self.pg_conn = psycopg2.connect(
+            self.pg_conn = connect_pg(
                 host=self.config.pg_host,
                 port=self.config.pg_port,
                 database=self.config.pg_database,
@@ -87,7 +88,7 @@ class HybridDataRetriever:
             logger.info("Connexion PostgreSQL établie")
             
             # Connexion MongoDB
-            self.mongo_client = MongoClient(self.config.mongo_uri)
+            self.mongo_client = mongo_client(self.config.mongo_uri)
             self.mongo_db = self.mongo_client[self.config.mongo_database]
             logger.info("Connexion MongoDB établie")
             
@@ -128,8 +129,7 @@ class HybridDataRetriever:
                 qualite_air,
                 zone,
                 code_zone,
-                fichier_source,
-                created_at
+                fichier_source
             FROM indices_qualite_air_consolides
             WHERE 1=1
             """
@@ -144,13 +144,15 @@ class HybridDataRetriever:
                     query += " AND code_zone = %s"
                     params.append(self.config.zone_filter)
             
+            # Dates passées en objets date : comparaison sur la colonne DATE
+            # (parcours d'intervalle et élagage des partitions)
             if self.config.date_debut:
                 query += " AND date_prise_mesure >= %s"
-                params.append(self.config.date_debut)
+                params.append(date.fromisoformat(self.config.date_debut))
                 
             if self.config.date_fin:
                 query += " AND date_prise_mesure <= %s"
-                params.append(self.config.date_fin)
+                params.append(date.fromisoformat(self.config.date_fin))
             
             # Ordre et limite
             query += " ORDER BY date_prise_mesure DESC LIMIT 10000"
@@ -188,25 +190,25 @@ class HybridDataRetriever:
             # Construction du filtre MongoDB
             mongo_filter = {}
             
+            # Champs de premier niveau des documents EPIS_POLLUTION, servis par
+            # les index déclarés dans scripts/nosql/mongo_indexes.py
             if self.config.zone_filter:
-                mongo_filter["properties.code_insee"] = {"$regex": f"^{self.config.zone_filter}"}
+                mongo_filter["code_zone"] = {"$regex": f"^{re.escape(self.config.zone_filter)}"}
             
             if self.config.date_debut:
-                mongo_filter["properties.date_debut"] = {"$gte": self.config.date_debut}
+                mongo_filter["date_ech"] = {"$gte": datetime.fromisoformat(self.config.date_debut)}
             
             if self.config.polluants:
-                mongo_filter["properties.polluant"] = {"$in": self.config.polluants}
+                mongo_filter["polluant"] = {"$in": self.config.polluants}
             
             # Projection pour optimiser
             projection = {
-                "properties.code_insee": 1,
-                "properties.polluant": 1,
-                "properties.date_debut": 1,
-                "properties.date_fin": 1,
-                "properties.etat": 1,
-                "properties.niveau": 1,
-                "properties.valeur_declenchement": 1,
-                "geometry.coordinates": 1
+                "code_zone": 1,
+                "polluant": 1,
+                "date_ech": 1,
+                "etat": 1,
+                "lib_zone": 1,
+                "geo.coordinates": 1
             }
             
             # Exécution de la requête
@@ -216,19 +218,15 @@ class HybridDataRetriever:
             # Aplatissement des données
             flattened_episodes = []
             for episode in episodes:
-                props = episode.get('properties', {})
-                geom = episode.get('geometry', {})
-                coords = geom.get('coordinates', [None, None])
+                coords = (episode.get('geo') or {}).get('coordinates') or [None, None]
                 
                 flattened_episodes.append({
                     'episode_id': str(episode['_id']),
-                    'code_insee': props.get('code_insee'),
-                    'polluant': props.get('polluant'),
-                    'date_debut': props.get('date_debut'),
-                    'date_fin': props.get('date_fin'),
-                    'etat': props.get('etat'),
-                    'niveau': props.get('niveau'),
-                    'valeur_declenchement': props.get('valeur_declenchement'),
+                    'code_insee': episode.get('code_zone'),
+                    'polluant': episode.get('polluant'),
+                    'date_debut': episode.get('date_ech'),
+                    'etat': episode.get('etat'),
+                    'lib_zone': episode.get('lib_zone'),
                     'longitude': coords[0],
                     'latitude': coords[1]
                 })
@@ -348,7 +346,7 @@ class HybridDataRetriever:
                     'count': len(df_episodes),
                     'etats': df_episodes['etat'].value_counts().to_dict() if not df_episodes.empty else {},
                     'polluants': df_episodes['polluant'].value_counts().to_dict() if not df_episodes.empty else {},
-                    'niveaux': df_episodes['niveau'].value_counts().to_dict() if not df_episodes.empty else {}
+                    'zones': df_episodes['lib_zone'].value_counts().to_dict() if not df_episodes.empty else {}
                 },
                 'mongodb_moyennes': {
                     'count': len(df_moyennes),
@@ -378,7 +376,7 @@ class HybridDataRetriever:
                             'pg_date': pg_row['date_prise_mesure'],
                             'pg_qualite': pg_row['qualite_air'],
                             'episodes_associes': len(episodes_proches),
-                            'episodes_details': episodes_proches[['polluant', 'etat', 'niveau']].to_dict('records')
+                            'episodes_details': episodes_proches[['polluant', 'etat', 'lib_zone']].to_dict('records')
                         })
             
             # Résultat final
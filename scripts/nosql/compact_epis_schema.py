@@ -0,0 +1,232 @@
+"""
+Migration des documents EPIS_POLLUTION vers le schéma compact.
+
+Conversion côté serveur (update_many avec pipeline), sans rapatrier les
+documents :
+    1. conversion des dates texte en dates BSON
+    2. création de `geo` à partir des coordonnées si absent
+    3. (optionnel, --keep-raw) copie des features d'origine dans la
+       collection froide EPIS_POLLUTION_RAW
+    4. suppression des champs dupliqués (feature_original, coordinates,
+       latitude, longitude, geometry_type) et constants
+    5. remplacement des _id ObjectId par l'_id dérivé de la clé naturelle
+       (episode_id), pour que les réimports retombent sur les mêmes documents
+    6. retrait du marqueur d'anonymisation des documents marqués mais aux
+       coordonnées en pleine précision (réécrites par d'anciens réimports),
+       pour que la procédure RGPD les arrondisse de nouveau
+
+Les statistiques de stockage sont affichées avant et après.
+
+Usage:
+    python compact_epis_schema.py [--keep-raw]
+"""
+
+import os
+import sys
+
+import pymongo
+from pymongo.errors import OperationFailure
+from dotenv import load_dotenv
+
+from episode_schema import (
+    EPIS_COLLECTION, RAW_COLLECTION, NATURAL_KEY, DATE_FIELDS, DROPPED_FIELDS,
+    ANONYMIZED_FLAG, COORDINATES_PRECISION, episode_id_expression, ensure_raw_collection,
+    collection_stats, print_stats_comparison
+)
+from mongo_indexes import ensure_indexes, index_name
+
+load_dotenv()
+
+# Nombre maximum de clés en doublon détaillées dans la console
+MAX_COLLISIONS_AFFICHEES = 20
+
+
+def copy_raw_features(db):
+    """Copie les features d'origine dans la collection froide, sous l'_id de l'épisode"""
+    ensure_raw_collection(db)
+    db[EPIS_COLLECTION].aggregate([
+        {"$match": {"feature_original": {"$exists": True}}},
+        {"$project": {
+            "_id": episode_id_expression(),
+            "feature": "$feature_original",
+        }},
+        {"$merge": {"into": RAW_COLLECTION, "on": "_id", "whenMatched": "replace"}},
+    ])
+    return db[RAW_COLLECTION].count_documents({})
+
+
+def natural_key_collisions(collection, match, id_expression):
+    """
+    Doublons de clé naturelle parmi les documents sélectionnés par `match` :
+    plusieurs documents de même _id calculé, ou _id déjà présent dans la
+    collection. Un seul document est gardé par _id à la recopie.
+
+    Returns:
+        list: [(_id calculé, nombre de documents écartés), ...]
+    """
+    return [(row["_id"], row["ecartes"]) for row in collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": id_expression, "documents": {"$sum": 1}}},
+        {"$lookup": {"from": collection.name, "localField": "_id",
+                     "foreignField": "_id", "as": "existants"}},
+        {"$project": {"ecartes": {"$subtract": [
+            {"$add": ["$documents", {"$size": "$existants"}]}, 1
+        ]}}},
+        {"$match": {"ecartes": {"$gt": 0}}},
+        {"$sort": {"ecartes": -1}},
+    ])]
+
+
+def rekey_collection(collection, match, id_expression):
+    """
+    Recopie sous leur nouvel _id les documents sélectionnés par `match`,
+    puis supprime les anciens (l'_id d'un document n'est pas modifiable).
+    En cas de doublon de clé naturelle, le premier document recopié est gardé :
+    les doublons sont comptés et affichés avant toute suppression.
+
+    Returns:
+        int: Nombre d'anciens documents supprimés
+    """
+    collisions = natural_key_collisions(collection, match, id_expression)
+    if collisions:
+        ecartes = sum(count for _, count in collisions)
+        print(f"⚠️ {collection.name} : {ecartes:,} documents en doublon de clé naturelle "
+              f"({len(collisions):,} clés), un seul document gardé par clé")
+        for key, count in collisions[:MAX_COLLISIONS_AFFICHEES]:
+            print(f"   - {key} : {count} écarté(s)")
+        if len(collisions) > MAX_COLLISIONS_AFFICHEES:
+            print(f"   ... et {len(collisions) - MAX_COLLISIONS_AFFICHEES} autres clés")
+
+    collection.aggregate([
+        {"$match": match},
+        {"$set": {"_id": id_expression}},
+        {"$merge": {"into": collection.name, "on": "_id",
+                    "whenMatched": "keepExisting", "whenNotMatched": "insert"}},
+    ])
+    return collection.delete_many(match).deleted_count
+
+
+def reset_stale_anonymization(collection):
+    """
+    Retire le marqueur d'anonymisation des documents dont `geo` n'est pas à
+    la précision anonymisée (coordonnées réécrites par un réimport après
+    l'anonymisation, quand l'importeur n'arrondissait pas encore).
+
+    Returns:
+        int: Nombre de documents à anonymiser de nouveau
+    """
+    coordinates = "$geo.coordinates"
+    result = collection.update_many(
+        {ANONYMIZED_FLAG: COORDINATES_PRECISION, "$expr": {"$and": [
+            {"$isArray": coordinates},
+            {"$ne": [coordinates, {"$map": {
+                "input": coordinates,
+                "in": {"$cond": [{"$isNumber": "$$this"},
+                                 {"$round": ["$$this", COORDINATES_PRECISION]}, "$$this"]},
+            }}]},
+        ]}},
+        {"$unset": {ANONYMIZED_FLAG: ""}}
+    )
+    return result.modified_count
+
+
+def typed_fields_pipeline():
+    """Pipeline de conversion des dates texte et de création de `geo`"""
+    dates = {
+        field: {"$cond": [
+            {"$eq": [{"$type": f"${field}"}, "string"]},
+            {"$dateFromString": {
+                "dateString": {"$replaceAll": {"input": f"${field}", "find": "/", "replacement": "-"}},
+                "onError": None,
+                "onNull": None,
+            }},
+            f"${field}",
+        ]}
+        for field in DATE_FIELDS
+    }
+    geo = {"$ifNull": ["$geo", {"$cond": [
+        {"$and": [{"$isNumber": "$longitude"}, {"$isNumber": "$latitude"}]},
+        {"type": "Point", "coordinates": ["$longitude", "$latitude"]},
+        None,
+    ]}]}
+    return [{"$set": {**dates, "geo": geo}}]
+
+
+def migrate(keep_raw=False):
+    connection_string = os.getenv('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
+    database_name = os.getenv('MONGO_DATABASE', 'pollution_app')
+
+    print("🗜️ MIGRATION EPIS_POLLUTION VERS LE SCHÉMA COMPACT")
+    print("=" * 60)
+
+    client = pymongo.MongoClient(connection_string)
+    db = client[database_name]
+    try:
+        before = collection_stats(db, EPIS_COLLECTION)
+
+        collection = db[EPIS_COLLECTION]
+        result = collection.update_many(
+            {"$or": [{field: {"$type": "string"}} for field in DATE_FIELDS]
+                    + [{"geo": {"$exists": False}}]},
+            typed_fields_pipeline()
+        )
+        print(f"📅 {result.modified_count:,} documents aux dates converties")
+
+        if keep_raw:
+            count = copy_raw_features(db)
+            print(f"🧊 {count:,} features d'origine dans {RAW_COLLECTION}")
+
+        result = collection.update_many(
+            {"$or": [{field: {"$exists": True}} for field in DROPPED_FIELDS]},
+            {"$unset": {field: "" for field in DROPPED_FIELDS}}
+        )
+        print(f"✅ {result.modified_count:,} documents allégés")
+
+        unparsed = collection.count_documents({"date_ech": None})
+        if unparsed:
+            print(f"⚠️ {unparsed:,} documents sans date_ech exploitable")
+
+        # _id dérivé de la clé naturelle (après conversion des dates)
+        rekeyed = rekey_collection(collection, {"_id": {"$type": "objectId"}},
+                                   episode_id_expression())
+        print(f"🔑 {rekeyed:,} documents réidentifiés par clé naturelle")
+        if RAW_COLLECTION in db.list_collection_names():
+            rekeyed = rekey_collection(db[RAW_COLLECTION], {"_id": {"$type": "object"}},
+                                       episode_id_expression("$_id."))
+            print(f"🔑 {rekeyed:,} features froides réidentifiées")
+
+        stale = reset_stale_anonymization(collection)
+        if stale:
+            print(f"🔓 {stale:,} documents aux coordonnées précises à anonymiser de nouveau "
+                  f"(docs/rgpd/procedures_tri_donnees.py)")
+
+        # L'index composé sur la clé naturelle est remplacé par l'index _id
+        legacy_index = index_name([(field, 1) for field in NATURAL_KEY])
+        if legacy_index in collection.index_information():
+            collection.drop_index(legacy_index)
+            print(f"🗑️ Index {legacy_index} supprimé")
+
+        # Les index sur date_ech sont recalculés avec les nouvelles valeurs
+        ensure_indexes(db)
+
+        # compact rend l'espace libéré au système (WiredTiger)
+        try:
+            db.command("compact", EPIS_COLLECTION)
+        except OperationFailure as e:
+            print(f"⚠️ compact non exécuté : {e}")
+
+        after = collection_stats(db, EPIS_COLLECTION)
+        print_stats_comparison(before, after)
+        if keep_raw:
+            print_stats_comparison({}, collection_stats(db, RAW_COLLECTION), RAW_COLLECTION)
+        return True
+
+    except Exception as e:
+        print(f"❌ Erreur de migration : {e}")
+        return False
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if migrate(keep_raw="--keep-raw" in sys.argv) else 1)
@@ -0,0 +1,158 @@
+"""
+Schéma compact des documents EPIS_POLLUTION.
+
+Un document d'épisode ne garde que les champs de l'épisode, avec :
+    - des dates typées (date_ech, date_maj, date_dif en dates BSON) : les
+      filtres par période comparent des dates et non des chaînes
+    - une seule géométrie, le Point GeoJSON `geo` (index 2dsphere)
+    - ni copie de la feature source (feature_original), ni champs
+      constants (type_donnee, source)
+
+L'_id d'un épisode est dérivé de sa clé naturelle (aasqa, code_zone,
+code_pol, date_ech, etat) : un même épisode réimporté retombe sur le même
+document, quel que soit l'ordre des fichiers. Un rechargement ne touche que
+les documents nouveaux ou modifiés.
+
+Les features d'origine peuvent être conservées à part, dans la collection
+froide EPIS_POLLUTION_RAW compressée en zstd (même _id que l'épisode), qui
+n'entre pas dans le working set de l'API.
+
+Functions:
+    parse_date: Convertit une date texte des sources en datetime
+    episode_id: _id déterministe d'un épisode (côté client)
+    episode_id_expression: Même _id calculé par le serveur (pipelines)
+    ensure_raw_collection: Crée la collection froide compressée
+    collection_stats: Taille et nombre de documents d'une collection
+"""
+
+from datetime import datetime, timezone
+
+from pymongo.errors import CollectionInvalid
+
+EPIS_COLLECTION = "EPIS_POLLUTION"
+RAW_COLLECTION = "EPIS_POLLUTION_RAW"
+
+# Clé naturelle d'un épisode : un même épisode réimporté met à jour son
+# document au lieu de créer un doublon
+NATURAL_KEY = ("aasqa", "code_zone", "code_pol", "date_ech", "etat")
+
+# Dates stockées en dates BSON
+DATE_FIELDS = ("date_ech", "date_maj", "date_dif")
+
+# Précision conservée pour les coordonnées (3 décimales ~ 100m) et marqueur
+# des documents anonymisés (voir docs/rgpd/procedures_tri_donnees.py). Les
+# importeurs écrivent directement des coordonnées arrondies.
+COORDINATES_PRECISION = 3
+ANONYMIZED_FLAG = "coords_precision"
+
+# Composition de l'_id : valeurs de la clé naturelle séparées par "|",
+# dates au format ci-dessous (UTC, comme stockées par MongoDB)
+ID_SEPARATOR = "|"
+ID_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# Champs de l'ancien schéma : géométrie dupliquée, copie de la source et constantes
+DROPPED_FIELDS = (
+    "feature_original", "coordinates", "latitude", "longitude",
+    "geometry_type", "type_donnee", "source",
+)
+
+
+def parse_date(value):
+    """
+    Date texte ('2024-06-14', '2024/06/14', '2024-06-14T10:00:00Z'...) en
+    datetime, ou None si la valeur est absente ou illisible.
+    """
+    if isinstance(value, datetime):
+        return value
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("/", "-").replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def episode_id(doc):
+    """
+    _id déterministe d'un épisode : '28|28085|8|2024-06-14T00:00:00|ACTIF'.
+
+    Une valeur absente compte comme une chaîne vide ; un nombre entier est
+    écrit sans décimale quel que soit son type (28085.0 -> '28085'), comme
+    dans episode_id_expression.
+    """
+    parts = []
+    for field in NATURAL_KEY:
+        value = doc.get(field)
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            value = value.strftime(ID_DATE_FORMAT)
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        parts.append("" if value is None else str(value))
+    return ID_SEPARATOR.join(parts)
+
+
+def episode_id_expression(prefix="$"):
+    """
+    Expression d'agrégation équivalente à episode_id, pour calculer l'_id
+    côté serveur. `prefix` désigne l'emplacement des champs ("$_id." pour
+    des champs rangés dans un _id composé).
+    """
+    parts = []
+    for field in NATURAL_KEY:
+        value = f"{prefix}{field}"
+        if field in DATE_FIELDS:
+            value = {"$dateToString": {"date": value, "format": ID_DATE_FORMAT}}
+        else:
+            # Nombre entier (int, long ou double) écrit sans décimale
+            value = {"$cond": [
+                {"$isNumber": value},
+                {"$cond": [{"$eq": [value, {"$trunc": value}]},
+                           {"$toString": {"$toLong": value}},
+                           {"$toString": value}]},
+                {"$toString": value},
+            ]}
+        if parts:
+            parts.append(ID_SEPARATOR)
+        parts.append({"$ifNull": [value, ""]})
+    return {"$concat": parts}
+
+
+def ensure_raw_collection(db):
+    """Crée la collection froide des features d'origine, compressée en zstd"""
+    try:
+        db.create_collection(
+            RAW_COLLECTION,
+            storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}},
+        )
+    except CollectionInvalid:
+        pass  # Déjà créée
+    return db[RAW_COLLECTION]
+
+
+def collection_stats(db, name):
+    """
+    Statistiques de stockage d'une collection.
+
+    Returns:
+        dict: {"documents", "taille_moyenne", "taille_donnees", "stockage", "index"} (octets)
+    """
+    stats = db.command("collStats", name)
+    return {
+        "documents": stats.get("count", 0),
+        "taille_moyenne": stats.get("avgObjSize", 0),
+        "taille_donnees": stats.get("size", 0),
+        "stockage": stats.get("storageSize", 0),
+        "index": stats.get("totalIndexSize", 0),
+    }
+
+
+def print_stats_comparison(before, after, name=EPIS_COLLECTION):
+    """Affiche les statistiques de stockage avant/après"""
+    print(f"\n📊 {name} : avant -> après")
+    for key in ("documents", "taille_moyenne", "taille_donnees", "stockage", "index"):
+        old, new = before.get(key, 0), after.get(key, 0)
+        variation = f" ({(new - old) / old * 100:+.1f}%)" if old else ""
+        unit = "" if key == "documents" else " o"
+        print(f"   - {key:<15}: {old:,.0f}{unit} -> {new:,.0f}{unit}{variation}")
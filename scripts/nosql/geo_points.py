@@ -0,0 +1,90 @@
+"""
+Points GeoJSON pour les requêtes géospatiales MongoDB.
+
+Les épisodes (EPIS_POLLUTION) et les sites de mesure (MOY_JOURNALIERE)
+portent un champ `geo` au format GeoJSON Point, indexé en 2dsphere (voir
+mongo_indexes.py) : les requêtes $geoNear / $nearSphere trouvent les
+documents proches d'une position sans parcourir la collection.
+
+Functions:
+    geo_point: Construit un Point GeoJSON à partir d'une longitude/latitude
+    backfill_geo_points: Ajoute `geo` aux documents existants (côté serveur)
+
+Usage:
+    python geo_points.py    # complète EPIS_POLLUTION et MOY_JOURNALIERE
+"""
+
+import os
+
+import pymongo
+from dotenv import load_dotenv
+
+from mongo_indexes import ensure_indexes
+
+load_dotenv()
+
+GEO_FIELD = "geo"
+
+
+def geo_point(longitude, latitude, precision=None):
+    """
+    Point GeoJSON [longitude, latitude], ou None si les coordonnées sont
+    absentes ou hors limites (2dsphere refuse les points invalides).
+
+    Coordonnées arrondies à `precision` décimales si indiquée.
+    """
+    try:
+        longitude, latitude = float(longitude), float(latitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-180 <= longitude <= 180 and -90 <= latitude <= 90):
+        return None
+    if precision is not None:
+        longitude, latitude = round(longitude, precision), round(latitude, precision)
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def backfill_geo_points(collection, lon_field="longitude", lat_field="latitude"):
+    """
+    Ajoute le champ `geo` aux documents qui ne l'ont pas encore.
+
+    La conversion est faite par le serveur (update_many avec pipeline),
+    sans rapatrier les documents.
+
+    Returns:
+        int: Nombre de documents modifiés
+    """
+    lon, lat = f"${lon_field}", f"${lat_field}"
+    result = collection.update_many(
+        {
+            GEO_FIELD: {"$exists": False},
+            lon_field: {"$type": "number", "$gte": -180, "$lte": 180},
+            lat_field: {"$type": "number", "$gte": -90, "$lte": 90},
+        },
+        [{"$set": {GEO_FIELD: {"type": "Point", "coordinates": [lon, lat]}}}],
+    )
+    return result.modified_count
+
+
+def main():
+    connection_string = os.getenv('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
+    database_name = os.getenv('MONGO_DATABASE', 'pollution_app')
+
+    print("🌍 AJOUT DES POINTS GEOJSON")
+    print("=" * 60)
+
+    client = pymongo.MongoClient(connection_string)
+    db = client[database_name]
+    try:
+        for collection_name in ("EPIS_POLLUTION", "MOY_JOURNALIERE"):
+            modified = backfill_geo_points(db[collection_name])
+            print(f"   ✅ {collection_name}: {modified:,} documents complétés")
+
+        ensure_indexes(db)
+        print("✅ Index 2dsphere créés")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Plan d'index MongoDB aligné sur les requêtes de l'API et du script hybride.
+
+Chaque forme de requête connue (filtre envoyé par un endpoint ou par
+HybridDataRetriever) est déclarée avec l'index composé qui la sert. Le
+module sait :
+
+    - créer les index déclarés (ensure_indexes), y compris l'index TTL de
+      rétention des épisodes (expiration RETENTION_DAYS après date_ech), et
+      supprimer les index hérités qu'ils remplacent (LEGACY_INDEXES)
+    - vérifier par explain() que chaque requête connue utilise bien un index
+      (check_query_plans) : un COLLSCAN ou une erreur d'explain (index
+      2dsphere absent pour $nearSphere...) est un échec
+
+Usage:
+    python mongo_indexes.py            # crée les index puis vérifie les plans
+    python mongo_indexes.py --check    # vérifie seulement (code retour 1 si échec)
+"""
+
+import os
+import sys
+from datetime import datetime
+
+import pymongo
+from pymongo import IndexModel, ASCENDING, GEOSPHERE
+from pymongo.errors import OperationFailure
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Rétention RGPD des épisodes (24 mois) : appliquée par l'index TTL sur
+# date_ech, le serveur supprime les documents expirés en continu
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", 730))
+
+# Index mono-champ créés par l'ancien importeur, remplacés par les index
+# composés ci-dessous (ou portant sur des champs retirés par le schéma
+# compact) : supprimés par ensure_indexes pour ne plus payer leur coût en
+# écriture et en mémoire
+LEGACY_INDEXES = {
+    "EPIS_POLLUTION": [
+        "polluant_1", "etat_1", "lib_zone_1", "aasqa_1",
+        "latitude_1_longitude_1", "type_donnee_1",
+        # Même clé que l'index TTL idx_date_ech_1 mais sans expiration :
+        # create_indexes échouerait (IndexOptionsConflict) tant qu'il existe
+        "date_ech_1",
+        # Index date_ech descendant du premier plan, remplacé par l'index TTL
+        "idx_date_ech_-1",
+    ],
+}
+
+# Formes de requêtes et index composés qui les servent.
+#   filtre : exemple représentatif du filtre envoyé (valeurs quelconques)
+#   index  : clés de l'index attendu, dans l'ordre égalité -> intervalle
+#   options: (optionnel) options de création de l'index
+QUERY_SHAPES = [
+    {
+        "nom": "api_episodes_aasqa_date",
+        "origine": "GET /api/qualite-air/episodes-pollution (aasqa + dates)",
+        "collection": "EPIS_POLLUTION",
+        "filtre": {"aasqa": "28", "date_ech": {"$gte": datetime(2024, 1, 1), "$lt": datetime(2025, 1, 1)}},
+        "index": [("aasqa", ASCENDING), ("date_ech", ASCENDING)],
+    },
+    {
+        "nom": "api_episodes_date",
+        "origine": "GET /api/qualite-air/episodes-pollution (dates seules)",
+        "collection": "EPIS_POLLUTION",
+        "filtre": {"date_ech": {"$gte": datetime(2024, 1, 1)}},
+        "index": [("date_ech", ASCENDING)],
+        "options": {"expireAfterSeconds": RETENTION_DAYS * 86400},
+    },
+    {
+        "nom": "retriever_zone_date",
+        "origine": "HybridDataRetriever.get_mongo_episodes (préfixe de zone + date)",
+        "collection": "EPIS_POLLUTION",
+        "filtre": {"code_zone": {"$regex": "^972"}, "date_ech": {"$gte": datetime(2024, 1, 1)}},
+        "index": [("code_zone", ASCENDING), ("date_ech", ASCENDING)],
+    },
+    {
+        "nom": "polluant_zone_date",
+        "origine": "GET /api/hybride/echantillon, HybridDataRetriever (polluants)",
+        "collection": "EPIS_POLLUTION",
+        "filtre": {"polluant": {"$in": ["NO2", "O3"]}, "code_zone": "97209"},
+        "index": [("polluant", ASCENDING), ("code_zone", ASCENDING), ("date_ech", ASCENDING)],
+    },
+    {
+        "nom": "moyennes_polluant_date",
+        "origine": "GET /api/qualite-air/moyennes-journalieres, HybridDataRetriever.get_mongo_moyennes",
+        "collection": "MOY_JOURNALIERE",
+        "filtre": {"polluant": {"$in": ["NO2"]}, "date_debut": {"$gte": "2024-01-01"}},
+        "index": [("polluant", ASCENDING), ("date_debut", ASCENDING)],
+    },
+    {
+        "nom": "episodes_proches",
+        "origine": "GET /api/qualite-air/episodes-pollution/near ($geoNear)",
+        "collection": "EPIS_POLLUTION",
+        "filtre": {"geo": {"$nearSphere": {
+            "$geometry": {"type": "Point", "coordinates": [-1.36, 49.18]}, "$maxDistance": 10000
+        }}},
+        "index": [("geo", GEOSPHERE)],
+    },
+    {
+        "nom": "sites_proches",
+        "origine": "Sites de mesure autour d'une position",
+        "collection": "MOY_JOURNALIERE",
+        "filtre": {"geo": {"$nearSphere": {
+            "$geometry": {"type": "Point", "coordinates": [-1.36, 49.18]}, "$maxDistance": 10000
+        }}},
+        "index": [("geo", GEOSPHERE)],
+    },
+]
+
+
+def index_name(keys):
+    """Nom d'index déterministe à partir des clés : idx_aasqa_1_date_ech_1"""
+    return "idx_" + "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def index_models():
+    """
+    Index déclarés, regroupés par collection (sans doublons).
+
+    Returns:
+        dict: {collection: [IndexModel, ...]}
+    """
+    models = {}
+    for shape in QUERY_SHAPES:
+        name = index_name(shape["index"])
+        collection_models = models.setdefault(shape["collection"], {})
+        collection_models.setdefault(
+            name, IndexModel(shape["index"], name=name, **shape.get("options", {}))
+        )
+    return {collection: list(named.values()) for collection, named in models.items()}
+
+
+def drop_legacy_indexes(db, collection):
+    """
+    Supprime les index hérités de LEGACY_INDEXES encore présents.
+
+    Returns:
+        list: Noms des index supprimés
+    """
+    existing = db[collection].index_information()
+    dropped = [name for name in LEGACY_INDEXES.get(collection, []) if name in existing]
+    for name in dropped:
+        db[collection].drop_index(name)
+    return dropped
+
+
+def ensure_indexes(db):
+    """
+    Crée les index déclarés (sans effet s'ils existent déjà) après
+    suppression des index hérités qu'ils remplacent.
+
+    Returns:
+        dict: {collection: [noms d'index]}
+    """
+    created = {}
+    for collection, models in index_models().items():
+        drop_legacy_indexes(db, collection)
+        sync_ttl(db, collection, models)
+        created[collection] = db[collection].create_indexes(models)
+    return created
+
+
+def sync_ttl(db, collection, models):
+    """
+    Met à jour la durée d'expiration d'un index TTL existant (collMod) :
+    create_indexes refuse de recréer un index dont les options ont changé.
+    """
+    existing = db[collection].index_information()
+    for model in models:
+        ttl = model.document.get("expireAfterSeconds")
+        current = existing.get(model.document["name"])
+        if ttl is None or current is None or current.get("expireAfterSeconds") == ttl:
+            continue
+        db.command("collMod", collection,
+                   index={"name": model.document["name"], "expireAfterSeconds": ttl})
+
+
+def plan_nodes(plan):
+    """Nœuds d'un plan explain(), en parcourant les sous-plans"""
+    if not isinstance(plan, dict):
+        return []
+    nodes = [plan]
+    for key in ("inputStage", "queryPlan", "outerStage", "innerStage"):
+        nodes += plan_nodes(plan.get(key))
+    for child in plan.get("inputStages", []):
+        nodes += plan_nodes(child)
+    return nodes
+
+
+def explain_shape(db, shape):
+    """
+    Plan gagnant d'une forme de requête.
+
+    Returns:
+        dict: {"nom", "collection", "etapes", "index", "collscan"}
+    """
+    explanation = db[shape["collection"]].find(shape["filtre"]).explain()
+    nodes = plan_nodes(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+    stages = [node["stage"] for node in nodes if "stage" in node]
+
+    return {
+        "nom": shape["nom"],
+        "collection": shape["collection"],
+        "etapes": stages,
+        "index": [node["indexName"] for node in nodes if node.get("indexName")],
+        "collscan": "COLLSCAN" in stages,
+    }
+
+
+def check_query_plans(db, verbose=True):
+    """
+    Vérifie que chaque forme de requête connue est servie par un index.
+
+    Une forme dont l'explain échoue côté serveur (ex : $nearSphere sans
+    index 2dsphere) est comptée en échec, avec son erreur, et la
+    vérification continue avec les formes suivantes.
+
+    Returns:
+        list: Résultats explain_shape des requêtes en COLLSCAN ou en erreur
+            (clé "erreur"), vide si tout va bien
+    """
+    failures = []
+    for shape in QUERY_SHAPES:
+        try:
+            result = explain_shape(db, shape)
+        except OperationFailure as e:
+            result = {"nom": shape["nom"], "collection": shape["collection"],
+                      "etapes": [], "index": [], "collscan": False,
+                      "erreur": e.details.get("errmsg", str(e)) if e.details else str(e)}
+        if result["collscan"] or "erreur" in result:
+            failures.append(result)
+        if verbose:
+            if "erreur" in result:
+                status, detail = "❌ ERREUR", result["erreur"]
+            else:
+                status = "❌ COLLSCAN" if result["collscan"] else "✅"
+                detail = ", ".join(result["index"]) or " > ".join(result["etapes"])
+            print(f"   {status} {shape['nom']} ({shape['collection']}) : {detail}")
+    return failures
+
+
+def main():
+    connection_string = os.getenv('MONGO_CONNECTION_STRING', 'mongodb://localhost:27017/')
+    database_name = os.getenv('MONGO_DATABASE', 'pollution_app')
+    check_only = "--check" in sys.argv
+
+    client = pymongo.MongoClient(connection_string)
+    db = client[database_name]
+    try:
+        if not check_only:
+            print("🔍 Création des index déclarés...")
+            for collection, names in ensure_indexes(db).items():
+                print(f"   ✅ {collection}: {', '.join(names)}")
+
+        print("\n🧪 Vérification des plans d'exécution...")
+        failures = check_query_plans(db)
+    finally:
+        client.close()
+
+    if failures:
+        print(f"\n❌ {len(failures)} requête(s) connue(s) en COLLSCAN ou en erreur")
+        sys.exit(1)
+    print("\n✅ Toutes les requêtes connues utilisent un index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Écriture par lots des données de référence PostgreSQL.
+
+Remplace les boucles `cursor.execute` ligne par ligne des importeurs par un
+INSERT multi-valeurs (psycopg2.extras.execute_values). Avec la taille de page
+par défaut, une table de référence est chargée en un seul aller-retour.
+
+Functions:
+    upsert_rows: INSERT par lots avec ON CONFLICT (mise à jour ou ignorée)
+    ensure_unique: Ajoute à une table existante la contrainte unique visée
+        par ON CONFLICT (doublons supprimés et signalés au préalable)
+"""
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+# Nombre de lignes par requête INSERT
+PAGE_SIZE = 1000
+
+# Nombre maximum de doublons supprimés détaillés dans la console
+MAX_DOUBLONS_AFFICHES = 10
+
+
+def upsert_rows(cursor, table, columns, rows, conflict_columns=None,
+                update_columns=None, page_size=PAGE_SIZE):
+    """
+    Insère des lignes par lots, avec upsert optionnel.
+
+    Args:
+        cursor: Curseur psycopg2 (la transaction reste gérée par l'appelant)
+        table (str): Table cible
+        columns (list): Colonnes insérées, dans l'ordre des tuples
+        rows (iterable): Tuples de valeurs
+        conflict_columns (list, optional): Colonnes de la contrainte unique ;
+            sans elles, simple INSERT par lots
+        update_columns (list, optional): Colonnes mises à jour en cas de conflit ;
+            par défaut toutes les colonnes hors clé, liste vide = DO NOTHING
+        page_size (int): Nombre de lignes par requête
+
+    Returns:
+        int: Nombre de lignes envoyées
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(sql.Identifier(col) for col in columns),
+    )
+
+    if conflict_columns:
+        # Une même clé ne peut apparaître qu'une fois par requête ON CONFLICT :
+        # on garde la dernière occurrence
+        key_index = [columns.index(col) for col in conflict_columns]
+        rows = list({tuple(row[i] for i in key_index): row for row in rows}.values())
+
+        if update_columns is None:
+            update_columns = [col for col in columns if col not in conflict_columns]
+
+        conflict = sql.SQL(", ").join(sql.Identifier(col) for col in conflict_columns)
+        if update_columns:
+            updates = sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(col))
+                for col in update_columns
+            )
+            query += sql.SQL(" ON CONFLICT ({}) DO UPDATE SET {}").format(conflict, updates)
+        else:
+            query += sql.SQL(" ON CONFLICT ({}) DO NOTHING").format(conflict)
+
+    execute_values(cursor, query.as_string(cursor), rows, page_size=page_size)
+    return len(rows)
+
+
+def ensure_unique(cursor, table, columns, key="id"):
+    """
+    Garantit une contrainte unique sur `columns` (cible d'un ON CONFLICT).
+
+    Les tables créées avant l'ajout de la contrainte dans leur CREATE TABLE
+    IF NOT EXISTS ne l'ont pas : les doublons existants sont supprimés (la
+    ligne de plus grand `key` est gardée), puis la contrainte est ajoutée.
+    Les lignes supprimées sont signalées dans la console (nombre, `key` et
+    valeurs de la clé). Sans effet si un index unique existe déjà sur ces
+    colonnes.
+
+    Args:
+        cursor: Curseur psycopg2 (la transaction reste gérée par l'appelant)
+        table (str): Table existante
+        columns (list): Colonnes de la contrainte
+        key (str): Colonne départageant les doublons (la plus grande est gardée)
+
+    Returns:
+        int|None: Nombre de doublons supprimés, None si la contrainte existait
+    """
+    cursor.execute("""
+        SELECT 1 FROM pg_index i
+        WHERE i.indrelid = %s::regclass AND i.indisunique AND i.indpred IS NULL
+          AND (SELECT array_agg(a.attname::text ORDER BY a.attname)
+               FROM pg_attribute a
+               WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)) = %s
+    """, (table, sorted(columns)))
+    if cursor.fetchone():
+        return None
+
+    same_key = sql.SQL(" AND ").join(
+        sql.SQL("a.{0} = b.{0}").format(sql.Identifier(col)) for col in columns
+    )
+    cursor.execute(sql.SQL(
+        "DELETE FROM {0} a USING {0} b WHERE {1} AND a.{2} < b.{2} RETURNING a.{2}, {3}"
+    ).format(
+        sql.Identifier(table), same_key, sql.Identifier(key),
+        sql.SQL(", ").join(sql.SQL("a.{}").format(sql.Identifier(col)) for col in columns),
+    ))
+    deleted = cursor.fetchall()
+    removed = len(deleted)
+    if removed:
+        print(f"⚠️ {table} : {removed} doublons sur ({', '.join(columns)}) supprimés "
+              f"avant l'ajout de la contrainte unique")
+        for row in deleted[:MAX_DOUBLONS_AFFICHES]:
+            print(f"   - {key}={row[0]} {tuple(row[1:])}")
+        if removed > MAX_DOUBLONS_AFFICHES:
+            print(f"   ... et {removed - MAX_DOUBLONS_AFFICHES} autres")
+    cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} UNIQUE ({})").format(
+        sql.Identifier(table),
+        sql.Identifier(f"{table}_{'_'.join(columns)}_key"[:63]),
+        sql.SQL(", ").join(sql.Identifier(col) for col in columns),
+    ))
+    return removed
@@ -0,0 +1,289 @@
+"""
+Chargement en masse PostgreSQL via COPY FROM STDIN.
+
+Remplace les imports pandas `to_sql` (INSERT multi-lignes) par le protocole
+COPY de PostgreSQL : les fichiers CSV sont envoyés tels quels au serveur,
+sans passer par des DataFrames ligne à ligne.
+
+Étapes:
+    1. COPY de chaque CSV dans une table temporaire en TEXT, sur l'union des
+       colonnes de tous les fichiers (aucun type supposé à l'avance) : une
+       table temporaire n'écrit pas dans le WAL
+    2. Types déduits en SQL sur toutes les lignes (entier, décimal, booléen,
+       sinon texte), comme l'élargissement de types de pandas.concat
+    3. Conversion en un seul INSERT ... SELECT dans la table de staging
+       typée, journalisée : les lignes ne sont écrites qu'une fois dans le WAL
+       (un passage UNLOGGED -> LOGGED réécrirait toute la table)
+    4. ANALYZE puis bascule atomique de la staging à la place de la table
+       cible (voir table_swap.py)
+
+Functions:
+    copy_csv_files: Charge une liste de CSV dans une table via staging + bascule
+    copy_dataframe: Envoie un DataFrame en COPY depuis un buffer mémoire
+    benchmark_to_sql: Mesure le débit de l'ancien chemin to_sql pour comparaison
+"""
+
+import csv
+import io
+import os
+import time
+
+import pandas as pd
+from psycopg2 import sql
+
+from table_swap import shadow_name, analyze_table, swap_into_place
+
+# Types candidats, du plus étroit au plus large : (type_pg, condition sur la
+# valeur texte). Une colonne prend le premier type valable pour toutes ses
+# valeurs non nulles, TEXT sinon.
+PG_TYPES = [
+    ("BIGINT", "{col} ~ '^[+-]?[0-9]{{1,18}}$'"),
+    ("DOUBLE PRECISION", "{col} ~ '^[+-]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][+-]?[0-9]+)?$'"),
+    ("BOOLEAN", "lower({col}) IN ('true', 'false')"),
+]
+
+
+def read_header(csv_path, sep=",", encoding="utf-8"):
+    """Lit uniquement la ligne d'en-tête d'un CSV"""
+    with open(csv_path, newline="", encoding=encoding) as f:
+        return next(csv.reader(f, delimiter=sep))
+
+
+def union_columns(csv_paths, sep=",", encoding="utf-8"):
+    """Colonnes de tous les fichiers, dans l'ordre de première apparition"""
+    columns = []
+    for csv_path in csv_paths:
+        columns.extend(col for col in read_header(csv_path, sep, encoding) if col not in columns)
+    return columns
+
+
+def infer_column_types(cursor, table, columns):
+    """
+    Déduit les types PostgreSQL des colonnes d'une table chargée en TEXT.
+
+    Une seule lecture de la table : pour chaque colonne et chaque type
+    candidat, bool_and indique si toutes les valeurs non nulles s'y
+    convertissent. Une colonne entièrement vide reste en TEXT.
+
+    Returns:
+        list: [(colonne, type_pg), ...] dans l'ordre de `columns`
+    """
+    checks = []
+    for col in columns:
+        identifier = sql.Identifier(col).as_string(cursor)
+        checks.append(f"count({identifier}) > 0")
+        checks.extend(
+            f"coalesce(bool_and({condition.format(col=identifier)}), true)"
+            for _, condition in PG_TYPES
+        )
+    cursor.execute(
+        sql.SQL("SELECT {} FROM {}").format(sql.SQL(", ".join(checks)), sql.Identifier(table))
+    )
+    row = cursor.fetchone()
+
+    types = []
+    width = len(PG_TYPES) + 1
+    for i, col in enumerate(columns):
+        has_values, *valid = row[i * width:(i + 1) * width]
+        pg_type = next((name for (name, _), ok in zip(PG_TYPES, valid) if ok), "TEXT")
+        types.append((col, pg_type if has_values else "TEXT"))
+    return types
+
+
+def create_text_table(cursor, table, columns):
+    """
+    Crée une table temporaire de chargement, toutes colonnes en TEXT.
+
+    Une colonne `_ligne` conserve l'ordre de chargement des fichiers.
+    La table disparaît à la fin de la session.
+    """
+    definitions = [sql.SQL("_ligne BIGINT GENERATED ALWAYS AS IDENTITY")] + [
+        sql.SQL("{} TEXT").format(sql.Identifier(col)) for col in columns
+    ]
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+    cursor.execute(sql.SQL("CREATE TEMP TABLE {} ({})").format(
+        sql.Identifier(table), sql.SQL(", ").join(definitions)
+    ))
+
+
+def insert_typed(cursor, source, target, columns):
+    """Copie la table TEXT dans la staging typée, dans l'ordre de chargement"""
+    targets = sql.SQL(", ").join(sql.Identifier(col) for col, _ in columns)
+    values = sql.SQL(", ").join(
+        sql.SQL("{}::{}").format(sql.Identifier(col), sql.SQL(pg_type))
+        for col, pg_type in columns
+    )
+    cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {} ORDER BY _ligne").format(
+        sql.Identifier(target), targets, values, sql.Identifier(source)
+    ))
+
+
+def create_staging_table(cursor, table, columns, with_id=True):
+    """
+    Crée (ou recrée) la table de staging typée, remplie depuis la table TEXT.
+
+    Args:
+        cursor: Curseur psycopg2
+        table (str): Nom de la table de staging
+        columns (list): [(colonne, type_pg), ...]
+        with_id (bool): Ajoute une colonne id auto-incrémentée (ordre de chargement)
+    """
+    definitions = [
+        sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(pg_type))
+        for col, pg_type in columns
+    ]
+    if with_id:
+        definitions.insert(0, sql.SQL("id BIGINT GENERATED ALWAYS AS IDENTITY"))
+
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier(table)))
+    cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(
+        sql.Identifier(table), sql.SQL(", ").join(definitions)
+    ))
+
+
+def copy_csv(cursor, csv_path, table, sep=",", encoding="utf-8"):
+    """
+    Envoie un fichier CSV en streaming dans une table via COPY FROM STDIN.
+
+    Les colonnes sont désignées par leur nom d'en-tête : l'ordre des colonnes
+    peut varier d'un fichier à l'autre.
+
+    Returns:
+        int: Nombre de lignes chargées
+    """
+    header = read_header(csv_path, sep, encoding)
+    copy_sql = sql.SQL(
+        "COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true, DELIMITER {}, ENCODING {})"
+    ).format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(sql.Identifier(col) for col in header),
+        sql.Literal(sep),
+        sql.Literal(encoding.replace("-", "").upper()),
+    )
+    with open(csv_path, "rb") as f:
+        cursor.copy_expert(copy_sql.as_string(cursor), f)
+    return cursor.rowcount
+
+
+def copy_dataframe(cursor, df, table):
+    """
+    Envoie un DataFrame dans une table existante via COPY depuis un buffer.
+
+    Returns:
+        int: Nombre de lignes chargées
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(sql.Identifier(str(col)) for col in df.columns),
+    )
+    cursor.copy_expert(copy_sql.as_string(cursor), buffer)
+    return cursor.rowcount
+
+
+def swap_staging_table(raw_conn, staging, target):
+    """
+    Remplace la table cible par la table de staging.
+
+    Les statistiques de la staging sont calculées avant la bascule atomique :
+    la table cible reste lisible jusqu'au COMMIT.
+    """
+    with raw_conn.cursor() as cursor:
+        analyze_table(cursor, staging)
+    raw_conn.commit()
+
+    swap_into_place(raw_conn, staging, target)
+
+
+def copy_csv_files(engine, csv_paths, target, sep=",", encoding="utf-8",
+                   with_id=True, before_swap=None):
+    """
+    Charge un ou plusieurs CSV dans `target` via COPY.
+
+    Les fichiers peuvent avoir des colonnes différentes (union des colonnes,
+    valeurs absentes à NULL) ; les types sont déduits de toutes les lignes.
+
+    Args:
+        engine: Engine SQLAlchemy (psycopg2)
+        csv_paths (list): Fichiers à charger, dans l'ordre
+        target (str): Table finale
+        sep (str): Séparateur CSV
+        encoding (str): Encodage des fichiers
+        with_id (bool): Ajoute une colonne id (ordre de chargement)
+        before_swap (callable, optional): Appelé avec le curseur et le nom de
+            la staging avant la bascule (clés, index...)
+
+    Returns:
+        dict: {"rows": lignes chargées, "seconds": durée, "rows_per_s": débit}
+    """
+    staging = shadow_name(target)
+    text_table = f"{staging}_texte"
+    header = union_columns(csv_paths, sep, encoding)
+
+    start = time.perf_counter()
+    raw_conn = engine.raw_connection()
+    try:
+        rows = 0
+        with raw_conn.cursor() as cursor:
+            create_text_table(cursor, text_table, header)
+            for csv_path in csv_paths:
+                loaded = copy_csv(cursor, csv_path, text_table, sep, encoding)
+                print(f"      📥 {os.path.basename(csv_path)}: {loaded:,} lignes (COPY)")
+                rows += loaded
+
+            columns = infer_column_types(cursor, text_table, header)
+            create_staging_table(cursor, staging, columns, with_id=with_id)
+            insert_typed(cursor, text_table, staging, columns)
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(text_table)))
+            if before_swap:
+                before_swap(cursor, staging)
+        raw_conn.commit()
+
+        swap_staging_table(raw_conn, staging, target)
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    seconds = time.perf_counter() - start
+    return {"rows": rows, "seconds": seconds, "rows_per_s": rows / seconds if seconds else 0}
+
+
+def benchmark_to_sql(engine, csv_paths, sep=",", encoding="utf-8"):
+    """
+    Mesure le débit de l'ancien chemin pandas to_sql(method='multi').
+
+    Les données sont écrites dans une table jetable, supprimée à la fin.
+
+    Returns:
+        dict: {"rows": lignes chargées, "seconds": durée, "rows_per_s": débit}
+    """
+    scratch = "bench_to_sql_scratch"
+    start = time.perf_counter()
+    df = pd.concat(
+        (pd.read_csv(path, sep=sep, encoding=encoding) for path in csv_paths),
+        ignore_index=True,
+    )
+    df.to_sql(scratch, engine, index=False, if_exists="replace", method="multi", chunksize=1000)
+    seconds = time.perf_counter() - start
+
+    raw_conn = engine.raw_connection()
+    try:
+        with raw_conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(scratch)))
+        raw_conn.commit()
+    finally:
+        raw_conn.close()
+
+    return {"rows": len(df), "seconds": seconds, "rows_per_s": len(df) / seconds if seconds else 0}
+
+
+def print_throughput(label, stats, reference=None):
+    """Affiche le débit d'un chargement, et le gain par rapport à une référence"""
+    line = f"   ⚡ {label}: {stats['rows']:,} lignes en {stats['seconds']:.2f}s ({stats['rows_per_s']:,.0f} lignes/s)"
+    if reference and reference["rows_per_s"]:
+        line += f" - x{stats['rows_per_s'] / reference['rows_per_s']:.1f} vs to_sql"
+    print(line)
@@ -0,0 +1,173 @@
+"""
+Schéma de la table indices_qualite_air_consolides.
+
+La table est partitionnée par mois sur date_prise_mesure (type DATE) :
+les requêtes par intervalle de dates n'explorent que les partitions
+concernées, et la rétention se fait par DETACH PARTITION.
+
+Les colonnes sont typées (DATE, SMALLINT pour les sous-indices) pour que
+les filtres de dates et de zones utilisent des parcours d'index par
+intervalle plutôt que des comparaisons de texte.
+
+La table longue indices_qualite_air_polluants (une ligne par zone, date et
+polluant) est construite à la consolidation : un filtre sur le polluant y
+devient une recherche d'index au lieu d'un OR sur plusieurs colonnes.
+
+Functions:
+    create_consolidated_table: Crée la table partitionnée et sa partition DEFAULT
+    load_consolidated: Crée les partitions nécessaires puis insère les données
+    create_long_table: Crée la table longue (zone, date, polluant, code)
+    load_long: Remplit la table longue à partir de la table consolidée
+"""
+
+from psycopg2 import sql
+
+from partitions import create_default_partition, ensure_partitions_for_query
+
+CONSOLIDATED_TABLE = 'indices_qualite_air_consolides'
+PARTITION_KEY = 'date_prise_mesure'
+
+# Colonnes dans l'ordre attendu des requêtes de chargement
+CONSOLIDATED_COLUMNS = [
+    ('id', 'BIGINT NOT NULL'),
+    ('aasqa', 'TEXT'),
+    ('no2', 'SMALLINT'),
+    ('o3', 'SMALLINT'),
+    ('pm10', 'SMALLINT'),
+    ('pm25', 'SMALLINT'),
+    ('date_prise_mesure', 'DATE'),
+    ('qualite_air', 'TEXT'),
+    ('zone', 'TEXT'),
+    ('source', 'TEXT'),
+    ('type_zone', 'TEXT'),
+    ('code_zone', 'TEXT'),
+    ('fichier_source', 'TEXT'),
+]
+
+# Index créés sur la table partitionnée, donc sur chaque partition
+CONSOLIDATED_INDEXES = {
+    f"idx_consolides_{col}": f"({col})"
+    for col in ['id', 'aasqa', 'fichier_source', 'date_prise_mesure', 'qualite_air']
+}
+# text_pattern_ops : utilisable pour l'égalité et pour les préfixes LIKE 'x%'
+# quelle que soit la collation de la base
+CONSOLIDATED_INDEXES.update({
+    f"idx_consolides_{col}": f"({col} text_pattern_ops)"
+    for col in ['code_zone', 'zone']
+})
+
+# Conversion d'une date texte 'AAAA/MM/JJ' des sources en DATE (NULL si illisible)
+DATE_FROM_TEXT_SQL = (
+    "CASE WHEN {col}::text ~ '^[0-9]{{4}}/[0-9]{{2}}/[0-9]{{2}}$' "
+    "THEN to_date({col}::text, 'YYYY/MM/DD') END"
+)
+
+
+def create_consolidated_table(cursor, table=CONSOLIDATED_TABLE):
+    """
+    Crée la table consolidée partitionnée par mois (et sa partition DEFAULT).
+
+    La clé de partitionnement pouvant être NULL (date illisible), la table n'a
+    pas de clé primaire : id est indexé sur chaque partition.
+    """
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier(table)))
+    cursor.execute(sql.SQL("CREATE TABLE {} ({}) PARTITION BY RANGE ({})").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(
+            sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(pg_type))
+            for col, pg_type in CONSOLIDATED_COLUMNS
+        ),
+        sql.Identifier(PARTITION_KEY),
+    ))
+    create_default_partition(cursor, table)
+
+
+def load_consolidated(cursor, table, source_sql):
+    """
+    Insère le résultat d'une requête dans la table consolidée.
+
+    Les partitions mensuelles couvrant les dates de la requête sont créées
+    avant l'insertion.
+
+    Args:
+        cursor: Curseur psycopg2
+        table (str): Table consolidée (ou sa table fantôme)
+        source_sql (str): Requête renvoyant les colonnes de CONSOLIDATED_COLUMNS
+
+    Returns:
+        tuple: (lignes insérées, partitions couvrant les données)
+    """
+    partitions = ensure_partitions_for_query(cursor, table, source_sql, PARTITION_KEY)
+    columns = sql.SQL(", ").join(sql.Identifier(col) for col, _ in CONSOLIDATED_COLUMNS)
+    cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM ({}) s").format(
+        sql.Identifier(table), columns, columns, sql.SQL(source_sql)
+    ))
+    return cursor.rowcount, partitions
+
+
+# ========== FORMAT LONG (zone, date, polluant, code) ==========
+
+LONG_TABLE = 'indices_qualite_air_polluants'
+
+LONG_COLUMNS = [
+    ('id', 'BIGINT NOT NULL'),
+    ('code_zone', 'TEXT'),
+    ('date_prise_mesure', 'DATE'),
+    ('polluant', 'TEXT NOT NULL'),
+    ('code', 'SMALLINT NOT NULL'),
+]
+
+# Sous-indices de la table consolidée : {polluant: colonne}
+POLLUTANT_COLUMNS = {'NO2': 'no2', 'O3': 'o3', 'PM10': 'pm10', 'PM25': 'pm25'}
+
+LONG_INDEXES = {
+    "idx_polluants_polluant_zone_date": "(polluant, code_zone, date_prise_mesure DESC)",
+    "idx_polluants_zone_date": "(code_zone, date_prise_mesure DESC)",
+}
+
+
+def create_long_table(cursor, table=LONG_TABLE):
+    """Crée la table longue, partitionnée par mois comme la table consolidée"""
+    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier(table)))
+    cursor.execute(sql.SQL("CREATE TABLE {} ({}) PARTITION BY RANGE ({})").format(
+        sql.Identifier(table),
+        sql.SQL(", ").join(
+            sql.SQL("{} {}").format(sql.Identifier(col), sql.SQL(pg_type))
+            for col, pg_type in LONG_COLUMNS
+        ),
+        sql.Identifier(PARTITION_KEY),
+    ))
+    create_default_partition(cursor, table)
+
+
+def load_long(cursor, table, consolidated_table):
+    """
+    Dépivote les sous-indices de la table consolidée dans la table longue.
+
+    Args:
+        cursor: Curseur psycopg2
+        table (str): Table longue (ou sa table fantôme)
+        consolidated_table (str): Table consolidée déjà chargée
+
+    Returns:
+        tuple: (lignes insérées, partitions couvrant les données)
+    """
+    source = sql.SQL("""
+        SELECT c.id, c.code_zone, c.date_prise_mesure, v.polluant, v.code
+        FROM {} c
+        CROSS JOIN LATERAL (VALUES {}) AS v(polluant, code)
+        WHERE v.code IS NOT NULL
+    """).format(
+        sql.Identifier(consolidated_table),
+        sql.SQL(", ").join(
+            sql.SQL("({}, c.{})").format(sql.Literal(polluant), sql.Identifier(col))
+            for polluant, col in POLLUTANT_COLUMNS.items()
+        ),
+    ).as_string(cursor)
+
+    partitions = ensure_partitions_for_query(cursor, table, source, PARTITION_KEY)
+    columns = sql.SQL(", ").join(sql.Identifier(col) for col, _ in LONG_COLUMNS)
+    cursor.execute(sql.SQL("INSERT INTO {} ({}) {}").format(
+        sql.Identifier(table), columns, sql.SQL(source)
+    ))
+    return cursor.rowcount, partitions
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine, text
+from batch_insert import upsert_rows
 
 load_dotenv()
 engine = create_engine(f"postgresql+psycopg2://{os.getenv('PG_USER')}:{os.getenv('PG_PASSWORD')}@{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{os.getenv('PG_DATABASE')}")
@@ -51,14 +52,14 @@ def create_communes_simple():
                 ('28229', 'Lucé', '28', '28', 'Centre-Val de Loire')
             ]
             
-            for code, nom, aasqa, dept, region in communes_data:
-                conn.execute(text("""
-                    INSERT INTO communes (code_insee, nom_commune, aasqa_code, departement, region)
-                    VALUES (:code, :nom, :aasqa, :dept, :region)
-                """), {
-                    "code": code, "nom": nom, "aasqa": aasqa, 
-                    "dept": dept, "region": region
-                })
+            # Insertion en un seul lot (upsert sur le code INSEE)
+            with conn.connection.cursor() as cursor:
+                upsert_rows(
+                    cursor, 'communes',
+                    ['code_insee', 'nom_commune', 'aasqa_code', 'departement', 'region'],
+                    communes_data,
+                    conflict_columns=['code_insee']
+                )
             
             # 3. COMMIT IMMÉDIAT
             conn.commit()
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine, text
+from batch_insert import upsert_rows
 
 load_dotenv()
 engine = create_engine(f"postgresql+psycopg2://{os.getenv('PG_USER')}:{os.getenv('PG_PASSWORD')}@{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{os.getenv('PG_DATABASE')}")
@@ -42,6 +43,13 @@ def create_qualite_air_pm25():
                 )
             """))
             
+            # Index trigramme : recherche de station par nom partiel (ILIKE '%x%')
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text("""
+                CREATE INDEX idx_qualite_air_station_nom_trgm
+                ON qualite_air USING gin (station_nom gin_trgm_ops)
+            """))
+            
             print("   ✅ Structure créée")
             
             # 2. Insérer des mesures avec PM2.5 (pas PM25)
@@ -78,19 +86,14 @@ def create_qualite_air_pm25():
                 ('28134', 'PM2.5', '2024-06-14', '12:00:00', 15.3, 'µg/m³', 'Bon', 'Station Dreux Mendès France')
             ]
             
-            for code_insee, polluant, date, heure, valeur, unite, qualite, station in mesures_data:
-                conn.execute(text("""
-                    INSERT INTO qualite_air (
-                        code_insee, code_polluant, date_mesure, heure_mesure,
-                        valeur, unite, qualite_globale, station_nom, source_donnee
-                    ) VALUES (
-                        :code_insee, :polluant, :date, :heure,
-                        :valeur, :unite, :qualite, :station, 'EXEMPLE_PM2.5'
-                    )
-                """), {
-                    "code_insee": code_insee, "polluant": polluant, "date": date, "heure": heure,
-                    "valeur": valeur, "unite": unite, "qualite": qualite, "station": station
-                })
+            # Insertion en un seul lot
+            with conn.connection.cursor() as cursor:
+                upsert_rows(
+                    cursor, 'qualite_air',
+                    ['code_insee', 'code_polluant', 'date_mesure', 'heure_mesure',
+                     'valeur', 'unite', 'qualite_globale', 'station_nom', 'source_donnee'],
+                    [mesure + ('EXEMPLE_PM2.5',) for mesure in mesures_data]
+                )
             
             # 3. COMMIT
             conn.commit()
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine, text
+from batch_insert import upsert_rows
 import sys
 sys.path.append('../..')
 load_dotenv()
@@ -36,11 +37,9 @@ def create_architecture_tables():
                 ('44', 'Loire-Atlantique')
             ]
             
-            for aasqa_code, nom_region in aasqa_data:
-                conn.execute(text("""
-                    INSERT INTO aasqa_regions (aasqa_code, nom_region)
-                    VALUES (:aasqa_code, :nom_region)
-                """), {"aasqa_code": aasqa_code, "nom_region": nom_region})
+            with conn.connection.cursor() as cursor:
+                upsert_rows(cursor, 'aasqa_regions', ['aasqa_code', 'nom_region'],
+                            aasqa_data, conflict_columns=['aasqa_code'])
             
             count_aasqa = conn.execute(text("SELECT COUNT(*) FROM aasqa_regions")).fetchone()[0]
             print(f"   ✅ {count_aasqa} régions AASQA créées")
@@ -67,16 +66,9 @@ def create_architecture_tables():
                 ('Très mauvais', 'Qualité de l\'air très mauvaise', 'Violet', 5)
             ]
             
-            for niveau, description, couleur, ordre in niveaux_data:
-                conn.execute(text("""
-                    INSERT INTO indice (niveau, description, couleur, ordre)
-                    VALUES (:niveau, :description, :couleur, :ordre)
-                """), {
-                    "niveau": niveau,
-                    "description": description, 
-                    "couleur": couleur,
-                    "ordre": ordre
-                })
+            with conn.connection.cursor() as cursor:
+                upsert_rows(cursor, 'indice', ['niveau', 'description', 'couleur', 'ordre'],
+                            niveaux_data, conflict_columns=['niveau'])
             
             count_indice = conn.execute(text("SELECT COUNT(*) FROM indice")).fetchone()[0]
             print(f"   ✅ {count_indice} niveaux de qualité créés")
@@ -100,13 +92,9 @@ def create_architecture_tables():
                 ('SO2', 'Dioxyde de soufre', 'µg/m³')
             ]
             
-            for code, nom, unite in polluants_data:
-                conn.execute(text("""
-                    INSERT INTO polluants (code_polluant, nom_polluant, unite_mesure)
-                    VALUES (:code, :nom, :unite)
-                """), {
-                    "code": code, "nom": nom, "unite": unite
-                })
+            with conn.connection.cursor() as cursor:
+                upsert_rows(cursor, 'polluants', ['code_polluant', 'nom_polluant', 'unite_mesure'],
+                            polluants_data, conflict_columns=['code_polluant'])
             
             count_polluants = conn.execute(text("SELECT COUNT(*) FROM polluants")).fetchone()[0]
             print(f"   ✅ {count_polluants} polluants créés")
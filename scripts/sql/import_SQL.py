@@ -4,12 +4,13 @@ Assqa_2 (Martinique) + Assqa_27 (Normandie) + Assqa_28 (Eure-et-Loir)
 """
 from dotenv import load_dotenv
 import os
+import sys
 from sqlalchemy import create_engine, text
-import pandas as pd
+from bulk_copy import copy_csv_files, benchmark_to_sql, print_throughput
 
 load_dotenv('../../.env')  # Charge les variables du fichier .env
 
-def import_csv_simple():
+def import_csv_simple(benchmark=False):
     print("🚀 IMPORT SIMPLIFIÉ - CONCATÉNATION 3 FICHIERS CSV")
     print("=" * 60)
     
@@ -38,57 +39,34 @@ def import_csv_simple():
             print(f"   ❌ {fichier} INTROUVABLE")
             return False
     
-    # 3. LECTURE ET CONCATÉNATION
-    print(f"\n🔄 Lecture et concaténation des fichiers...")
-    dataframes = []
+    chemins = [os.path.join(data_folder, fichier) for fichier in fichiers_csv]
     
-    for fichier in fichiers_csv:
-        chemin = os.path.join(data_folder, fichier)
-        print(f"   📂 Lecture {fichier}...")
-        
-        try:
-            df = pd.read_csv(chemin, encoding='utf-8')
-            print(f"      📊 {len(df):,} lignes trouvées")
-            dataframes.append(df)
-        except Exception as e:
-            print(f"      ❌ Erreur: {e}")
-            return False
+    # 3. MESURE DE L'ANCIEN CHEMIN (optionnelle)
+    reference = None
+    if benchmark:
+        print(f"\n⏱️ Mesure de l'ancien import pandas to_sql...")
+        reference = benchmark_to_sql(engine, chemins)
+        print_throughput("to_sql (multi, chunks de 1000)", reference)
     
-    # Concaténation
-    df_final = pd.concat(dataframes, ignore_index=True)
-    print(f"\n✅ Concaténation terminée: {len(df_final):,} lignes totales")
+    # 4. IMPORT COPY DANS UNE TABLE DE STAGING PUIS BASCULE
+    # La table existante reste en place jusqu'à la bascule finale
+    print(f"\n📥 Import COPY dans PostgreSQL...")
     
-    # 4. NETTOYAGE DE LA TABLE EXISTANTE
-    print(f"\n🗑️ Nettoyage de la table existante...")
-    with engine.connect() as conn:
-        try:
-            conn.execute(text("DROP TABLE IF EXISTS indices_qualite_air_consolides CASCADE"))
-            conn.commit()
-            print(f"   ✅ Table supprimée")
-        except Exception as e:
-            print(f"   ⚠️ Pas de table à supprimer: {e}")
+    def ajouter_cle_primaire(cursor, staging):
+        cursor.execute(f"ALTER TABLE {staging} ADD PRIMARY KEY (id)")
     
-    # 5. IMPORT DANS POSTGRESQL
-    print(f"\n📥 Import dans PostgreSQL...")
     try:
-        df_final.to_sql(
-            'indices_qualite_air_consolides',
+        stats = copy_csv_files(
             engine,
-            index=False,  # Pas d'index pandas
-            if_exists='replace',  # Remplacer si existe
-            method='multi',  # Import optimisé
-            chunksize=1000  # Par chunks de 1000 lignes
+            chemins,
+            'indices_qualite_air_consolides',
+            before_swap=ajouter_cle_primaire
         )
-        print(f"   ✅ Import terminé: {len(df_final):,} lignes importées")
-        
-        # 6. AJOUTER UNE CLÉ PRIMAIRE
-        print(f"\n🔑 Ajout d'une clé primaire...")
-        with engine.connect() as conn:
-            conn.execute(text("ALTER TABLE indices_qualite_air_consolides ADD COLUMN id SERIAL PRIMARY KEY"))
-            conn.commit()
-            print(f"   ✅ Clé primaire ajoutée")
+        print(f"   ✅ Import terminé: {stats['rows']:,} lignes importées")
+        print(f"   🔑 Clé primaire id en place")
+        print_throughput("COPY", stats, reference)
         
-        # 7. VÉRIFICATION FINALE
+        # 5. VÉRIFICATION FINALE
         print(f"\n✅ VÉRIFICATION FINALE:")
         with engine.connect() as conn:
             count = conn.execute(text("SELECT COUNT(*) FROM indices_qualite_air_consolides")).fetchone()[0]
@@ -98,7 +76,7 @@ def import_csv_simple():
             sample = conn.execute(text("SELECT * FROM indices_qualite_air_consolides LIMIT 3")).fetchall()
             print(f"   📋 Échantillon:")
             for row in sample:
-                print(f"      - AASQA: {row[0]} | Date: {row[6]} | Qualité: {row[7]}")
+                print(f"      - AASQA: {row[1]} | Date: {row[7]} | Qualité: {row[8]}")
         
         return True
         
@@ -112,7 +90,7 @@ if __name__ == "__main__":
     print("-" * 60)
     
     try:
-        succes = import_csv_simple()
+        succes = import_csv_simple(benchmark="--benchmark" in sys.argv)
         
         if succes:
             print(f"\n🎉 IMPORT TERMINÉ AVEC SUCCÈS !")
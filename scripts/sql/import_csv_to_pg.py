@@ -1,37 +1,51 @@
 import os
 import pandas as pd
 import psycopg2
-from psycopg2 import sql
+from batch_insert import upsert_rows, ensure_unique
 
 def import_recommandations_base(cur, df):
-    for _, row in df.iterrows():
-        cur.execute('''
-            INSERT INTO recommandations_base (profil_cible, niveau_pollution, type_activite, conseil, niveau_urgence, icone, actif, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (
-            row['profil_cible'],
-            row['niveau_pollution'],
-            row['type_activite'],
-            row['conseil'],
-            int(row['niveau_urgence']) if not pd.isna(row['niveau_urgence']) else None,
-            row['icone'],
-            bool(row['actif']) if not pd.isna(row['actif']) else True,
-            row['created_at'] if not pd.isna(row['created_at']) else None
-        ))
+    rows = [
+        (
+            row.profil_cible,
+            row.niveau_pollution,
+            row.type_activite,
+            row.conseil,
+            int(row.niveau_urgence) if not pd.isna(row.niveau_urgence) else None,
+            row.icone,
+            bool(row.actif) if not pd.isna(row.actif) else True,
+            row.created_at if not pd.isna(row.created_at) else None
+        )
+        for row in df.itertuples(index=False)
+    ]
+    ensure_unique(cur, 'recommandations_base', ['profil_cible', 'niveau_pollution', 'type_activite'])
+    upsert_rows(
+        cur, 'recommandations_base',
+        ['profil_cible', 'niveau_pollution', 'type_activite', 'conseil',
+         'niveau_urgence', 'icone', 'actif', 'created_at'],
+        rows,
+        conflict_columns=['profil_cible', 'niveau_pollution', 'type_activite']
+    )
 
 def import_seuils_personnalises(cur, df):
-    for _, row in df.iterrows():
-        cur.execute('''
-            INSERT INTO seuils_personnalises (profil_type, polluant, seuil_info, seuil_alerte, pourcentage_reduction, conseil_depassement)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        ''', (
-            row['profil_type'],
-            row['polluant'],
-            int(row['seuil_info']),
-            int(row['seuil_alerte']),
-            int(row['pourcentage_reduction']),
-            row['conseil_depassement']
-        ))
+    rows = [
+        (
+            row.profil_type,
+            row.polluant,
+            int(row.seuil_info),
+            int(row.seuil_alerte),
+            int(row.pourcentage_reduction),
+            row.conseil_depassement
+        )
+        for row in df.itertuples(index=False)
+    ]
+    upsert_rows(
+        cur, 'seuils_personnalises',
+        ['profil_type', 'polluant', 'seuil_info', 'seuil_alerte',
+         'pourcentage_reduction', 'conseil_depassement'],
+        rows,
+        conflict_columns=['profil_type', 'polluant'],
+        update_columns=[]  # DO NOTHING : les seuils modifiés ne sont pas écrasés
+    )
 
 def main():
     conn = psycopg2.connect(
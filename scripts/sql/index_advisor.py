@@ -0,0 +1,334 @@
+"""
+Conseiller d'index PostgreSQL basé sur les requêtes réelles de l'API.
+
+Les index créés à l'initialisation sont mono-colonnes et ne correspondent
+pas aux prédicats réellement envoyés par l'API (ILIKE '%x%' sur les noms
+de station, (code_insee, date_mesure DESC) des recommandations, préfixes
+de zone + tri par date du script hybride...). Ce script :
+
+    1. Lit pg_stat_statements (appels, temps cumulé) pour chaque forme de
+       requête connue de l'API
+    2. Lit les paramètres journalisés par l'API (logs/api.log) pour savoir
+       quels filtres sont réellement utilisés et avec quelles valeurs
+    3. Propose les index composites, partiels ou trigrammes (pg_trgm)
+       manquants pour les formes de requêtes observées
+    4. Avec --apply : crée les index et affiche le plan d'exécution avant
+       et après sur une requête représentative
+
+Usage:
+    python index_advisor.py [--apply] [--log ../api/logs/api.log] [--top 20]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+
+import psycopg2
+from psycopg2 import errors, sql
+from dotenv import load_dotenv
+
+from consolidated_schema import CONSOLIDATED_TABLE
+
+load_dotenv('../../.env')
+
+DATABASE_CONFIG = {
+    "host": os.getenv("PG_HOST", "localhost"),
+    "database": os.getenv("PG_DATABASE"),
+    "user": os.getenv("PG_USER"),
+    "password": os.getenv("PG_PASSWORD"),
+    "port": os.getenv("PG_PORT", 5432)
+}
+
+DEFAULT_API_LOG = os.path.join(os.path.dirname(__file__), '..', 'api', 'logs', 'api.log')
+
+# Formes de requêtes émises par l'API et index adaptés.
+#   motif     : regex reconnaissant la requête normalisée de pg_stat_statements
+#   endpoint  : entrée de logs/api.log correspondante
+#   parametre : paramètre journalisé qui déclenche ce filtre (None = toujours)
+#   exemple   : requête représentative utilisée pour EXPLAIN
+#   valeur    : mise en forme de la valeur du paramètre pour l'exemple
+QUERY_SHAPES = [
+    {
+        "nom": "qualite_air_station",
+        "type": "trigramme",
+        "table": "qualite_air",
+        "motif": r"from qualite_air .*station_nom ilike",
+        "endpoint": "/api/qualite-air/qualite-air",
+        "parametre": "station",
+        "defaut": "Caen",
+        "valeur": lambda v: f"%{v}%",
+        "exemple": "SELECT id, code_insee, code_polluant, valeur, qualite_globale, station_nom "
+                   "FROM qualite_air WHERE station_nom ILIKE %s LIMIT 50",
+        "extension": "pg_trgm",
+        "index": ("idx_qualite_air_station_nom_trgm", "USING gin (station_nom gin_trgm_ops)"),
+    },
+    {
+        "nom": "qualite_air_commune_polluant",
+        "type": "composite",
+        "table": "qualite_air",
+        "motif": r"from qualite_air .*code_insee = .*code_polluant = ",
+        "endpoint": "/api/qualite-air/qualite-air",
+        "parametre": "code_insee",
+        "defaut": "14118",
+        "valeur": lambda v: v,
+        "exemple": "SELECT id, code_insee, code_polluant, valeur, qualite_globale, station_nom "
+                   "FROM qualite_air WHERE code_insee = %s AND code_polluant = 'NO2' LIMIT 50",
+        "index": ("idx_qualite_air_insee_polluant", "(code_insee, code_polluant)"),
+    },
+    {
+        "nom": "recommandations_commune_date",
+        "type": "composite",
+        "table": "qualite_air",
+        "motif": r"from qualite_air qa .*qa\.code_insee = .*order by qa\.date_mesure desc",
+        "endpoint": "/api/recommandations",
+        "parametre": None,
+        "defaut": "14118",
+        "valeur": lambda v: v,
+        "exemple": "SELECT code_polluant, valeur FROM qualite_air "
+                   "WHERE code_insee = %s AND date_mesure >= CURRENT_DATE - INTERVAL '1 day' "
+                   "ORDER BY date_mesure DESC LIMIT 10",
+        "index": ("idx_qualite_air_insee_date", "(code_insee, date_mesure DESC)"),
+    },
+    {
+        "nom": "seuils_profil_polluant",
+        "type": "composite",
+        "table": "seuils_personnalises",
+        "motif": r"from seuils_personnalises .*profil_type = .*polluant = ",
+        "endpoint": "/api/recommandations",
+        "parametre": None,
+        "defaut": "sensible",
+        "valeur": lambda v: v,
+        "exemple": "SELECT seuil_info, seuil_alerte, conseil_depassement FROM seuils_personnalises "
+                   "WHERE profil_type = %s AND polluant = 'NO2'",
+        "index": ("idx_seuils_profil_polluant", "(profil_type, polluant)"),
+    },
+    {
+        # code_zone LIKE 'x%' implique code_zone NOT NULL : index partiel,
+        # plus petit, sans les lignes dont la zone n'a pas pu être lue
+        "nom": "consolides_zone_date",
+        "type": "partiel",
+        "table": CONSOLIDATED_TABLE,
+        "motif": rf"from {CONSOLIDATED_TABLE} .*code_zone like .*order by date_prise_mesure desc",
+        "endpoint": "postgresql_query",
+        "parametre": "zone",
+        "defaut": "972",
+        "valeur": lambda v: f"{v}%",
+        "exemple": f"SELECT id, code_zone, date_prise_mesure, qualite_air FROM {CONSOLIDATED_TABLE} "
+                   "WHERE code_zone LIKE %s ORDER BY date_prise_mesure DESC LIMIT 10000",
+        "index": (
+            "idx_consolides_zone_date",
+            "(code_zone text_pattern_ops, date_prise_mesure DESC) WHERE code_zone IS NOT NULL",
+        ),
+    },
+]
+
+
+def normalize(query):
+    """Requête en minuscules sur une ligne, pour la comparaison aux motifs"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+def read_pg_stat_statements(cursor, top):
+    """
+    Statistiques des requêtes les plus coûteuses de la base courante.
+
+    Returns:
+        list: [(requête, appels, temps_total_ms, temps_moyen_ms), ...]
+            (vide si l'extension pg_stat_statements n'est pas installée)
+    """
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+    if cursor.fetchone() is None:
+        print("⚠️ pg_stat_statements non installée : analyse des logs API uniquement")
+        return []
+
+    # Colonnes renommées en PostgreSQL 13 (total_time -> total_exec_time)
+    for total, mean in (("total_exec_time", "mean_exec_time"), ("total_time", "mean_time")):
+        try:
+            cursor.execute(sql.SQL("""
+                SELECT query, calls, {total}, {mean}
+                FROM pg_stat_statements
+                WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                ORDER BY {total} DESC
+                LIMIT %s
+            """).format(total=sql.Identifier(total), mean=sql.Identifier(mean)), (top,))
+            return cursor.fetchall()
+        except errors.UndefinedColumn:
+            continue
+    return []
+
+
+def read_api_log(log_path):
+    """
+    Paramètres journalisés par l'API (lignes API_CALL de logs/api.log).
+
+    Returns:
+        dict: {endpoint: {"appels": int, "parametres": Counter, "valeurs": {param: Counter}}}
+    """
+    usage = defaultdict(lambda: {"appels": 0, "parametres": Counter(), "valeurs": defaultdict(Counter)})
+    if not os.path.exists(log_path):
+        print(f"⚠️ Log API introuvable ({log_path}) : analyse pg_stat_statements uniquement")
+        return usage
+
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            _, sep, payload = line.partition("API_CALL: ")
+            if not sep:
+                continue
+            try:
+                entry = json.loads(payload)
+            except ValueError:
+                continue
+            stats = usage[entry.get("endpoint")]
+            stats["appels"] += 1
+            for param, value in (entry.get("params") or {}).items():
+                if value not in (None, ""):
+                    stats["parametres"][param] += 1
+                    stats["valeurs"][param][str(value)] += 1
+    return usage
+
+
+def shape_statistics(shape, statements, usage):
+    """Agrège pg_stat_statements et les logs API pour une forme de requête"""
+    motif = re.compile(shape["motif"])
+    calls, total_ms = 0, 0.0
+    for query, query_calls, query_total, _ in statements:
+        if motif.search(normalize(query)):
+            calls += query_calls
+            total_ms += query_total
+
+    endpoint = usage.get(shape["endpoint"], {"appels": 0, "parametres": Counter(), "valeurs": {}})
+    if shape["parametre"]:
+        api_calls = endpoint["parametres"][shape["parametre"]]
+        frequent = endpoint["valeurs"].get(shape["parametre"], Counter()).most_common(1)
+    else:
+        api_calls = endpoint["appels"]
+        frequent = []
+
+    return {
+        "appels_pg": calls,
+        "temps_pg_ms": total_ms,
+        "appels_api": api_calls,
+        "valeur": frequent[0][0] if frequent else shape["defaut"],
+    }
+
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cursor.fetchone()[0]
+
+
+def index_exists(cursor, name):
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    return cursor.fetchone()[0]
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+    return cursor.fetchone() is not None
+
+
+def explain(cursor, shape, value):
+    """Plan d'exécution réel (EXPLAIN ANALYZE) de la requête représentative"""
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + shape["exemple"], (shape["valeur"](value),))
+    return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def create_index(cursor, shape):
+    """
+    Crée l'index proposé.
+
+    CONCURRENTLY sur les tables simples pour ne pas bloquer les écritures ;
+    impossible sur une table partitionnée, où l'index est créé directement.
+    """
+    if shape.get("extension"):
+        cursor.execute(sql.SQL("CREATE EXTENSION IF NOT EXISTS {}").format(sql.Identifier(shape["extension"])))
+
+    name, definition = shape["index"]
+    concurrently = sql.SQL("" if is_partitioned(cursor, shape["table"]) else "CONCURRENTLY")
+    cursor.execute(sql.SQL("CREATE INDEX {} IF NOT EXISTS {} ON {} {}").format(
+        concurrently, sql.Identifier(name), sql.Identifier(shape["table"]), sql.SQL(definition)
+    ))
+    cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(shape["table"])))
+
+
+def advise(apply=False, log_path=DEFAULT_API_LOG, top=20):
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    # CREATE INDEX CONCURRENTLY ne peut pas s'exécuter dans une transaction
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+
+        print("🔎 CONSEILLER D'INDEX")
+        print("=" * 50)
+
+        statements = read_pg_stat_statements(cursor, top)
+        usage = read_api_log(log_path)
+        print(f"📊 {len(statements)} requêtes pg_stat_statements, "
+              f"{sum(stats['appels'] for stats in usage.values())} appels API journalisés")
+
+        proposals = []
+        for shape in QUERY_SHAPES:
+            name, definition = shape["index"]
+            if not table_exists(cursor, shape["table"]):
+                print(f"   ⏭️ {shape['nom']}: table {shape['table']} absente")
+                continue
+            if index_exists(cursor, name):
+                print(f"   ✅ {shape['nom']}: index {name} déjà présent")
+                continue
+
+            stats = shape_statistics(shape, statements, usage)
+            if not (stats["appels_pg"] or stats["appels_api"]):
+                print(f"   💤 {shape['nom']}: forme de requête non observée")
+                continue
+            proposals.append((shape, stats))
+
+        if not proposals:
+            print("\n✅ Aucun index à proposer")
+            return True
+
+        print(f"\n💡 {len(proposals)} INDEX PROPOSÉS")
+        for shape, stats in proposals:
+            name, definition = shape["index"]
+            print(f"\n   • [{shape['type']}] CREATE INDEX {name} ON {shape['table']} {definition}")
+            print(f"     {stats['appels_pg']:,} exécutions PG ({stats['temps_pg_ms']:,.0f} ms cumulées), "
+                  f"{stats['appels_api']:,} appels API")
+
+        if not apply:
+            print("\n➡️ Relancer avec --apply pour créer ces index")
+            return True
+
+        print("\n🔧 APPLICATION")
+        for shape, stats in proposals:
+            name, _ = shape["index"]
+            print(f"\n{'=' * 50}\n📌 {name} (valeur d'exemple : {stats['valeur']!r})")
+
+            before = explain(cursor, shape, stats["valeur"])
+            create_index(cursor, shape)
+            after = explain(cursor, shape, stats["valeur"])
+
+            print("--- Plan avant ---")
+            print(before)
+            print("--- Plan après ---")
+            print(after)
+
+        print("\n✅ Index appliqués")
+        return True
+
+    except Exception as e:
+        print(f"❌ Erreur : {e}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Propose des index adaptés aux requêtes de l'API")
+    parser.add_argument("--apply", action="store_true", help="Crée les index proposés")
+    parser.add_argument("--log", default=DEFAULT_API_LOG, help="Fichier de log de l'API")
+    parser.add_argument("--top", type=int, default=20, help="Nombre de requêtes pg_stat_statements lues")
+    args = parser.parse_args()
+
+    sys.exit(0 if advise(args.apply, args.log, args.top) else 1)
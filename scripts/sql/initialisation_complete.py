@@ -10,19 +10,84 @@ Ce script permet de :
 4. Créer les index et contraintes
 5. Vérifier la qualité des données
 
-Usage: python initialisation_complete.py
+Usage:
+    python initialisation_complete.py            # Initialisation complète (DROP + création)
+    python initialisation_complete.py --reload   # Rechargement sans interruption de l'API
 """
 
 from dotenv import load_dotenv
 import os
 from sqlalchemy import create_engine, text
-import pandas as pd
+import sys
 import time
 from datetime import datetime
+from bulk_copy import copy_csv_files, print_throughput
+from table_swap import shadow_name, create_indexes, analyze_table, swap_tables_into_place
+from consolidated_schema import (
+    CONSOLIDATED_TABLE, CONSOLIDATED_INDEXES, DATE_FROM_TEXT_SQL,
+    LONG_TABLE, LONG_INDEXES,
+    create_consolidated_table, load_consolidated, create_long_table, load_long
+)
 
 # Chargement de la configuration
 load_dotenv('../../.env')
 
+# Requête de consolidation des tables AASQA, avec réalignement des colonnes
+# décalées des CSV sources et conversion des dates 'AAAA/MM/JJ' en DATE
+CONSOLIDATION_SQL = """
+    SELECT 
+        ROW_NUMBER() OVER (ORDER BY t.table_order, t.original_id) as id,
+        t.aasqa::text as aasqa,
+        t.no2::smallint as no2, t.o3::smallint as o3,
+        t.pm10::smallint as pm10, t.pm25::smallint as pm25,
+        {date_prise_mesure} as date_prise_mesure,
+        t.qualite_correcte as qualite_air,
+        t.zone_correcte as zone,
+        t.source_correcte as source,
+        t.type_zone_correct as type_zone,
+        t.code_zone_correct as code_zone,
+        t.fichier_source
+    FROM (
+        SELECT 1 as table_order, id as original_id, aasqa, no2, o3, pm10, pm25,
+               qualite_air as date_correcte,
+               libelle_zone as qualite_correcte,
+               source as zone_correcte,
+               type_zone as source_correcte,
+               'Région' as type_zone_correct,
+               CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
+                    THEN date_prise_mesure::text ELSE NULL END as code_zone_correct,
+               'assqa_2.csv' as fichier_source
+        FROM indices_qualite_assqa_2
+        
+        UNION ALL
+        
+        SELECT 2, id, aasqa, no2, o3, pm10, pm25,
+               qualite_air, libelle_zone, source, type_zone, 'Région',
+               CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
+                    THEN date_prise_mesure::text ELSE NULL END,
+               'assqa_27.csv'
+        FROM indices_qualite_assqa_27
+        
+        UNION ALL
+        
+        SELECT 3, id, aasqa, no2, o3, pm10, pm25,
+               qualite_air, libelle_zone, source, type_zone, 'Région',
+               CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
+                    THEN date_prise_mesure::text ELSE NULL END,
+               'assqa_28.csv'
+        FROM indices_qualite_assqa_28
+        
+        UNION ALL
+        
+        SELECT 4, id, aasqa, no2, o3, pm10, pm25,
+               qualite_air, libelle_zone, source, type_zone, 'Région',
+               CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
+                    THEN date_prise_mesure::text ELSE NULL END,
+               'assqa_44.csv'
+        FROM indices_qualite_assqa_44
+    ) t
+""".replace("{date_prise_mesure}", DATE_FROM_TEXT_SQL.format(col="t.date_correcte"))
+
 class DatabaseInitializer:
     def __init__(self):
         self.user = os.getenv("PG_USER")
@@ -56,6 +121,7 @@ class DatabaseInitializer:
         self.log("🗑️ Suppression des tables existantes...")
         
         tables = [
+            LONG_TABLE,
             'indices_qualite_air_consolides',
             'indices_qualite_assqa_2',
             'indices_qualite_assqa_27', 
@@ -91,106 +157,87 @@ class DatabaseInitializer:
                 
             self.log(f"   📄 Import de {csv_file}...")
             
-            # Lecture du CSV
-            df = pd.read_csv(csv_path, sep=';')
-            
-            # Import vers PostgreSQL
-            df.to_sql(table_name, self.engine, if_exists='replace', index=True, index_label='id')
+            # COPY du CSV dans une table de staging puis bascule
+            stats = copy_csv_files(self.engine, [csv_path], table_name, sep=';')
             
-            count = len(df)
+            count = stats['rows']
             total_imported += count
             self.log(f"      ✅ {count:,} lignes importées dans {table_name}")
+            print_throughput("COPY", stats)
         
         self.log(f"   📊 Total importé: {total_imported:,} lignes")
         return total_imported
     
-    def create_consolidated_table(self):
-        """Création de la table consolidée avec alignement correct"""
-        self.log("🏗️ Création de la table consolidée...")
+    def create_consolidated_table(self, table=CONSOLIDATED_TABLE):
+        """Création de la table consolidée (partitionnée par mois) avec alignement correct"""
+        self.log(f"🏗️ Création de la table consolidée {table}...")
         
-        with self.engine.connect() as conn:
-            create_sql = """
-                CREATE TABLE indices_qualite_air_consolides AS
-                SELECT 
-                    ROW_NUMBER() OVER (ORDER BY t.table_order, t.original_id) as id,
-                    t.aasqa, t.no2, t.o3, t.pm10, t.pm25,
-                    t.date_correcte as date_prise_mesure,
-                    t.qualite_correcte as qualite_air,
-                    t.zone_correcte as zone,
-                    t.source_correcte as source,
-                    t.type_zone_correct as type_zone,
-                    t.code_zone_correct as code_zone,
-                    t.fichier_source
-                FROM (
-                    SELECT 1 as table_order, id as original_id, aasqa, no2, o3, pm10, pm25,
-                           qualite_air as date_correcte,
-                           libelle_zone as qualite_correcte,
-                           source as zone_correcte,
-                           type_zone as source_correcte,
-                           'Région' as type_zone_correct,
-                           CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
-                                THEN date_prise_mesure::text ELSE NULL END as code_zone_correct,
-                           'assqa_2.csv' as fichier_source
-                    FROM indices_qualite_assqa_2
-                    
-                    UNION ALL
-                    
-                    SELECT 2, id, aasqa, no2, o3, pm10, pm25,
-                           qualite_air, libelle_zone, source, type_zone, 'Région',
-                           CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
-                                THEN date_prise_mesure::text ELSE NULL END,
-                           'assqa_27.csv'
-                    FROM indices_qualite_assqa_27
-                    
-                    UNION ALL
-                    
-                    SELECT 3, id, aasqa, no2, o3, pm10, pm25,
-                           qualite_air, libelle_zone, source, type_zone, 'Région',
-                           CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
-                                THEN date_prise_mesure::text ELSE NULL END,
-                           'assqa_28.csv'
-                    FROM indices_qualite_assqa_28
-                    
-                    UNION ALL
-                    
-                    SELECT 4, id, aasqa, no2, o3, pm10, pm25,
-                           qualite_air, libelle_zone, source, type_zone, 'Région',
-                           CASE WHEN date_prise_mesure::text ~ '^[0-9]{5}$' 
-                                THEN date_prise_mesure::text ELSE NULL END,
-                           'assqa_44.csv'
-                    FROM indices_qualite_assqa_44
-                ) t
-            """
-            
-            start_time = time.time()
-            conn.execute(text(create_sql))
-            creation_time = time.time() - start_time
-            
-            count = conn.execute(text("SELECT COUNT(*) FROM indices_qualite_air_consolides")).fetchone()[0]
-            
-            self.log(f"   ✅ Table consolidée créée en {creation_time:.1f}s avec {count:,} lignes")
-            
-            return count
+        start_time = time.time()
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                create_consolidated_table(cursor, table)
+                count, partitions = load_consolidated(cursor, table, CONSOLIDATION_SQL)
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+        creation_time = time.time() - start_time
+        
+        self.log(f"   ✅ Table consolidée créée en {creation_time:.1f}s avec {count:,} lignes")
+        self.log(f"   🗂️ {len(partitions)} partitions mensuelles")
+        
+        return count
     
-    def create_constraints_and_indexes(self):
+    def create_constraints_and_indexes(self, table=CONSOLIDATED_TABLE):
         """Création des contraintes et index"""
         self.log("🔑 Création des contraintes et index...")
         
-        with self.engine.connect() as conn:
-            # Clé primaire
-            conn.execute(text("ALTER TABLE indices_qualite_air_consolides ADD PRIMARY KEY (id)"))
-            
-            # Index
-            indexes = [
-                'aasqa', 'code_zone', 'fichier_source', 
-                'date_prise_mesure', 'qualite_air', 'zone'
-            ]
-            
-            for col in indexes:
-                conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_consolides_{col} ON indices_qualite_air_consolides({col})"))
-            
-            conn.commit()
-            self.log(f"   ✅ Clé primaire et {len(indexes)} index créés")
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                # Index (créés sur chaque partition)
+                create_indexes(cursor, table, CONSOLIDATED_INDEXES)
+                
+                # Statistiques à jour pour le planificateur
+                analyze_table(cursor, table)
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+        
+        self.log(f"   ✅ {len(CONSOLIDATED_INDEXES)} index créés")
+    
+    def create_long_table(self, table=LONG_TABLE, consolidated_table=CONSOLIDATED_TABLE):
+        """Création de la table longue (zone, date, polluant, code) et de ses index"""
+        self.log(f"🧮 Création de la table longue {table}...")
+        
+        start_time = time.time()
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                create_long_table(cursor, table)
+                count, _ = load_long(cursor, table, consolidated_table)
+                create_indexes(cursor, table, LONG_INDEXES)
+                analyze_table(cursor, table)
+            raw_conn.commit()
+        finally:
+            raw_conn.close()
+        
+        self.log(f"   ✅ {count:,} lignes (zone, date, polluant) en {time.time() - start_time:.1f}s")
+        return count
+    
+    def swap_tables(self, swaps):
+        """Bascule atomique des tables reconstruites [(fantôme, cible), ...], ensemble"""
+        targets = ", ".join(target for _, target in swaps)
+        self.log(f"🔀 Bascule des nouvelles tables {targets}...")
+        
+        start_time = time.time()
+        raw_conn = self.engine.raw_connection()
+        try:
+            swap_tables_into_place(raw_conn, swaps)
+        finally:
+            raw_conn.close()
+        
+        self.log(f"   ✅ Tables {targets} remplacées en {time.time() - start_time:.2f}s")
     
     def verify_data_quality(self):
         """Vérification de la qualité des données"""
@@ -201,7 +248,7 @@ class DatabaseInitializer:
             stats = conn.execute(text("""
                 SELECT 
                     COUNT(*) as total,
-                    COUNT(CASE WHEN date_prise_mesure ~ '^[0-9]{4}/[0-9]{2}/[0-9]{2}$' THEN 1 END) as dates_ok,
+                    COUNT(date_prise_mesure) as dates_ok,
                     COUNT(CASE WHEN code_zone ~ '^[0-9]{5}$' THEN 1 END) as codes_ok,
                     COUNT(CASE WHEN qualite_air IS NOT NULL THEN 1 END) as qualites_ok
                 FROM indices_qualite_air_consolides
@@ -218,7 +265,7 @@ class DatabaseInitializer:
             # Par fichier source
             by_source = conn.execute(text("""
                 SELECT fichier_source, COUNT(*),
-                       COUNT(CASE WHEN date_prise_mesure ~ '^[0-9]{4}/[0-9]{2}/[0-9]{2}$' THEN 1 END) as dates_ok
+                       COUNT(date_prise_mesure) as dates_ok
                 FROM indices_qualite_air_consolides
                 GROUP BY fichier_source
                 ORDER BY fichier_source
@@ -231,9 +278,18 @@ class DatabaseInitializer:
             
             return dates_ok / total if total > 0 else 0
     
-    def run_full_initialization(self):
-        """Exécution complète de l'initialisation"""
-        self.log("🚀 INITIALISATION COMPLÈTE DE LA BASE DE DONNÉES")
+    def run_full_initialization(self, reload=False):
+        """
+        Exécution complète de l'initialisation
+        
+        Args:
+            reload (bool): Mode rechargement. Aucune table n'est supprimée au
+                préalable : la table consolidée est reconstruite dans une table
+                fantôme (index + ANALYZE) puis basculée atomiquement, l'API
+                continuant de servir l'ancienne version pendant le chargement.
+        """
+        mode = "RECHARGEMENT SANS INTERRUPTION" if reload else "INITIALISATION COMPLÈTE"
+        self.log(f"🚀 {mode} DE LA BASE DE DONNÉES")
         self.log("=" * 60)
         
         start_time = time.time()
@@ -243,8 +299,9 @@ class DatabaseInitializer:
             return False
         
         try:
-            # 1. Nettoyage
-            self.drop_existing_tables()
+            # 1. Nettoyage (les imports COPY remplacent chaque table par bascule)
+            if not reload:
+                self.drop_existing_tables()
             
             # 2. Import CSV
             total_imported = self.import_csv_files()
@@ -253,12 +310,21 @@ class DatabaseInitializer:
                 return False
             
             # 3. Consolidation
-            consolidated_count = self.create_consolidated_table()
+            table = shadow_name(CONSOLIDATED_TABLE) if reload else CONSOLIDATED_TABLE
+            consolidated_count = self.create_consolidated_table(table)
             
             # 4. Contraintes et index
-            self.create_constraints_and_indexes()
+            self.create_constraints_and_indexes(table)
+            
+            # 5. Format long (zone, date, polluant, code)
+            long_table = shadow_name(LONG_TABLE) if reload else LONG_TABLE
+            self.create_long_table(long_table, table)
+            
+            # 6. Bascule des tables fantômes (une seule transaction : tables cohérentes)
+            if reload:
+                self.swap_tables([(table, CONSOLIDATED_TABLE), (long_table, LONG_TABLE)])
             
-            # 5. Vérification
+            # 7. Vérification
             quality_score = self.verify_data_quality()
             
             # Résumé final
@@ -285,7 +351,7 @@ class DatabaseInitializer:
 
 if __name__ == "__main__":
     initializer = DatabaseInitializer()
-    success = initializer.run_full_initialization()
+    success = initializer.run_full_initialization(reload="--reload" in sys.argv)
     
     if success:
         print("\n🏁 Votre base de données est opérationnelle !")
@@ -0,0 +1,144 @@
+"""
+Migration de indices_qualite_air_consolides vers le schéma typé.
+
+Les anciennes versions de la table stockaient les dates en texte
+('AAAA/MM/JJ') et les sous-indices en BIGINT, dans une table non
+partitionnée. La migration reconstruit la table dans une table fantôme au
+schéma de consolidated_schema.py (DATE, SMALLINT, partitions mensuelles,
+index text_pattern_ops sur les zones), puis la bascule à la place de
+l'ancienne : l'API continue de lire l'ancienne version pendant la copie.
+
+Usage:
+    python migrate_typed_columns.py [--dry-run]
+"""
+
+import os
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+from table_swap import shadow_name, create_indexes, analyze_table, swap_into_place
+from consolidated_schema import (
+    CONSOLIDATED_TABLE, CONSOLIDATED_COLUMNS, CONSOLIDATED_INDEXES, DATE_FROM_TEXT_SQL,
+    create_consolidated_table, load_consolidated
+)
+
+load_dotenv('../../.env')
+
+DATABASE_CONFIG = {
+    "host": os.getenv("PG_HOST", "localhost"),
+    "database": os.getenv("PG_DATABASE"),
+    "user": os.getenv("PG_USER"),
+    "password": os.getenv("PG_PASSWORD"),
+    "port": os.getenv("PG_PORT", 5432)
+}
+
+SUB_INDICES = ['no2', 'o3', 'pm10', 'pm25']
+
+
+def column_types(cursor, table):
+    """Types actuels des colonnes d'une table : {colonne: data_type}"""
+    cursor.execute("""
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s
+    """, (table,))
+    return dict(cursor.fetchall())
+
+
+def is_partitioned(cursor, table):
+    """Indique si la table est déjà partitionnée"""
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+    return cursor.fetchone() is not None
+
+
+def migration_source_sql(types):
+    """
+    Requête de lecture de l'ancienne table, convertie au schéma typé.
+
+    Les colonnes absentes de l'ancienne table sont lues comme NULL.
+    """
+    expressions = []
+    for col, pg_type in CONSOLIDATED_COLUMNS:
+        if col not in types:
+            expression = f"NULL::{pg_type.split()[0]}"
+        elif col == 'date_prise_mesure' and types[col] != 'date':
+            expression = DATE_FROM_TEXT_SQL.format(col=col)
+        elif col in SUB_INDICES:
+            expression = f"{col}::smallint"
+        elif col != 'id':
+            expression = f"{col}::text"
+        else:
+            expression = col
+        expressions.append(f"{expression} as {col}")
+    return f"SELECT {', '.join(expressions)} FROM {CONSOLIDATED_TABLE}"
+
+
+def migrate(dry_run=False):
+    conn = psycopg2.connect(**DATABASE_CONFIG)
+    try:
+        cursor = conn.cursor()
+
+        print("🔧 MIGRATION VERS LE SCHÉMA TYPÉ")
+        print("=" * 50)
+
+        types = column_types(cursor, CONSOLIDATED_TABLE)
+        if not types:
+            print(f"❌ Table {CONSOLIDATED_TABLE} introuvable")
+            return False
+
+        print("1️⃣ Types actuels :")
+        for col in ['date_prise_mesure'] + SUB_INDICES:
+            print(f"   - {col}: {types.get(col, 'absente')}")
+
+        already_typed = (
+            types.get('date_prise_mesure') == 'date'
+            and all(types.get(col) == 'smallint' for col in SUB_INDICES)
+            and is_partitioned(cursor, CONSOLIDATED_TABLE)
+        )
+        if already_typed:
+            print("✅ Table déjà au schéma typé, rien à migrer")
+            return True
+
+        source_sql = migration_source_sql(types)
+        if dry_run:
+            print("2️⃣ Requête de conversion (--dry-run) :")
+            print(f"   {source_sql}")
+            return True
+
+        # Conversion dans la table fantôme
+        start_time = time.time()
+        shadow = shadow_name(CONSOLIDATED_TABLE)
+        print(f"2️⃣ Conversion dans {shadow}...")
+        create_consolidated_table(cursor, shadow)
+        count, partitions = load_consolidated(cursor, shadow, source_sql)
+        print(f"   📊 {count:,} lignes converties, {len(partitions)} partitions mensuelles")
+
+        cursor.execute(f"SELECT COUNT(*) FROM {shadow} WHERE date_prise_mesure IS NULL")
+        print(f"   ⚠️ {cursor.fetchone()[0]:,} dates illisibles (partition DEFAULT)")
+
+        print("3️⃣ Index et statistiques...")
+        create_indexes(cursor, shadow, CONSOLIDATED_INDEXES)
+        analyze_table(cursor, shadow)
+        conn.commit()
+
+        # Bascule atomique
+        print("4️⃣ Bascule de la table...")
+        swap_into_place(conn, shadow, CONSOLIDATED_TABLE)
+
+        print(f"✅ Migration terminée en {time.time() - start_time:.1f}s")
+        return True
+
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Erreur de migration : {e}")
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    success = migrate(dry_run="--dry-run" in sys.argv)
+    sys.exit(0 if success else 1)
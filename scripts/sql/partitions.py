@@ -0,0 +1,154 @@
+"""
+Gestion des partitions mensuelles PostgreSQL (partitionnement déclaratif).
+
+Les tables de mesures sont partitionnées par RANGE sur une colonne DATE,
+avec une partition par mois et une partition DEFAULT pour les lignes sans
+date exploitable. Les partitions sont créées automatiquement au chargement
+à partir de l'intervalle de dates des données à insérer.
+
+Convention de nommage:
+    - Partition mensuelle : <table>_pAAAAMM
+    - Partition par défaut : <table>_default
+
+Functions:
+    create_month_partitions: Crée les partitions d'un intervalle de mois
+    ensure_partitions_for_query: Crée les partitions couvrant le résultat d'une requête
+    list_month_partitions: Liste les partitions mensuelles existantes
+    drop_expired_partitions: Détache et supprime les mois entièrement expirés
+"""
+
+import re
+from datetime import date, timedelta
+
+from psycopg2 import sql
+
+
+def month_start(day):
+    """Premier jour du mois d'une date"""
+    return day.replace(day=1)
+
+
+def next_month(day):
+    """Premier jour du mois suivant"""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_name(parent, month):
+    """Nom de la partition mensuelle d'une table"""
+    return f"{parent}_p{month:%Y%m}"
+
+
+def default_partition_name(parent):
+    """Nom de la partition par défaut d'une table"""
+    return f"{parent}_default"
+
+
+def create_default_partition(cursor, parent):
+    """Crée la partition DEFAULT (lignes hors de toute partition mensuelle)"""
+    cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} DEFAULT").format(
+        sql.Identifier(default_partition_name(parent)), sql.Identifier(parent)
+    ))
+
+
+def create_month_partitions(cursor, parent, first_day, last_day):
+    """
+    Crée les partitions mensuelles couvrant [first_day, last_day].
+
+    Args:
+        cursor: Curseur psycopg2
+        parent (str): Table partitionnée
+        first_day (date): Première date à couvrir
+        last_day (date): Dernière date à couvrir
+
+    Returns:
+        list: Noms des partitions de l'intervalle
+    """
+    names = []
+    month = month_start(first_day)
+    while month <= last_day:
+        name = partition_name(parent, month)
+        cursor.execute(sql.SQL(
+            "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})"
+        ).format(
+            sql.Identifier(name),
+            sql.Identifier(parent),
+            sql.Literal(month),
+            sql.Literal(next_month(month)),
+        ))
+        names.append(name)
+        month = next_month(month)
+    return names
+
+
+def ensure_partitions_for_query(cursor, parent, source_sql, column):
+    """
+    Crée les partitions nécessaires avant l'insertion du résultat d'une requête.
+
+    Args:
+        cursor: Curseur psycopg2
+        parent (str): Table partitionnée
+        source_sql (str): Requête dont le résultat sera inséré
+        column (str): Colonne DATE de partitionnement dans ce résultat
+
+    Returns:
+        list: Noms des partitions couvrant les données (vide si aucune date)
+    """
+    cursor.execute(sql.SQL("SELECT min({col}), max({col}) FROM ({src}) s").format(
+        col=sql.Identifier(column), src=sql.SQL(source_sql)
+    ))
+    first_day, last_day = cursor.fetchone()
+    if first_day is None:
+        return []
+    return create_month_partitions(cursor, parent, first_day, last_day)
+
+
+def list_month_partitions(cursor, parent):
+    """
+    Liste les partitions mensuelles attachées à une table.
+
+    Returns:
+        list: [(nom_partition, premier_jour_du_mois), ...] triés par mois
+    """
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (parent,))
+    pattern = re.compile(rf"^{re.escape(parent)}_p(\d{{4}})(\d{{2}})$")
+    partitions = []
+    for (name,) in cursor.fetchall():
+        match = pattern.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def drop_expired_partitions(cursor, parent, cutoff, detach_only=False):
+    """
+    Rétention : détache puis supprime les partitions mensuelles dont tout le
+    mois est antérieur à `cutoff`. Un mois n'est retiré que lorsqu'il est
+    entièrement expiré : aucune suppression ligne à ligne.
+
+    Args:
+        cursor: Curseur psycopg2
+        parent (str): Table partitionnée
+        cutoff (date): Date limite de conservation
+        detach_only (bool): Détacher sans supprimer (archivage)
+
+    Returns:
+        list: [(nom_partition, premier_jour_du_mois, taille_octets), ...]
+    """
+    expired = []
+    for name, month in list_month_partitions(cursor, parent):
+        if next_month(month) > cutoff:
+            break
+        cursor.execute("SELECT pg_total_relation_size(to_regclass(%s))", (name,))
+        size = cursor.fetchone()[0] or 0
+        cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+            sql.Identifier(parent), sql.Identifier(name)
+        ))
+        if not detach_only:
+            cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(name)))
+        expired.append((name, month, size))
+    return expired
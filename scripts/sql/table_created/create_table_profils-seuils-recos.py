@@ -1,9 +1,13 @@
 import psycopg2
 from psycopg2 import sql
 import os
+import sys
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from batch_insert import ensure_unique
+
 
 load_dotenv()
 engine = create_engine(f"postgresql+psycopg2://{os.getenv('PG_USER')}:{os.getenv('PG_PASSWORD')}@{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{os.getenv('PG_DATABASE')}")
@@ -74,10 +78,21 @@ def create_profils_tables():
                 niveau_urgence INTEGER DEFAULT 1 CHECK (niveau_urgence BETWEEN 1 AND 5),
                 icone VARCHAR(20) DEFAULT 'info',
                 actif BOOLEAN DEFAULT true,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(profil_cible, niveau_pollution, type_activite)
             );
         """)
         print("✅ Table 'recommandations_base' créée")
+
+        # Migration des bases existantes : CREATE TABLE IF NOT EXISTS n'ajoute
+        # pas les contraintes uniques utilisées par les upserts (ON CONFLICT)
+        for table, columns in (
+            ('seuils_personnalises', ['profil_type', 'polluant']),
+            ('recommandations_base', ['profil_cible', 'niveau_pollution', 'type_activite']),
+        ):
+            removed = ensure_unique(cursor, table, columns)
+            if removed is not None:
+                print(f"✅ Contrainte unique ajoutée sur '{table}'")
         
         # Création des index pour performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_profils_commune ON profils_utilisateurs(commune_residence);")
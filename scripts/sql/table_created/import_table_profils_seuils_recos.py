@@ -1,7 +1,11 @@
 import psycopg2
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from batch_insert import upsert_rows, ensure_unique
+
 load_dotenv()
 
 def populate_seuils_personnalises():
@@ -50,13 +54,14 @@ def populate_seuils_personnalises():
             ('senior', 'SO2', 81, 227, 35, 'Contactez médecin si symptômes')
         ]
         
-        for profil, polluant, seuil_info, seuil_alerte, reduction, conseil in seuils_data:
-            cursor.execute("""
-                INSERT INTO seuils_personnalises 
-                (profil_type, polluant, seuil_info, seuil_alerte, pourcentage_reduction, conseil_depassement)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (profil_type, polluant) DO NOTHING
-            """, (profil, polluant, seuil_info, seuil_alerte, reduction, conseil))
+        upsert_rows(
+            cursor, 'seuils_personnalises',
+            ['profil_type', 'polluant', 'seuil_info', 'seuil_alerte',
+             'pourcentage_reduction', 'conseil_depassement'],
+            seuils_data,
+            conflict_columns=['profil_type', 'polluant'],
+            update_columns=[]  # DO NOTHING : les seuils modifiés ne sont pas écrasés
+        )
         
         print(f"✅ {len(seuils_data)} seuils personnalisés insérés")
         
@@ -114,12 +119,15 @@ def populate_recommandations_base():
             ('senior', 'tres_mauvais', 'sortie_senior', '⛔ Confinement strict. Assistance médicale si besoin.', 5, 'danger')
         ]
         
-        for profil, niveau, activite, conseil, urgence, icone in recommandations:
-            cursor.execute("""
-                INSERT INTO recommandations_base 
-                (profil_cible, niveau_pollution, type_activite, conseil, niveau_urgence, icone)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (profil, niveau, activite, conseil, urgence, icone))
+        # Bases créées avant la contrainte unique : ajoutée (doublons supprimés)
+        ensure_unique(cursor, 'recommandations_base', ['profil_cible', 'niveau_pollution', 'type_activite'])
+        upsert_rows(
+            cursor, 'recommandations_base',
+            ['profil_cible', 'niveau_pollution', 'type_activite', 'conseil',
+             'niveau_urgence', 'icone'],
+            recommandations,
+            conflict_columns=['profil_cible', 'niveau_pollution', 'type_activite']
+        )
         
         print(f"✅ {len(recommandations)} recommandations de base insérées")
         
@@ -0,0 +1,215 @@
+"""
+Rechargement sans interruption par table fantôme (shadow table).
+
+Au lieu de supprimer la table servie par l'API puis de la reconstruire,
+le rechargement construit une table fantôme à côté, y crée les index,
+lance ANALYZE, puis la bascule à la place de la table en production dans
+une seule transaction. Les lecteurs voient l'ancienne version jusqu'au
+COMMIT, puis la nouvelle : jamais de table absente ou vide.
+
+Convention de nommage:
+    - Table fantôme : <table>_shadow
+    - Index créés sur la table fantôme : suffixés par _shadow
+    À la bascule, les noms sont ramenés à leur forme finale.
+
+Functions:
+    shadow_name: Nom de la table fantôme d'une table
+    create_indexes: Crée des index (suffixés) sur une table fantôme
+    copy_extra_indexes: Reporte sur la table fantôme les index ajoutés en production
+    analyze_table: Met à jour les statistiques du planificateur
+    swap_into_place: Bascule atomique de la table fantôme
+    swap_tables_into_place: Bascule de plusieurs tables dans une transaction
+"""
+
+import time
+
+from psycopg2 import errors, sql
+
+SHADOW_SUFFIX = "_shadow"
+
+# Attente maximale du verrou exclusif lors de la bascule : au-delà, on
+# abandonne et on réessaie plutôt que de bloquer les lectures de l'API
+LOCK_TIMEOUT = "5s"
+SWAP_RETRIES = 5
+
+
+def shadow_name(table):
+    """Nom de la table fantôme associée à une table"""
+    return f"{table}{SHADOW_SUFFIX}"
+
+
+def index_name(name, table):
+    """Nom d'index à utiliser sur `table` (suffixé si c'est une table fantôme)"""
+    return f"{name}{SHADOW_SUFFIX}" if table.endswith(SHADOW_SUFFIX) else name
+
+
+def create_indexes(cursor, table, indexes):
+    """
+    Crée des index sur une table.
+
+    Args:
+        cursor: Curseur psycopg2
+        table (str): Table (fantôme ou finale)
+        indexes (dict): {nom_index: définition}, la définition étant la partie
+            qui suit "ON <table>" (ex: "(code_zone)" ou "USING gin (...)")
+    """
+    for name, definition in indexes.items():
+        cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {} ON {} {}").format(
+            sql.Identifier(index_name(name, table)),
+            sql.Identifier(table),
+            sql.SQL(definition),
+        ))
+
+
+def analyze_table(cursor, table):
+    """Met à jour les statistiques du planificateur avant la mise en service"""
+    cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(table)))
+
+
+def _final_name(name, shadow, target):
+    """Nom définitif d'une relation rattachée à la table fantôme"""
+    if shadow in name:
+        return name.replace(shadow, target)
+    if name.endswith(SHADOW_SUFFIX):
+        return name[:-len(SHADOW_SUFFIX)]
+    return name
+
+
+def _shadow_relations(cursor, shadow):
+    """
+    Liste les relations à renommer : partitions éventuelles de la table
+    fantôme et index de la table et de ses partitions.
+
+    Returns:
+        list: [(type 'TABLE'|'INDEX', nom), ...]
+    """
+    cursor.execute("""
+        WITH RECURSIVE arbre AS (
+            SELECT c.oid FROM pg_class c
+            WHERE c.oid = to_regclass(%s)
+            UNION ALL
+            SELECT i.inhrelid FROM pg_inherits i JOIN arbre a ON i.inhparent = a.oid
+        )
+        SELECT 'TABLE', c.relname FROM arbre a JOIN pg_class c ON c.oid = a.oid
+        WHERE c.oid <> to_regclass(%s)
+        UNION ALL
+        SELECT 'INDEX', ic.relname
+        FROM arbre a
+        JOIN pg_index ix ON ix.indrelid = a.oid
+        JOIN pg_class ic ON ic.oid = ix.indexrelid
+    """, (shadow, shadow))
+    return cursor.fetchall()
+
+
+def copy_extra_indexes(cursor, shadow, target):
+    """
+    Recrée sur la table fantôme les index de `target` qu'elle n'a pas (créés
+    hors construction, par exemple par index_advisor.py), avant la bascule :
+    la construction ne verrouille que la table fantôme, la transaction de
+    bascule ne contient plus que des renommages.
+
+    Les index sont suffixés (_shadow) et renommés avec les autres à la bascule.
+
+    Returns:
+        list: Noms définitifs des index recréés
+    """
+    cursor.execute("""
+        SELECT ic.relname FROM pg_index ix JOIN pg_class ic ON ic.oid = ix.indexrelid
+        WHERE ix.indrelid = to_regclass(%s)
+    """, (shadow,))
+    shadow_indexes = {_final_name(name, shadow, target) for name, in cursor.fetchall()}
+
+    cursor.execute("""
+        SELECT ic.relname, ix.indisunique, pg_get_indexdef(ix.indexrelid)
+        FROM pg_index ix
+        JOIN pg_class ic ON ic.oid = ix.indexrelid
+        WHERE ix.indrelid = to_regclass(%s)
+    """, (target,))
+    copied = []
+    for name, unique, definition in cursor.fetchall():
+        if name in shadow_indexes:
+            continue
+        # pg_get_indexdef : "CREATE [UNIQUE] INDEX nom ON [ONLY] table USING méthode (...)"
+        _, _, method = definition.partition(" USING ")
+        cursor.execute(sql.SQL("CREATE {} IF NOT EXISTS {} ON {} USING {}").format(
+            sql.SQL("UNIQUE INDEX" if unique else "INDEX"),
+            sql.Identifier(index_name(name, shadow)),
+            sql.Identifier(shadow),
+            sql.SQL(method),
+        ))
+        copied.append(name)
+    return copied
+
+
+def swap_tables_into_place(raw_conn, swaps, lock_timeout=LOCK_TIMEOUT, retries=SWAP_RETRIES):
+    """
+    Remplace atomiquement plusieurs tables par leurs tables fantômes.
+
+    Les index ajoutés à l'ancienne table en dehors de la construction sont
+    d'abord recréés sur la table fantôme (copy_extra_indexes), hors du verrou
+    exclusif. Puis, dans une seule transaction, pour chaque (fantôme, cible) :
+    suppression de l'ancienne table, renommage de la table fantôme puis de
+    ses index et partitions. Les lecteurs voient toutes les anciennes tables
+    ou toutes les nouvelles, jamais un mélange, et ne sont bloqués que le
+    temps des renommages.
+
+    La suppression se fait sans CASCADE : si des
+    vues ou clés étrangères dépendent d'une cible, la bascule échoue
+    (DependentObjectsStillExist) et les anciennes tables restent servies.
+
+    Si le verrou exclusif n'est pas obtenu dans `lock_timeout` (requêtes
+    longues en cours), la transaction est annulée et retentée.
+
+    Args:
+        raw_conn: Connexion psycopg2
+        swaps (list): [(table fantôme prête, table en production), ...]
+    """
+    with raw_conn.cursor() as cursor:
+        for shadow, target in swaps:
+            for name in copy_extra_indexes(cursor, shadow, target):
+                print(f"   🔧 Index {name} recréé sur {shadow}")
+    raw_conn.commit()
+
+    for attempt in range(1, retries + 1):
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.execute("SET LOCAL lock_timeout = %s", (lock_timeout,))
+                for shadow, target in swaps:
+                    relations = _shadow_relations(cursor, shadow)
+                    cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(target)))
+                    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(
+                        sql.Identifier(shadow), sql.Identifier(target)
+                    ))
+                    for kind, name in relations:
+                        final = _final_name(name, shadow, target)
+                        if final != name:
+                            cursor.execute(sql.SQL("ALTER {} {} RENAME TO {}").format(
+                                sql.SQL(kind), sql.Identifier(name), sql.Identifier(final)
+                            ))
+            raw_conn.commit()
+            return
+        except errors.LockNotAvailable:
+            raw_conn.rollback()
+            if attempt == retries:
+                raise
+            targets = ", ".join(target for _, target in swaps)
+            print(f"   ⏳ Table {targets} occupée, nouvelle tentative de bascule ({attempt}/{retries})...")
+            time.sleep(attempt)
+        except errors.DependentObjectsStillExist as e:
+            raw_conn.rollback()
+            raise RuntimeError(
+                f"Bascule annulée : des objets dépendent de la table remplacée "
+                f"(à supprimer puis recréer après rechargement)\n{e.diag.message_detail or e}"
+            ) from e
+
+
+def swap_into_place(raw_conn, shadow, target, lock_timeout=LOCK_TIMEOUT, retries=SWAP_RETRIES):
+    """
+    Remplace atomiquement `target` par `shadow` (voir swap_tables_into_place).
+
+    Args:
+        raw_conn: Connexion psycopg2
+        shadow (str): Table fantôme prête (index créés, ANALYZE fait)
+        target (str): Table en production
+    """
+    swap_tables_into_place(raw_conn, [(shadow, target)], lock_timeout, retries)
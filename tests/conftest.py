@@ -0,0 +1,24 @@
+"""
+Configuration commune des tests (pytest, lancé depuis la racine du dépôt).
+
+Les scripts ne sont pas un package installé : les dossiers testés sont
+ajoutés au chemin d'import, comme le font les scripts entre eux.
+"""
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts")
+
+for folder in ("api", "nosql", "sql", "data cleaning+standardization", os.path.join("docs", "rgpd")):
+    sys.path.insert(0, os.path.join(ROOT, folder))
+
+from check_startup_time import DEFAULT_ENV  # noqa: E402
+
+# Variables requises à l'import de l'API, sans .env
+for name, value in DEFAULT_ENV.items():
+    os.environ.setdefault(name, value)
+
+# Logs de l'API écrits hors du dépôt
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "poll_air_tests_logs"))
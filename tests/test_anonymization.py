@@ -0,0 +1,115 @@
+"""Anonymisation RGPD des coordonnées, calculée côté serveur"""
+
+import pytest
+
+from episode_schema import ANONYMIZED_FLAG, COORDINATES_PRECISION
+import procedures_tri_donnees as procedures
+
+MISSING = object()
+
+
+def evaluate(expression, doc, variables=None):
+    """
+    Évaluation des seuls opérateurs d'agrégation utilisés par le pipeline
+    d'anonymisation (mongomock ne connaît pas $round).
+    """
+    variables = variables or {}
+    if isinstance(expression, str) and expression.startswith("$$"):
+        return variables[expression[2:]]
+    if isinstance(expression, str) and expression.startswith("$"):
+        value = doc
+        for part in expression[1:].split("."):
+            value = value.get(part, MISSING) if isinstance(value, dict) else MISSING
+        return value
+    if isinstance(expression, list):
+        return [evaluate(item, doc, variables) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if not any(key.startswith("$") for key in expression):
+        return {key: evaluate(value, doc, variables) for key, value in expression.items()}
+
+    (operator, args), = expression.items()
+    if operator == "$cond":
+        condition, then, otherwise = args
+        return evaluate(then if evaluate(condition, doc, variables) else otherwise, doc, variables)
+    if operator == "$isNumber":
+        value = evaluate(args, doc, variables)
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if operator == "$isArray":
+        return isinstance(evaluate(args, doc, variables), list)
+    if operator == "$round":
+        value, places = evaluate(args, doc, variables)
+        return round(value, places)
+    if operator == "$mergeObjects":
+        merged = {}
+        for item in evaluate(args, doc, variables):
+            merged.update(item)
+        return merged
+    if operator == "$map":
+        return [evaluate(args["in"], doc, {**variables, "this": item})
+                for item in evaluate(args["input"], doc, variables)]
+    raise NotImplementedError(operator)
+
+
+def anonymize(doc):
+    """Applique l'étape $set du pipeline à un document"""
+    (stage,) = procedures.anonymization_pipeline()
+    result = dict(doc)
+    for field, expression in stage["$set"].items():
+        value = evaluate(expression, doc)
+        if value is MISSING:
+            result.pop(field, None)  # Champ absent : $set ne le crée pas
+        else:
+            result[field] = value
+    return result
+
+
+def test_coordinates_are_rounded():
+    doc = anonymize({"geo": {"type": "Point", "coordinates": [2.3522219, 48.856614]},
+                     "latitude": 48.856614, "longitude": 2.3522219})
+    assert doc["geo"] == {"type": "Point", "coordinates": [2.352, 48.857]}
+    assert (doc["latitude"], doc["longitude"]) == (48.857, 2.352)
+    assert doc[ANONYMIZED_FLAG] == COORDINATES_PRECISION
+
+
+def test_missing_or_non_numeric_values_are_left_alone():
+    doc = anonymize({"geo": None, "latitude": "inconnue"})
+    assert doc["geo"] is None
+    assert doc["latitude"] == "inconnue"
+    assert "longitude" not in doc
+    assert doc[ANONYMIZED_FLAG] == COORDINATES_PRECISION
+
+
+class FakeCollection:
+    def __init__(self, count):
+        self.count = count
+        self.updates = []
+
+    def estimated_document_count(self):
+        return self.count
+
+    def update_many(self, filtre, update):
+        self.updates.append((filtre, update))
+        return type("Result", (), {"modified_count": 2})()
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    collection = FakeCollection(count=5)
+    client = type("Client", (), {"__getitem__": lambda self, name: {"EPIS_POLLUTION": collection}})()
+    monkeypatch.setattr(procedures.pymongo, "MongoClient", lambda *args, **kwargs: client)
+    return collection
+
+
+def test_single_server_side_update_of_pending_documents(collection, capsys):
+    procedures.anonymize_coordinates()
+    assert collection.updates == [
+        ({ANONYMIZED_FLAG: {"$ne": COORDINATES_PRECISION}}, procedures.anonymization_pipeline())
+    ]
+    assert "2 documents avec coordonnées anonymisées" in capsys.readouterr().out
+
+
+def test_empty_collection_is_skipped(collection):
+    collection.count = 0
+    procedures.anonymize_coordinates()
+    assert collection.updates == []
@@ -0,0 +1,36 @@
+"""Nettoyage des CSV AASQA : signalement des dates illisibles"""
+
+import pandas as pd
+
+import clean_csv
+
+ENTETE = "c0,c1,c2,c3,c4,c5,c6,c7,c8,c9,c10,c11,date_maj"
+LIGNES = [
+    "ATMO,1,2,3,4,14118,x,14118,2024/06/14,Bon,Caen,ATMO,2024/06/15",
+    "ATMO,1,2,3,4,14118,x,14118,14/06/2024,Bon,Caen,ATMO,2024/06/15",
+    "ATMO,1,2,3,4,14118,x,14118,,Bon,Caen,ATMO,2024/06/15",
+]
+
+
+def test_convertir_dates_counts_unparseable_values():
+    df = pd.DataFrame({"qualite_air": pd.array(["2024/06/14", "14/06/2024", None], dtype="string")})
+    illisibles, exemples = clean_csv.convertir_dates(df)
+    assert illisibles == 1  # La valeur absente n'est pas comptée
+    assert list(exemples) == ["14/06/2024"]
+    assert df["qualite_air"].isna().tolist() == [False, True, True]
+
+
+def test_nettoyer_fichier_reports_unparseable_dates(tmp_path, monkeypatch):
+    source, sortie = tmp_path / "source", tmp_path / "sortie"
+    source.mkdir()
+    sortie.mkdir()
+    (source / "indices.csv").write_text("\n".join([ENTETE] + LIGNES) + "\n")
+    monkeypatch.setattr(clean_csv, "dossier_source", str(source))
+    monkeypatch.setattr(clean_csv, "dossier_sortie", str(sortie))
+
+    fichier, lignes, message = clean_csv.nettoyer_fichier("indices.csv")
+
+    assert lignes == 3
+    assert "1 dates illisibles" in message and "'14/06/2024'" in message
+    nettoye = pd.read_csv(sortie / "indices.csv", dtype="string")
+    assert nettoye["qualite_air"].tolist()[0] == "2024/06/14"
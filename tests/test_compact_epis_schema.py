@@ -0,0 +1,36 @@
+"""Migration vers le schéma compact : réidentification par clé naturelle"""
+
+from datetime import datetime
+
+import pytest
+
+from compact_epis_schema import natural_key_collisions
+from episode_schema import episode_id_expression
+
+mongomock = pytest.importorskip("mongomock")
+
+EPISODE = {"aasqa": "28", "code_zone": "28085", "code_pol": 8,
+           "date_ech": datetime(2024, 6, 14), "etat": "ACTIF"}
+LEGACY = {"_id": {"$type": "objectId"}}
+
+
+def test_collisions_are_counted():
+    collection = mongomock.MongoClient().db.EPIS_POLLUTION
+    collection.insert_many([
+        dict(EPISODE), dict(EPISODE),
+        {**EPISODE, "code_zone": 28085.0},        # même clé une fois normalisée
+        {**EPISODE, "etat": "TERMINE"},
+        {**EPISODE, "etat": "ALERTE"},
+    ])
+    collection.insert_one({**EPISODE, "etat": "ALERTE", "_id": "28|28085|8|2024-06-14T00:00:00|ALERTE"})
+
+    assert natural_key_collisions(collection, LEGACY, episode_id_expression()) == [
+        ("28|28085|8|2024-06-14T00:00:00|ACTIF", 2),
+        ("28|28085|8|2024-06-14T00:00:00|ALERTE", 1),
+    ]
+
+
+def test_no_collision():
+    collection = mongomock.MongoClient().db.EPIS_POLLUTION
+    collection.insert_many([dict(EPISODE), {**EPISODE, "etat": "TERMINE"}])
+    assert natural_key_collisions(collection, LEGACY, episode_id_expression()) == []
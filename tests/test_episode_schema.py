@@ -0,0 +1,66 @@
+"""_id déterministe des épisodes et conversion des dates"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from episode_schema import episode_id, episode_id_expression, parse_date
+
+EPISODE = {
+    "aasqa": "28", "code_zone": "28085", "code_pol": 8,
+    "date_ech": datetime(2024, 6, 14), "etat": "ACTIF",
+}
+
+
+def test_episode_id_format():
+    assert episode_id(EPISODE) == "28|28085|8|2024-06-14T00:00:00|ACTIF"
+
+
+def test_episode_id_ignores_other_fields_and_key_order():
+    reordered = dict(reversed(list(EPISODE.items())), lib_pol="NO2", geo=None)
+    assert episode_id(reordered) == episode_id(EPISODE)
+
+
+def test_episode_id_normalizes_aware_dates_to_utc():
+    paris = timezone(timedelta(hours=2))
+    aware = {**EPISODE, "date_ech": datetime(2024, 6, 14, 2, tzinfo=paris)}
+    assert episode_id(aware) == episode_id(EPISODE)
+
+
+def test_missing_values_are_empty():
+    assert episode_id({"aasqa": "28", "etat": None}) == "28||||"
+
+
+def test_distinct_episodes_have_distinct_ids():
+    assert episode_id(EPISODE) != episode_id({**EPISODE, "etat": "TERMINE"})
+    assert episode_id(EPISODE) != episode_id({**EPISODE, "date_ech": datetime(2024, 6, 15)})
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2024-06-14", datetime(2024, 6, 14)),
+    ("2024/06/14", datetime(2024, 6, 14)),
+    ("2024-06-14T10:00:00Z", datetime(2024, 6, 14, 10, tzinfo=timezone.utc)),
+    (None, None),
+    ("", None),
+    ("illisible", None),
+])
+def test_parse_date(value, expected):
+    assert parse_date(value) == expected
+
+
+def test_numeric_key_parts_are_normalized():
+    # code_zone lu comme double (CSV, pandas) : même _id que l'entier
+    assert episode_id({**EPISODE, "code_zone": 28085.0}) == episode_id({**EPISODE, "code_zone": 28085})
+    assert episode_id({**EPISODE, "code_zone": 28085.0}) == "28|28085|8|2024-06-14T00:00:00|ACTIF"
+    assert episode_id({**EPISODE, "code_pol": 8.5}).split("|")[2] == "8.5"
+
+
+def test_server_side_expression_matches_episode_id():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.episodes
+    collection.insert_one(dict(EPISODE))
+    collection.insert_one({"aasqa": "93", "code_zone": "93001", "date_ech": datetime(2024, 1, 2, 15, 30)})
+    collection.insert_one({**EPISODE, "code_zone": 28085.0, "code_pol": 8.0})
+    collection.insert_one({**EPISODE, "code_pol": 8.5})
+    for doc in collection.aggregate([{"$addFields": {"calcule": episode_id_expression()}}]):
+        assert doc["calcule"] == episode_id(doc)
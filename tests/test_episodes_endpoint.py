@@ -0,0 +1,48 @@
+"""Endpoint /api/qualite-air/episodes-pollution sur le schéma compact (dates BSON)"""
+
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from routers import air_quality
+
+mongomock = pytest.importorskip("mongomock")
+
+EPISODES = [
+    {"_id": "a", "aasqa": "28", "date_ech": datetime(2024, 6, 13)},
+    {"_id": "b", "aasqa": "28", "date_ech": datetime(2024, 6, 14, 10, 0)},
+    {"_id": "c", "aasqa": "28", "date_ech": datetime(2024, 6, 15)},
+    {"_id": "d", "aasqa": "75", "date_ech": datetime(2024, 6, 14)},
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    db = mongomock.MongoClient().pollution
+    db.EPIS_POLLUTION.insert_many([dict(episode) for episode in EPISODES])
+    monkeypatch.setattr(air_quality, "get_mongo_db", lambda: db)
+    import main
+    return TestClient(main.app)
+
+
+def ids(response):
+    assert response.status_code == 200
+    return sorted(doc["_id"] for doc in response.json()["data"])
+
+
+def test_end_date_is_inclusive(client):
+    response = client.get("/api/qualite-air/episodes-pollution",
+                          params={"date_debut": "2024-06-14", "date_fin": "2024-06-14"})
+    assert ids(response) == ["b", "d"]
+
+
+def test_dates_and_aasqa(client):
+    response = client.get("/api/qualite-air/episodes-pollution",
+                          params={"aasqa": "28", "date_debut": "2024-06-14"})
+    assert ids(response) == ["b", "c"]
+
+
+def test_end_date_only(client):
+    response = client.get("/api/qualite-air/episodes-pollution", params={"date_fin": "2024-06-13"})
+    assert ids(response) == ["a"]
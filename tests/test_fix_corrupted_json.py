@@ -0,0 +1,73 @@
+"""Récupération des features d'un fichier JSON corrompu (FeatureScanner)"""
+
+import io
+import json
+
+from fix_corrupted_json import FeatureScanner, fix_corrupted_json_to_geojson
+
+
+def feature(i, nom="Zone"):
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [i, i + 0.5]},
+            "properties": {"id": i, "nom": nom}}
+
+
+def dump(i, **kwargs):
+    return json.dumps(feature(i, **kwargs), ensure_ascii=False)
+
+
+def scan(text, chunk_size=16):
+    scanner = FeatureScanner(io.BytesIO(text.encode("utf-8")), chunk_size=chunk_size)
+    return list(scanner), scanner
+
+
+def test_valid_collection_without_skipped_spans():
+    text = json.dumps({"type": "FeatureCollection", "features": [feature(i) for i in range(20)]})
+    features, scanner = scan(text)
+    assert features == [feature(i) for i in range(20)]
+    assert scanner.skipped_spans == []
+    assert scanner.bytes_read == len(text.encode("utf-8"))
+
+
+def test_corrupted_feature_is_skipped_with_byte_offsets():
+    garbage = '{"type": "Feature", "geometry": {"type": "Point", "coord'
+    text = f'{{"features": [{dump(1, nom="Évreux")}, {garbage}, {dump(2)}]}}'
+    features, scanner = scan(text)
+    assert [f["properties"]["id"] for f in features] == [1, 2]
+    [(start, end)] = scanner.skipped_spans
+    raw = text.encode("utf-8")
+    assert raw[start:end].decode("utf-8").startswith(garbage)
+    assert raw[end:].decode("utf-8").startswith('{"type": "Feature"')
+
+
+def test_truncated_file_keeps_complete_features():
+    text = f'{{"features": [{dump(1)}, {dump(2)}'
+    text = text + ", " + dump(3)[:25]
+    features, scanner = scan(text)
+    assert [f["properties"]["id"] for f in features] == [1, 2]
+    assert len(scanner.skipped_spans) == 1
+
+
+def test_features_split_across_chunks():
+    # Features plus longues que le bloc de lecture, coupées en plein caractère multi-octets
+    text = "[" + ", ".join(dump(i, nom="Île-de-France " * 20) for i in range(5)) + "]"
+    for chunk_size in (1, 7, 64, 4096):
+        features, scanner = scan(text, chunk_size)
+        assert [f["properties"]["id"] for f in features] == list(range(5))
+        assert scanner.skipped_spans == []
+
+
+def test_objects_without_geometry_are_skipped():
+    text = f'[{dump(1)}, {{"type": "Feature", "properties": {{}}}}, {dump(2)}]'
+    features, scanner = scan(text)
+    assert [f["properties"]["id"] for f in features] == [1, 2]
+    assert len(scanner.skipped_spans) == 1
+
+
+def test_repair_writes_valid_geojson(tmp_path):
+    source = tmp_path / "episodes.json"
+    source.write_text(f'{{"features": [{dump(1)}, {{"type": "Feature", ]]]}}, {dump(2)}', encoding="utf-8")
+    output = tmp_path / "episodes_fixed.json"
+    assert fix_corrupted_json_to_geojson(str(source), str(output)) == 2
+    repaired = json.loads(output.read_text(encoding="utf-8"))
+    assert repaired["type"] == "FeatureCollection"
+    assert repaired["features"] == [feature(1), feature(2)]
@@ -0,0 +1,84 @@
+"""Endpoint /api/hybride/echantillon : table interrogée selon le filtre polluant"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from routers import hybride
+
+
+class FakeCursor:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def execute(self, query, params):
+        self.queries.append((" ".join(query.split()), params))
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, queries):
+        self.queries = queries
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self.queries)
+
+    def close(self):
+        pass
+
+
+class FakeMongoCursor(list):
+    def limit(self, limit):
+        return self
+
+
+class FakeMongoClient:
+    def __init__(self, finds):
+        self.finds = finds
+
+    def __getitem__(self, name):
+        return {"EPIS_POLLUTION": self}
+
+    def find(self, query, projection):
+        self.finds.append(query)
+        return FakeMongoCursor()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    queries, finds = [], []
+    monkeypatch.setattr(hybride, "connect_pg", lambda **config: FakeConnection(queries))
+    monkeypatch.setattr(hybride, "mongo_client", lambda uri: FakeMongoClient(finds))
+    return queries, finds
+
+
+@pytest.fixture
+def client(calls):
+    import main
+    return TestClient(main.app)
+
+
+def test_without_pollutant_keeps_consolidated_rows(client, calls):
+    response = client.get("/api/hybride/echantillon", params={"zone": "14118", "limit": 5})
+    assert response.status_code == 200
+    assert response.json() == {"pgsql": [], "mongo": []}
+    queries, finds = calls
+    assert queries == [("SELECT * FROM indices_qualite_air_consolides WHERE code_zone = %s LIMIT %s",
+                        ["14118", 5])]
+    assert finds == [{"code_zone": "14118"}]
+
+
+def test_with_pollutant_uses_long_table(client, calls):
+    response = client.get("/api/hybride/echantillon", params={"polluant": "pm2.5"})
+    assert response.status_code == 200
+    (query, params), = calls[0]
+    assert "FROM indices_qualite_air_polluants l WHERE l.polluant = %s" in query
+    assert query.endswith("ORDER BY l.date_prise_mesure DESC LIMIT %s")
+    assert params == ["PM25", 3]
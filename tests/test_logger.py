@@ -0,0 +1,89 @@
+"""Logging asynchrone : file bornée, formatage à l'appel, écriture par un thread dédié"""
+
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import logger as api_logger
+from logger import DroppingQueueHandler, JsonPayload
+
+
+def record(msg, *args, exc_info=None):
+    return logging.LogRecord("API", logging.INFO, __file__, 1, msg, args, exc_info)
+
+
+def test_import_configures_nothing_global():
+    code = ("import logging, logger; "
+            "assert logging.getLogger().handlers == [], logging.getLogger().handlers; "
+            "assert logger._listener is None")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(api_logger.__file__))
+
+
+def test_prepare_freezes_the_message():
+    handler = DroppingQueueHandler(queue.Queue())
+    data = {"endpoint": "/api"}
+    prepared = handler.prepare(record("appel %s", data))
+    data["endpoint"] = "modifié après l'appel"
+    assert prepared.getMessage() == "appel {'endpoint': '/api'}"
+    assert prepared.args is None
+
+
+def test_prepare_serializes_json_payload_and_exception():
+    handler = DroppingQueueHandler(queue.Queue())
+    assert handler.prepare(record(JsonPayload({"a": 1}))).getMessage() == api_logger.dumps({"a": 1})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        prepared = handler.prepare(record("erreur", exc_info=sys.exc_info()))
+    assert "ValueError: boom" in prepared.getMessage()
+    assert prepared.exc_info is None
+
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    monkeypatch.setattr(api_logger, "_listener", object())  # pas de thread d'écriture
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    for i in range(5):
+        handler.handle(record("message %s", i))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_sampling_counter_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(api_logger, "SUCCESS_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(api_logger, "_sampled_out", 0)
+
+    def sample():
+        for _ in range(2000):
+            api_logger.keep_success()
+
+    threads = [threading.Thread(target=sample) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert api_logger.log_stats()["echantillonnes"] == 16000
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    api_logger.stop_logging()
+    monkeypatch.setattr(api_logger, "LOG_DIR", str(tmp_path))
+    monkeypatch.setattr(api_logger, "LOG_FILE", str(tmp_path / "api.log"))
+    yield tmp_path / "api.log"
+    api_logger.stop_logging()
+
+
+def test_writer_thread_writes_file(log_file):
+    api_logger.log_api_call("/api/test", "user", {"q": "caen"})
+    api_logger.log_login("user", success=False, ip="127.0.0.1")
+    api_logger.stop_logging()  # vide la file
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    assert " - INFO - API_CALL: " in lines[0] and '"/api/test"' in lines[0]
+    assert " - WARNING - " in lines[1]
+    assert logging.getLogger().handlers.count(api_logger._queue_handler) == 0
@@ -0,0 +1,94 @@
+"""Métriques Prometheus : histogrammes, collecteurs et middleware de mesure"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Registre vide : les métriques créées par le test n'apparaissent pas dans /metrics"""
+    registry = metrics.CollectorRegistry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = metrics.Histogram("test_duree", "Durée", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 2.0):
+        histogram.observe(value, route="/x")
+
+    assert registry.render().splitlines() == [
+        "# HELP test_duree Durée",
+        "# TYPE test_duree histogram",
+        'test_duree_bucket{route="/x",le="0.1"} 1',
+        'test_duree_bucket{route="/x",le="1.0"} 2',
+        'test_duree_bucket{route="/x",le="+Inf"} 3',
+        'test_duree_sum{route="/x"} 2.55',
+        'test_duree_count{route="/x"} 3',
+    ]
+
+
+def test_failing_collector_does_not_block_export(registry):
+    def broken():
+        raise ConnectionError("source indisponible")
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [("test_cache", "gauge", "Cache", {"nom": 'a"b'}, 4)])
+    assert registry.render().splitlines() == [
+        "# HELP test_cache Cache",
+        "# TYPE test_cache gauge",
+        'test_cache{nom="a\\"b"} 4',
+    ]
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.middleware("http")(metrics.metrics_middleware)
+    app.include_router(metrics.router)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        metrics.record_db_time("pg", 0.002)
+        return {"id": item_id, "request_id": metrics.current_request_id()}
+
+    return TestClient(app)
+
+
+def series(client, name, **labels):
+    """Valeur d'une série de /metrics (None si absente)"""
+    prefix = name + metrics._labels(list(labels.items()))
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_requests_are_counted_by_route_template(app):
+    before = series(app, "api_requests_total", route="/items/{item_id}", method="GET", status=200) or 0
+    app.get("/items/1")
+    app.get("/items/2")
+    assert series(app, "api_requests_total", route="/items/{item_id}", method="GET", status=200) == before + 2
+
+
+def test_request_id_is_propagated(app):
+    response = app.get("/items/1", headers={"X-Request-ID": "abc123"})
+    assert response.headers["X-Request-ID"] == "abc123"
+    assert response.json()["request_id"] == "abc123"
+    assert len(app.get("/items/1").headers["X-Request-ID"]) == 32  # Généré (uuid4)
+
+
+def test_database_time_is_split_from_python_time(app):
+    before = series(app, "api_request_part_seconds_sum", route="/items/{item_id}", part="pg") or 0
+    app.get("/items/1")
+    after = series(app, "api_request_part_seconds_sum", route="/items/{item_id}", part="pg")
+    assert after == pytest.approx(before + 0.002)
+    assert series(app, "api_request_part_seconds_count", route="/items/{item_id}", part="python") >= 1
+
+
+def test_record_db_time_outside_a_request_is_ignored():
+    metrics.record_db_time("pg", 1.0)  # Aucune exception, aucun effet
+    assert metrics.current_request_id() is None
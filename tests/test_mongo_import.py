@@ -0,0 +1,80 @@
+"""Importeur EPIS_POLLUTION : documents compacts et upserts idempotents"""
+
+import importlib.util
+import os
+from datetime import datetime
+
+import pytest
+
+from episode_schema import ANONYMIZED_FLAG, COORDINATES_PRECISION, episode_id
+
+mongomock = pytest.importorskip("mongomock")
+
+# Nom de fichier non importable directement (&)
+_path = os.path.join(os.path.dirname(__file__), "..", "scripts", "nosql", "import_api&scrap_mongodb.py")
+_spec = importlib.util.spec_from_file_location("import_api_scrap_mongodb", _path)
+importer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(importer)
+
+FEATURE = {
+    "type": "Feature",
+    "geometry": {"type": "Point", "coordinates": [2.3522219, 48.856614]},
+    "properties": {"aasqa": "11", "code_zone": "75056", "code_pol": 8, "etat": "ACTIF",
+                   "date_ech": "2024-06-14", "date_maj": "2024-06-14T10:00:00Z", "lib_pol": "NO2"},
+}
+
+
+def apply(collection, operation):
+    # mongomock ne gère pas le bulk_write des versions récentes de pymongo :
+    # l'UpdateOne est rejoué tel quel
+    return collection.update_one(operation._filter, operation._doc, upsert=True)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.EPIS_POLLUTION
+
+
+def test_document_is_compact_and_anonymized():
+    doc = importer.episode_document(FEATURE, "NO2")
+    assert doc["geo"] == {"type": "Point", "coordinates": [2.352, 48.857]}
+    assert doc[ANONYMIZED_FLAG] == COORDINATES_PRECISION
+    assert doc["date_ech"] == datetime(2024, 6, 14)
+    assert "feature_original" not in doc and "latitude" not in doc
+
+
+def test_missing_geometry():
+    doc = importer.episode_document({"properties": FEATURE["properties"]}, "NO2")
+    assert doc["geo"] is None
+
+
+def test_reimport_of_unchanged_episode_modifies_nothing(collection):
+    doc = importer.episode_document(FEATURE, "NO2")
+    doc_id = episode_id(doc)
+    assert apply(collection, importer.upsert_operation(doc_id, doc, "import-1")).upserted_id == doc_id
+
+    again = importer.episode_document(FEATURE, "NO2")
+    assert apply(collection, importer.upsert_operation(doc_id, again, "import-2")).modified_count == 0
+    assert collection.find_one({"_id": doc_id})["import_date"] == "import-1"
+
+
+def test_reimport_of_anonymized_episode_modifies_nothing(collection):
+    doc = importer.episode_document(FEATURE, "NO2")
+    doc_id = episode_id(doc)
+    apply(collection, importer.upsert_operation(doc_id, doc, "import-1"))
+    # Passage de la procédure RGPD : valeurs déjà à la précision anonymisée
+    collection.update_one({"_id": doc_id}, {"$set": {ANONYMIZED_FLAG: COORDINATES_PRECISION}})
+
+    result = apply(collection, importer.upsert_operation(doc_id, importer.episode_document(FEATURE, "NO2"), "x"))
+    assert result.modified_count == 0
+
+
+def test_changed_episode_is_updated(collection):
+    doc = importer.episode_document(FEATURE, "NO2")
+    doc_id = episode_id(doc)
+    apply(collection, importer.upsert_operation(doc_id, doc, "import-1"))
+
+    updated = {**FEATURE, "properties": {**FEATURE["properties"], "lib_zone": "Paris"}}
+    result = apply(collection, importer.upsert_operation(doc_id, importer.episode_document(updated, "NO2"), "x"))
+    assert result.modified_count == 1
+    assert collection.find_one({"_id": doc_id})["lib_zone"] == "Paris"
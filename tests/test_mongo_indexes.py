@@ -0,0 +1,83 @@
+"""Vérification des plans d'exécution des requêtes MongoDB connues"""
+
+import pytest
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from mongo_indexes import QUERY_SHAPES, RETENTION_DAYS, check_query_plans, ensure_indexes
+
+
+class FakeCursor:
+    def __init__(self, plan):
+        self.plan = plan
+
+    def explain(self):
+        if isinstance(self.plan, Exception):
+            raise self.plan
+        return {"queryPlanner": {"winningPlan": self.plan}}
+
+
+class FakeDatabase:
+    """explain() renvoie le plan (ou lève l'erreur) associé au filtre"""
+
+    def __init__(self, plans):
+        self.plans = plans
+
+    def __getitem__(self, name):
+        return self
+
+    def find(self, filtre):
+        return FakeCursor(self.plans(filtre))
+
+
+IXSCAN = {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "idx"}}
+
+
+def is_geo(filtre):
+    return any(isinstance(value, dict) and "$nearSphere" in value for value in filtre.values())
+
+
+def test_all_shapes_indexed():
+    assert check_query_plans(FakeDatabase(lambda filtre: IXSCAN), verbose=False) == []
+
+
+def test_collscan_is_a_failure():
+    failures = check_query_plans(FakeDatabase(lambda filtre: {"stage": "COLLSCAN"}), verbose=False)
+    assert len(failures) == len(QUERY_SHAPES)
+    assert all(failure["collscan"] for failure in failures)
+
+
+def test_explain_error_is_reported_and_check_continues(capsys):
+    if not any(is_geo(shape["filtre"]) for shape in QUERY_SHAPES):
+        pytest.skip("aucune forme géospatiale déclarée")
+    error = OperationFailure("unable to find index for $geoNear query",
+                             details={"errmsg": "unable to find index for $geoNear query"})
+    db = FakeDatabase(lambda filtre: error if is_geo(filtre) else IXSCAN)
+
+    failures = check_query_plans(db)
+    assert failures and all(failure["erreur"] == error.details["errmsg"] for failure in failures)
+    output = capsys.readouterr().out
+    assert output.count("✅") == len(QUERY_SHAPES) - len(failures)
+    assert "❌ ERREUR" in output
+
+
+def test_connection_errors_still_propagate():
+    # MongoDB injoignable : erreur remontée une fois, pas un échec par forme
+    def unreachable(filtre):
+        raise ServerSelectionTimeoutError("injoignable")
+
+    with pytest.raises(ServerSelectionTimeoutError):
+        check_query_plans(FakeDatabase(unreachable), verbose=False)
+
+
+def test_ttl_index_replaces_legacy_date_index():
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient().db
+    db.EPIS_POLLUTION.create_index("date_ech", name="date_ech_1")
+    db.EPIS_POLLUTION.create_index("polluant", name="polluant_1")
+
+    ensure_indexes(db)
+    ensure_indexes(db)  # Relance sans effet
+
+    indexes = db.EPIS_POLLUTION.index_information()
+    assert "date_ech_1" not in indexes and "polluant_1" not in indexes
+    assert indexes["idx_date_ech_1"]["expireAfterSeconds"] == RETENTION_DAYS * 86400
@@ -0,0 +1,59 @@
+"""Rétention PostgreSQL : suppression des partitions mensuelles expirées"""
+
+from datetime import date
+
+from psycopg2 import sql
+
+from partitions import drop_expired_partitions
+
+PARTITIONS = ["mesures_p202405", "mesures_p202407", "mesures_p202406", "mesures_default", "autre_p202401"]
+
+
+class FakeCursor:
+    """Catalogue de partitions simulé, instructions DDL enregistrées"""
+
+    def __init__(self):
+        self.ddl = []
+        self.result = []
+
+    def execute(self, query, params=None):
+        if isinstance(query, sql.Composed):
+            # (commande, identifiants) : ("ALTER", parent, partition) ou ("DROP", partition)
+            command = query.seq[0].string.split()[0]
+            names = [part.string for part in query.seq if isinstance(part, sql.Identifier)]
+            self.ddl.append((command, *names))
+        elif "pg_inherits" in query:
+            self.result = [(name,) for name in PARTITIONS]
+        else:
+            self.result = [(8192,)]
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+
+def test_only_fully_expired_months_are_dropped():
+    cursor = FakeCursor()
+    dropped = drop_expired_partitions(cursor, "mesures", date(2024, 7, 1))
+    assert dropped == [
+        ("mesures_p202405", date(2024, 5, 1), 8192),
+        ("mesures_p202406", date(2024, 6, 1), 8192),
+    ]
+    assert cursor.ddl == [
+        ("ALTER", "mesures", "mesures_p202405"), ("DROP", "mesures_p202405"),
+        ("ALTER", "mesures", "mesures_p202406"), ("DROP", "mesures_p202406"),
+    ]
+
+
+def test_partially_expired_month_is_kept():
+    assert drop_expired_partitions(FakeCursor(), "mesures", date(2024, 6, 30)) == [
+        ("mesures_p202405", date(2024, 5, 1), 8192),
+    ]
+
+
+def test_detach_only_keeps_the_tables():
+    cursor = FakeCursor()
+    drop_expired_partitions(cursor, "mesures", date(2024, 6, 1), detach_only=True)
+    assert cursor.ddl == [("ALTER", "mesures", "mesures_p202405")]
@@ -0,0 +1,64 @@
+"""Profilage à la demande : middleware X-Profile et capture du worker"""
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import profiler
+
+USERS = {"jeton-admin": {"username": "admin", "role": "admin"},
+         "jeton-user": {"username": "user", "role": "user"}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(profiler, "user_from_token", USERS.get)
+    app = FastAPI()
+    app.add_middleware(profiler.ProfileMiddleware)
+
+    @app.get("/lent")
+    def lent():
+        time.sleep(0.05)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_request_without_header_is_not_profiled(client):
+    before = len(profiler.recent_profiles())
+    response = client.get("/lent", headers={"Authorization": "Bearer jeton-admin"})
+    assert response.json() == {"ok": True}
+    assert "x-profile-id" not in response.headers
+    assert len(profiler.recent_profiles()) == before
+
+
+def test_admin_request_is_profiled(client):
+    response = client.get("/lent", headers={"Authorization": "Bearer jeton-admin", "X-Profile": "1"})
+    assert response.json() == {"ok": True}
+    profile = profiler.get_profile(response.headers["x-profile-id"])
+    assert profile["cible"] == "GET /lent"
+    assert profile["echantillons"] > 0
+    assert "test_profiler.py:lent" in profile["collapsed"]
+
+
+@pytest.mark.parametrize("authorization", ["Bearer jeton-user", "Bearer inconnu", "Basic jeton-admin", ""])
+def test_non_admin_header_is_ignored(client, authorization):
+    response = client.get("/lent", headers={"Authorization": authorization, "X-Profile": "1"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_capture_profile_returns_collapsed_stacks():
+    profile = profiler.capture_profile(0.05, interval_ms=5)
+    assert profile["cible"] == "worker"
+    assert profiler.recent_profiles()[0]["id"] == profile["id"]
+    for line in profile["collapsed"].splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+
+
+def test_single_capture_at_a_time():
+    with profiler._capture_lock:
+        assert profiler.capture_profile(0.01) is None
@@ -0,0 +1,132 @@
+"""GCRA et stockages du limiteur de débit (memory, sqlite)"""
+
+import types
+
+import pytest
+
+from security.rate_limit_storage import (
+    MemoryStorage, RedisStorage, SQLiteStorage, gcra, storage_from_uri
+)
+
+SECOND = 1_000_000
+LIMIT = 100
+PERIOD = 60 * SECOND
+
+
+def run(times, limit=LIMIT, period=PERIOD):
+    """Décisions pour des requêtes aux instants `times` (µs) d'un même client"""
+    tat, results = None, []
+    for now in times:
+        new_tat, result = gcra(tat, now, limit, period)
+        if new_tat is not None:
+            tat = new_tat
+        results.append(result)
+    return results
+
+
+def test_burst_accepts_exactly_the_limit():
+    results = run([0] * 150)
+    assert sum(result.allowed for result in results) == LIMIT
+    assert [result.remaining for result in results[:3]] == [99, 98, 97]
+    assert results[LIMIT - 1].remaining == 0
+
+
+def test_refused_request_reports_wait_and_keeps_tat():
+    tat = 0
+    for _ in range(LIMIT):
+        tat, _ = gcra(tat, 0, LIMIT, PERIOD)
+    new_tat, result = gcra(tat, 0, LIMIT, PERIOD)
+    assert new_tat is None
+    assert not result.allowed and result.remaining == 0
+    assert result.retry_after == pytest.approx(0.6)  # une émission toutes les 60 s / 100
+    assert gcra(tat, int(0.6 * SECOND), LIMIT, PERIOD)[1].allowed
+
+
+def test_accepted_requests_follow_the_emission_rate():
+    # Requêtes toutes les 10 ms pendant 5 minutes : sur toute durée D, au
+    # plus N + D·N/P requêtes acceptées (rafale initiale, puis une par P/N)
+    times = list(range(0, 300 * SECOND, 10_000))
+    accepted = [now for now, result in zip(times, run(times)) if result.allowed]
+    interval = PERIOD // LIMIT
+    for i in range(0, len(accepted), 7):
+        for j in range(i, len(accepted), 13):
+            assert j - i + 1 <= LIMIT + (accepted[j] - accepted[i]) // interval
+    assert len(accepted) == LIMIT + 300 * SECOND // interval - 1
+
+
+def test_idle_client_starts_fresh():
+    tat = None
+    for _ in range(LIMIT):
+        tat, _ = gcra(tat, 0, LIMIT, PERIOD)
+    _, result = gcra(tat, 10 * PERIOD, LIMIT, PERIOD)
+    assert result.allowed and result.remaining == LIMIT - 1
+
+
+@pytest.mark.parametrize("make_storage", [
+    lambda tmp_path: MemoryStorage(),
+    lambda tmp_path: SQLiteStorage(str(tmp_path / "limites" / "rate_limit.db")),
+], ids=["memory", "sqlite"])
+def test_storage_limits_each_key(tmp_path, make_storage):
+    storage = make_storage(tmp_path)
+    results = [storage.acquire("a", 5, 60) for _ in range(8)]
+    assert [result.allowed for result in results] == [True] * 5 + [False] * 3
+    assert storage.acquire("b", 5, 60).allowed
+
+
+def test_sqlite_shared_between_instances(tmp_path):
+    path = str(tmp_path / "rate_limit.db")
+    first, second = SQLiteStorage(path), SQLiteStorage(path)
+    allowed = [storage.acquire("k", 10, 60).allowed for storage in (first, second) * 10]
+    assert sum(allowed) == 10
+
+
+def test_storage_from_uri(tmp_path):
+    assert isinstance(storage_from_uri("memory://"), MemoryStorage)
+    storage = storage_from_uri(f"sqlite:///{tmp_path}/rate_limit.db")
+    assert isinstance(storage, SQLiteStorage) and storage.path == f"{tmp_path}/rate_limit.db"
+    with pytest.raises(ValueError):
+        storage_from_uri("sqlite://")
+    with pytest.raises(ValueError):
+        storage_from_uri("memcached://localhost")
+
+
+@pytest.fixture
+def redis_storage(monkeypatch):
+    """RedisStorage sur fakeredis (scripts Lua via lupa), horloge TIME contrôlée"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import redis
+    from fakeredis.commands_mixins import server_mixin
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url",
+                        classmethod(lambda cls, uri, **kwargs: fakeredis.FakeRedis(server=server)))
+    clock = {"now": 1_700_000_000 * SECOND}
+    monkeypatch.setattr(server_mixin, "time", types.SimpleNamespace(time=lambda: clock["now"] / SECOND))
+    storage = storage_from_uri("redis://localhost:6379/0")
+    assert isinstance(storage, RedisStorage)
+    return storage, clock
+
+
+def test_redis_script_matches_gcra(redis_storage):
+    storage, clock = redis_storage
+    start = clock["now"]
+    limit, period = 5, 60
+    # Rafale, attentes plus courtes et plus longues que l'intervalle, inactivité
+    offsets = [0] * 7 + [5, 12, 12.5, 30, 30, 31, 90, 200, 200, 200, 200, 200, 200, 201]
+    tat = None
+    for offset in offsets:
+        now = start + int(offset * SECOND)
+        clock["now"] = now
+        new_tat, expected = gcra(tat, now, limit, period * SECOND)
+        if new_tat is not None:
+            tat = new_tat
+        result = storage.acquire("client", limit, period)
+        assert (result.allowed, result.remaining) == (expected.allowed, expected.remaining), offset
+        assert result.retry_after == pytest.approx(expected.retry_after, abs=1e-6), offset
+
+
+def test_redis_keys_are_independent(redis_storage):
+    storage, _ = redis_storage
+    assert [storage.acquire("a", 2, 60).allowed for _ in range(3)] == [True, True, False]
+    assert storage.acquire("b", 2, 60).allowed
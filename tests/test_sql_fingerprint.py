@@ -0,0 +1,36 @@
+"""Empreintes des requêtes SQL et MongoDB (métriques par forme de requête)"""
+
+from db_instrumentation import mongo_fingerprint, sql_fingerprint
+from logger import dumps
+
+
+def test_literals_and_parameters_are_replaced():
+    assert sql_fingerprint(
+        "SELECT * FROM stations WHERE code_zone = '75056' AND indice > 3.5 AND id = %(id)s"
+    ) == "SELECT * FROM stations WHERE code_zone = ? AND indice > ? AND id = ?"
+
+
+def test_same_shape_same_fingerprint():
+    assert sql_fingerprint("SELECT nom FROM t WHERE x = 'a''b'  LIMIT 10") == \
+        sql_fingerprint("SELECT nom FROM t\n  WHERE x = 'c' LIMIT 500")
+
+
+def test_in_lists_collapse_whatever_their_length():
+    assert sql_fingerprint("SELECT 1 FROM t WHERE id IN (1, 2, 3)") == \
+        sql_fingerprint("SELECT 1 FROM t WHERE id IN (%s)") == \
+        "SELECT ? FROM t WHERE id IN (?)"
+
+
+def test_identifiers_with_digits_are_kept():
+    assert sql_fingerprint("SELECT pm25, no2 FROM indices_2024 WHERE pm10 > 40") == \
+        "SELECT pm25, no2 FROM indices_2024 WHERE pm10 > ?"
+
+
+def test_long_queries_are_truncated():
+    assert len(sql_fingerprint("SELECT " + ", ".join(f"col_{i}" for i in range(200)))) == 300
+
+
+def test_mongo_fingerprint_keeps_keys_and_operators():
+    command = {"find": "EPIS_POLLUTION", "filter": {"aasqa": "28", "date_ech": {"$gte": 1}}}
+    assert mongo_fingerprint("find", command) == \
+        "find EPIS_POLLUTION " + dumps({"aasqa": "?", "date_ech": {"$gte": "?"}})
@@ -0,0 +1,27 @@
+"""Démarrage de l'API : budget d'import et absence d'effets de bord"""
+
+import os
+import subprocess
+import sys
+
+import check_startup_time
+from check_startup_time import STARTUP_BUDGET_MS, import_times
+
+API_DIR = os.path.dirname(os.path.abspath(check_startup_time.__file__))
+
+
+def test_import_main_within_budget():
+    imports = import_times()
+    total_ms = next(cumulative for module, _, cumulative, _ in imports if module == "main") / 1000
+    slowest = sorted((item for item in imports if item[3] == 1), key=lambda item: -item[2])[:5]
+    assert total_ms <= STARTUP_BUDGET_MS, (
+        f"import main : {total_ms:.0f} ms (budget {STARTUP_BUDGET_MS:.0f} ms), plus coûteux : "
+        + ", ".join(f"{module} {cumulative / 1000:.0f} ms" for module, _, cumulative, _ in slowest)
+    )
+
+
+def test_import_main_creates_no_log_dir(tmp_path):
+    log_dir = tmp_path / "logs"
+    env = {**os.environ, "LOG_DIR": str(log_dir)}
+    subprocess.run([sys.executable, "-c", "import main"], check=True, env=env, cwd=API_DIR)
+    assert not log_dir.exists()
@@ -0,0 +1,111 @@
+"""Recherche de stations : index en mémoire et endpoint /api/stations/search"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from routers import stations
+
+ROWS = [
+    ("Caen Chemin-Vert", "14118", "Caen"),
+    ("Lucas", "59350", "Lille"),
+    ("Rouen Centre", "76540", "Rouen"),
+    ("Paris 18e", "75118", "Paris"),
+]
+
+
+class FakeCursor:
+    def execute(self, query):
+        pass
+
+    def fetchall(self):
+        return ROWS
+
+
+class FakeConnection:
+    loads = 0
+
+    def cursor(self):
+        FakeConnection.loads += 1
+        return FakeCursor()
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def index(monkeypatch):
+    FakeConnection.loads = 0
+    monkeypatch.setattr(stations, "connect_pg", lambda **config: FakeConnection())
+    monkeypatch.setattr(stations, "STATION_INDEX", stations.StationIndex(ttl=300))
+    return stations.STATION_INDEX
+
+
+@pytest.fixture
+def client(index):
+    import main
+    return TestClient(main.app)
+
+
+def noms(results):
+    return [station["station_nom"] for station in results]
+
+
+def test_prefix_ranked_first(index):
+    results = index.rechercher("cae")
+    assert noms(results)[0] == "Caen Chemin-Vert"
+    assert results[0]["score"] == 0.75  # 3 caractères sur les 4 du mot "caen"
+
+
+def test_typo_matches_by_trigrams(index):
+    assert noms(index.rechercher("chemin vret")) == ["Caen Chemin-Vert"]
+
+
+def test_short_substring_has_a_real_score(index):
+    results = index.rechercher("ca")
+    assert "Lucas" in noms(results)
+    assert all(station["score"] > 0 for station in results)
+    assert next(s for s in results if s["station_nom"] == "Lucas")["score"] == pytest.approx(0.4)
+
+
+def test_blank_query_returns_nothing(index):
+    assert index.rechercher("  ") == []
+    assert FakeConnection.loads == 0
+
+
+def test_loaded_on_first_search_even_on_a_fresh_host(index, monkeypatch):
+    # Horloge monotone inférieure au TTL (machine qui vient de démarrer)
+    monkeypatch.setattr(stations.time, "monotonic", lambda: 10.0)
+    assert noms(index.rechercher("rouen")) == ["Rouen Centre"]
+    index.rechercher("paris")
+    assert FakeConnection.loads == 1
+
+
+def test_reloaded_after_ttl(index, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(stations.time, "monotonic", lambda: now[0])
+    index.rechercher("rouen")
+    now[0] += 301
+    index.rechercher("rouen")
+    assert FakeConnection.loads == 2
+
+
+def test_search_endpoint(client):
+    response = client.get("/api/stations/search", params={"q": "caen", "limit": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 1
+    assert body["data"][0] == {"station_nom": "Caen Chemin-Vert", "code_insee": "14118",
+                               "commune": "Caen", "score": 1.0}
+
+
+@pytest.mark.parametrize("q", ["  ", "--"])
+def test_search_endpoint_blank_or_punctuation(client, q):
+    response = client.get("/api/stations/search", params={"q": q})
+    assert response.status_code == 200
+    assert response.json()["count"] == 0
+
+
+def test_search_endpoint_validates_length(client):
+    assert client.get("/api/stations/search", params={"q": "a"}).status_code == 422
@@ -0,0 +1,93 @@
+"""Cache des tokens JWT déjà vérifiés"""
+
+import time
+
+import pytest
+from jose.exceptions import JWTError
+
+from routers import auth
+from routers.auth import TokenCache
+
+
+def claims(seconds=60, **extra):
+    return {"sub": "user", "exp": time.time() + seconds, **extra}
+
+
+def test_get_returns_cached_claims():
+    cache = TokenCache(maxsize=4)
+    entry = claims()
+    assert cache.get("token") is None
+    cache.put("token", entry)
+    assert cache.get("token") is entry
+
+
+def test_expired_token_is_evicted():
+    cache = TokenCache(maxsize=4)
+    cache.put("token", claims(seconds=-1))
+    assert cache.get("token") is None
+    assert not cache._entries
+
+
+def test_token_without_exp_is_not_cached():
+    cache = TokenCache(maxsize=4)
+    cache.put("token", {"sub": "user"})
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_is_evicted_first():
+    cache = TokenCache(maxsize=2)
+    cache.put("a", claims())
+    cache.put("b", claims())
+    cache.get("a")  # "b" devient le moins récent
+    cache.put("c", claims())
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_disabled_cache():
+    cache = TokenCache(maxsize=0)
+    cache.put("token", claims())
+    assert cache.get("token") is None
+
+
+def test_token_is_not_kept_in_memory():
+    cache = TokenCache(maxsize=4)
+    cache.put("secret-token", claims())
+    assert all(isinstance(key, bytes) and b"secret-token" not in key for key in cache._entries)
+
+
+def test_decode_access_token_uses_cache(monkeypatch):
+    auth.TOKEN_CACHE.clear()
+    token = auth.create_access_token({"sub": "user", "role": "user"})
+    first = auth.decode_access_token(token)
+
+    def fail(token):
+        raise AssertionError("token déjà vérifié décodé une seconde fois")
+
+    monkeypatch.setattr(auth, "decode_token", fail)
+    assert auth.decode_access_token(token) == first
+
+
+def test_invalid_token_is_not_cached():
+    auth.TOKEN_CACHE.clear()
+    token = auth.create_access_token({"sub": "user"})
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    with pytest.raises(JWTError):
+        auth.decode_access_token(tampered)
+    assert auth.TOKEN_CACHE.get(tampered) is None
+
+
+def test_jwt_backends_available():
+    for name in auth.JWT_BACKENDS:
+        encode, decode = auth.jwt_backend(name)
+        token = encode({"sub": "user", "exp": time.time() + 60})
+        assert decode(token)["sub"] == "user"
+
+
+def test_unknown_or_missing_jwt_backend(monkeypatch):
+    with pytest.raises(RuntimeError, match="non pris en charge"):
+        auth.jwt_backend("autre")
+    monkeypatch.setattr(auth.importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(RuntimeError, match="pip install PyJWT"):
+        auth.jwt_backend("pyjwt")